@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.utils.crypto import salted_hmac
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from tfoosball.models import Player
+
+DEFAULT_TOKEN_CACHE = {
+    'MAX_SIZE': 1024,
+    'TIMEOUT': 60,
+    'CACHE': None,
+    'SHARED_TIMEOUT': 300,
+}
+DEFAULT_CREDENTIALS_CACHE = {
+    'MAX_SIZE': 1024,
+    'TIMEOUT': 30,
+}
+CREDENTIALS_SALT = 'api.authentication.CachedBasicAuthentication'
+
+
+class LRUCache:
+    """
+    Thread-safe mapping keeping at most `max_size` recently used entries, each for `timeout` seconds.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value, expires = self.entries.get(key, (None, 0))
+            if expires <= time.monotonic():
+                self.entries.pop(key, None)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_if(self, predicate):
+        with self.lock:
+            for key in [key for key, (value, _) in self.entries.items() if predicate(value)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class TokenCache:
+    """
+    Tokens with their users, kept either in a per-process LRU cache or in a cache backend shared by processes.
+    Deleting a token removes it from the per-process cache of the current process only, other processes keep
+    accepting it until their entry expires after `timeout` seconds. A shared cache revokes deleted tokens at once.
+    """
+    key_prefix = 'auth:token:'
+
+    def __init__(self, max_size, timeout, cache=None, shared_timeout=None):
+        """
+        :param cache: Alias of the shared cache in CACHES, None to cache tokens per process
+        """
+        self.shared = caches[cache] if cache else None
+        self.local = LRUCache(max_size, timeout) if self.shared is None else None
+        self.shared_timeout = shared_timeout
+
+    def get(self, key):
+        if self.shared is not None:
+            return self.shared.get(self.key_prefix + key)
+        return self.local.get(key)
+
+    def set(self, key, token):
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + key, token, self.shared_timeout)
+        else:
+            self.local.set(key, token)
+
+    def delete(self, *keys):
+        if self.shared is not None:
+            if keys:
+                self.shared.delete_many([self.key_prefix + key for key in keys])
+        else:
+            for key in keys:
+                self.local.delete(key)
+
+    def clear(self):
+        """
+        Clears the per-process cache, tokens in a shared cache are left to expire.
+        """
+        if self.local is not None:
+            self.local.clear()
+
+
+@lru_cache(maxsize=None)
+def get_token_cache():
+    """
+    :return: Token cache configured by the TOKEN_AUTH_CACHE setting, shared by the whole process
+    """
+    config = dict(DEFAULT_TOKEN_CACHE, **getattr(settings, 'TOKEN_AUTH_CACHE', {}))
+    return TokenCache(config['MAX_SIZE'], config['TIMEOUT'], config['CACHE'], config['SHARED_TIMEOUT'])
+
+
+@lru_cache(maxsize=None)
+def get_credentials_cache():
+    """
+    :return: Per-process cache of verified basic credentials configured by the BASIC_AUTH_CACHE setting
+    """
+    config = dict(DEFAULT_CREDENTIALS_CACHE, **getattr(settings, 'BASIC_AUTH_CACHE', {}))
+    return LRUCache(config['MAX_SIZE'], config['TIMEOUT'])
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    Basic authentication remembering verified credentials for a short time, so that the password hasher does not run
+    on every request. Credentials are kept as a salted HMAC digest only, failed attempts are not cached.
+    """
+
+    def authenticate_credentials(self, userid, password, request=None):
+        cache = get_credentials_cache()
+        digest = salted_hmac(CREDENTIALS_SALT, f'{userid}\0{password}').hexdigest()
+        user = cache.get(digest)
+        if user is None:
+            user, _ = super().authenticate_credentials(userid, password, request)
+            cache.set(digest, user)
+        return user, None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication reading tokens and their users from the token cache, the database is queried on a miss only.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        token = cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(key, token)
+        return token.user, token
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, *args, **kwargs):
+    get_token_cache().delete(instance.key)
+
+
+def invalidate_user(user_id):
+    """
+    Removes cached tokens and credentials of the user. Needs to be called explicitly when the player is updated
+    with a queryset update, which sends no signals.
+    """
+    get_token_cache().delete(*Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+    get_credentials_cache().delete_if(lambda user: user.pk == user_id)
+
+
+@receiver(post_save, sender=Player)
+def invalidate_player(sender, instance, created, update_fields=None, *args, **kwargs):
+    # Logging in only updates last_login, which does not affect authentication
+    if not created and set(update_fields or ()) != {'last_login'}:
+        invalidate_user(instance.pk)
+
+
+@receiver(setting_changed)
+def reset_caches(setting, *args, **kwargs):
+    if setting == 'TOKEN_AUTH_CACHE':
+        get_token_cache.cache_clear()
+    elif setting == 'BASIC_AUTH_CACHE':
+        get_credentials_cache.cache_clear()
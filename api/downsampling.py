@@ -0,0 +1,35 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling, keeps the visual shape of a series with far fewer points.
+    The first and the last point are always kept, from every bucket in between the point forming the largest
+    triangle with the previously selected point and the average of the next bucket is selected.
+    :param x: Sorted x coordinates
+    :param y: y coordinates
+    :param threshold: Maximum number of returned points, at least 3
+    :return: Sorted indices of the selected points
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    size = len(x)
+    if threshold >= size:
+        return np.arange(size)
+    if threshold < 3:
+        raise ValueError('Threshold must be at least 3')
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    edges[-1] = size - 1
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
@@ -1,19 +1,119 @@
-from django.core.mail import send_mail
+import logging
+import time
+from datetime import timedelta
+from smtplib import SMTPException, SMTPServerDisconnected
 
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
 
-def send_invitation(email, activation_code):
-    send_mail(
-        subject='[Invitation] Rethink the way you play table football!',
-        message='''
+from tfoosball.models import QueuedEmail
+
+FROM_EMAIL = 'tfoosball@piotrstaniow.pl'
+INVITATION_SUBJECT = '[Invitation] Rethink the way you play table football!'
+INVITATION_MESSAGE = '''
             Hi!
 
             You have been invited to TFoosball. Join us here: https://tfoosball.herokuapp.com/accept/{0}/
 
             Best regards,
             TFoosball Team
-        '''.format(activation_code),
-        # html_message='Here is the message.',
-        from_email='tfoosball@piotrstaniow.pl',
-        recipient_list=[email],
-        fail_silently=False,
+        '''
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+RETRY_DELAY = 60
+MAX_RETRY_DELAY = 3600
+LEASE = 600
+RESULT_FIELDS = ('status', 'attempts', 'next_attempt', 'last_error', 'sent_date')
+
+logger = logging.getLogger(__name__)
+
+
+def invitation_email(email, activation_code):
+    """
+    :return: Unsaved invitation email, to be queued with others by a single bulk insert
+    """
+    return QueuedEmail(
+        recipient=email, subject=INVITATION_SUBJECT, body=INVITATION_MESSAGE.format(activation_code),
+        from_email=FROM_EMAIL, next_attempt=timezone.now()
     )
+
+
+def queue_invitation(email, activation_code):
+    """
+    Queues an invitation email for the email worker, it is sent only if the current transaction is committed.
+    """
+    return QueuedEmail.objects.enqueue(
+        email, INVITATION_SUBJECT, INVITATION_MESSAGE.format(activation_code), from_email=FROM_EMAIL
+    )
+
+
+def retry_delay(attempts):
+    """
+    :return: Number of seconds to wait after the given number of failed attempts, doubled after every attempt
+    """
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+class EmailWorker:
+    """
+    Delivers queued emails in batches. A single connection to the mail server is opened for a batch and reused
+    as long as there are emails to send; it is closed when the queue is drained or a delivery fails.
+    Emails that fail are retried with exponential backoff, and given up after `max_attempts`.
+    Claimed emails are leased for `lease` seconds, which needs to be longer than sending a batch takes.
+    """
+
+    def __init__(self, connection=None, batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS, lease=LEASE):
+        self.connection = connection or get_connection(fail_silently=False)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease = lease
+
+    def send(self, email):
+        message = EmailMessage(
+            email.subject, email.body, email.from_email or None, [email.recipient], connection=self.connection
+        )
+        # Opened explicitly, so that the backend does not close the connection after sending a message
+        self.connection.open()
+        try:
+            message.send()
+        except SMTPServerDisconnected:
+            # The server has closed a connection that was idle for too long
+            self.connection.close()
+            self.connection.open()
+            message.send()
+
+    def deliver(self, now=None):
+        """
+        Sends a batch of due emails and stores the result of each email as soon as it is sent, so that no locks
+        are held while talking to the mail server.
+        :return: A list of processed emails
+        """
+        now = now or timezone.now()
+        emails = QueuedEmail.objects.claim(self.batch_size, self.lease, now)
+        for email in emails:
+            email.attempts += 1
+            try:
+                self.send(email)
+            except (SMTPException, OSError) as error:
+                logger.warning('Failed to send email %s to %s: %s', email.pk, email.recipient, error)
+                self.connection.close()
+                email.last_error = str(error)
+                if email.attempts >= self.max_attempts:
+                    email.status = QueuedEmail.FAILED
+                else:
+                    email.next_attempt = now + timedelta(seconds=retry_delay(email.attempts))
+            else:
+                email.status = QueuedEmail.SENT
+                email.sent_date = timezone.now()
+            QueuedEmail.objects.filter(pk=email.pk).update(**{field: getattr(email, field) for field in RESULT_FIELDS})
+        if len(emails) < self.batch_size:
+            self.connection.close()
+        return emails
+
+    def run(self, interval):
+        """
+        Delivers emails until interrupted, polling the queue every `interval` seconds when it is drained.
+        """
+        while True:
+            if len(self.deliver()) < self.batch_size:
+                time.sleep(interval)
@@ -0,0 +1,122 @@
+import csv
+import json
+from datetime import date
+from itertools import islice
+
+from rest_framework.renderers import BaseRenderer
+
+from tfoosball.models import ExpHistory, Match, Member
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+CHUNK_SIZE = 1000
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Allows `text/csv` requests to pass content negotiation, only error responses are rendered by it.
+    """
+    media_type = 'text/csv'
+    format = CSV
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ''.join(csv_lines(('detail',), [(json.dumps(data),)])).encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Allows `application/x-ndjson` requests to pass content negotiation, only error responses are rendered by it.
+    """
+    media_type = 'application/x-ndjson'
+    format = NDJSON
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data) + '\n').encode(self.charset)
+
+
+class Echo:
+    """
+    File-like object returning what is written, lets csv.writer format rows without buffering them.
+    """
+    def write(self, value):
+        return value
+
+
+def to_text(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([to_text(value) for value in row])
+
+
+def ndjson_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, [to_text(value) for value in row]))) + '\n'
+
+
+def stream_rows(fields, rows, data_format, chunk_size=CHUNK_SIZE):
+    """
+    Formats rows lazily, joining them into chunks so that the response is not written line by line.
+    :param rows: An iterable of tuples ordered as `fields`
+    :return: Iterator of strings
+    """
+    lines = csv_lines(fields, rows) if data_format == CSV else ndjson_lines(fields, rows)
+    while True:
+        chunk = ''.join(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def usernames(team_id):
+    return dict(Member.objects.filter(team_id=team_id).values_list('id', 'username'))
+
+
+def export_matches(team_id):
+    """
+    Matches of a team, oldest first, in the format accepted by the match import.
+    :return: A tuple of field names and an iterator of rows
+    """
+    fields = ('id', 'date') + Match.SLOTS + ('red_score', 'blue_score', 'points', 'status')
+    names = usernames(team_id)
+    rows = Match.objects.by_team(team_id).order_by('date', 'id').values_list(
+        'id', 'date', *(f'{slot}_id' for slot in Match.SLOTS), 'red_score', 'blue_score', 'points', 'status'
+    ).iterator()
+    return fields, (row[:2] + tuple(names.get(pk) for pk in row[2:6]) + row[6:] for row in rows)
+
+
+def export_members(team_id):
+    """
+    Members of a team and their statistics.
+    :return: A tuple of field names and an iterator of rows
+    """
+    fields = ('id', 'username') + Member.STAT_FIELDS + (
+        'is_team_admin', 'is_accepted', 'hidden', 'invitation_date', 'joined_date'
+    )
+    return fields, Member.objects.filter(team_id=team_id).order_by('id').values_list(*fields).iterator()
+
+
+def export_exp_history(team_id):
+    """
+    Daily exp of members of a team, oldest first.
+    :return: A tuple of field names and an iterator of rows
+    """
+    fields = ('member', 'username', 'date', 'exp', 'matches_played', 'match')
+    names = usernames(team_id)
+    rows = ExpHistory.objects.filter(player__team_id=team_id).order_by('date', 'player_id').values_list(
+        'player_id', 'date', 'exp', 'matches_played', 'match_id'
+    ).iterator()
+    return fields, ((row[0], names.get(row[0])) + row[1:] for row in rows)
+
+
+DATASETS = {
+    'matches': export_matches,
+    'members': export_members,
+    'exp_history': export_exp_history,
+}
@@ -0,0 +1,121 @@
+from random import randint
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from tfoosball.broker import get_broker, team_channel
+from tfoosball.db import bulk_create, bulk_insert
+from tfoosball.models import Event, LeaderboardEntry, Member, Player, PlayerPlaceholder, QueuedEmail
+from .emailing import invitation_email
+
+MAX_INVITATIONS = 500
+
+INVITED = 'invited'
+INVALID = 'invalid'
+DUPLICATE = 'duplicate'
+MEMBER = 'member'
+PENDING = 'pending'
+
+
+def unique_username(email, taken):
+    """
+    Generates a username from the local part of the email, as TeamViewSet.generate_username does, but checks
+    uniqueness against a set of taken usernames instead of the database. The new username is added to the set.
+    """
+    while True:
+        username = f'{email.rsplit("@")[0]}-{randint(1000, 9999)}'[:Member.username_len]
+        if username not in taken:
+            taken.add(username)
+            return username
+
+
+def classify(team, emails):
+    """
+    Checks invited emails with a constant number of queries.
+    :return: A list of (email, status) tuples ordered as `emails`, with INVITED for emails that can be invited
+    """
+    candidates = set()
+    for email in emails:
+        try:
+            validate_email(email)
+        except ValidationError:
+            continue
+        candidates.add(email)
+    members = set(team.member_set.filter(player__email__in=candidates).values_list('player__email', flat=True))
+    pending = set(PlayerPlaceholder.objects.filter(member__team=team, email__in=candidates).values_list(
+        'email', flat=True
+    ))
+    results = []
+    seen = set()
+    for email in emails:
+        if email not in candidates:
+            status = INVALID
+        elif email in seen:
+            status = DUPLICATE
+        elif email in members:
+            status = MEMBER
+        elif email in pending:
+            status = PENDING
+        else:
+            status = INVITED
+        seen.add(email)
+        results.append((email, status))
+    return results
+
+
+def publish(team_id, messages):
+    broker = get_broker()
+    for message in messages:
+        broker.publish(team_channel(team_id), message)
+
+
+def invite_members(team, emails):
+    """
+    Invites many people to the team at once. Members, their placeholders, events and invitation emails are
+    created with bulk inserts in a single transaction, activation codes are signed in memory, and the emails are
+    sent by the email worker over a single connection.
+    :param emails: A list of email addresses
+    :return: A list of dicts reporting the status of every email, and the username and id of invited members
+    """
+    results = classify(team, emails)
+    invited = [email for email, status in results if status == INVITED]
+    if not invited:
+        return [{'email': email, 'status': status} for email, status in results]
+    now = timezone.now()
+    with transaction.atomic():
+        players = dict(Player.objects.filter(email__in=invited).values_list('email', 'pk'))
+        taken = set(team.member_set.values_list('username', flat=True))
+        members = bulk_insert(Member, [
+            Member(
+                team=team, player_id=players.get(email), username=unique_username(email, taken),
+                is_accepted=True, hidden=True, invitation_date=now,
+                activation_code=Member.sign_activation_code(email, team.name),
+            )
+            for email in invited
+        ])
+        bulk_create(PlayerPlaceholder, [
+            PlayerPlaceholder(member=member, email=email)
+            for email, member in zip(invited, members) if email not in players
+        ])
+        events = bulk_insert(Event, [
+            Event(team=team, member=member, type=Event.INVITATION, date=now,
+                  event=member.get_invitation_event(email)['event'])
+            for email, member in zip(invited, members)
+        ])
+        bulk_create(QueuedEmail, [
+            invitation_email(email, member.activation_code) for email, member in zip(invited, members)
+        ])
+        LeaderboardEntry.objects.rebuild(team.pk)
+        # Bulk inserts send no signals, so events are published here, as publish_event would do
+        messages = [event.as_message() for event in events]
+        transaction.on_commit(lambda: publish(team.pk, messages))
+    created = dict(zip(invited, members))
+    report = []
+    for email, status in results:
+        row = {'email': email, 'status': status}
+        if status == INVITED:
+            row.update(id=created[email].pk, username=created[email].username)
+        report.append(row)
+    return report
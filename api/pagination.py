@@ -0,0 +1,80 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (date, id), newest first.
+    Every page is a single index range read: there is no COUNT(*) and no OFFSET.
+    Cursors are opaque to clients, an empty cursor parameter requests the first page.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 10
+    max_page_size = 50
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, item, reverse):
+        position = {'d': item.date.isoformat(), 'i': item.pk, 'r': int(reverse)}
+        cursor = urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            date = parse_datetime(position['d'])
+            pk = int(position['i'])
+            reverse = bool(position['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (date, pk), reverse
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        if position is None:
+            queryset = queryset.order_by('-date', '-id')
+        elif reverse:
+            date, pk = position
+            queryset = queryset.filter(Q(date__gt=date) | Q(date=date, id__gt=pk)).order_by('date', 'id')
+        else:
+            date, pk = position
+            queryset = queryset.filter(Q(date__lt=date) | Q(date=date, id__lt=pk)).order_by('-date', '-id')
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+        has_next = has_more if not reverse else position is not None
+        has_previous = has_more if reverse else position is not None
+        self.next = self.encode_cursor(results[-1], False) if has_next and results else None
+        self.previous = self.encode_cursor(results[0], True) if has_previous and results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.next),
+            ('previous', self.previous),
+            ('results', data),
+        ]))
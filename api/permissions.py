@@ -3,6 +3,55 @@ from rest_framework import permissions
 from tfoosball.models import Member
 
 
+def to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Memberships:
+    """
+    Memberships of a player, loaded with a single query: ids of the member in every team and admin flags.
+    """
+
+    def __init__(self, rows):
+        """
+        :param rows: (member id, team id, is team admin) tuples
+        """
+        self.members = {member_id: team_id for member_id, team_id, _ in rows}
+        self.teams = {team_id: member_id for member_id, team_id, _ in rows}
+        self.admin_teams = {team_id for _, team_id, is_admin in rows if is_admin}
+
+    @classmethod
+    def load(cls, user):
+        if not user or not user.is_authenticated:
+            return cls([])
+        return cls(list(Member.objects.filter(player_id=user.id).values_list('id', 'team_id', 'is_team_admin')))
+
+    def in_team(self, team_id):
+        return to_id(team_id) in self.teams
+
+    def is_admin(self, team_id):
+        return to_id(team_id) in self.admin_teams
+
+    def is_member(self, member_id, team_id=None):
+        """
+        :return: Whether the member is one of the player's members, in the given team if any
+        """
+        team = self.members.get(to_id(member_id), None)
+        return team is not None and (team_id is None or team == to_id(team_id))
+
+
+def get_memberships(request):
+    """
+    :return: Memberships of the request user, loaded once per request and shared by all permission checks
+    """
+    if getattr(request, '_memberships', None) is None:
+        request._memberships = Memberships.load(request.user)
+    return request._memberships
+
+
 class AccessOwnTeamOnly(permissions.BasePermission):
     message = 'You cannot access team you don\'t belong to.'
 
@@ -10,13 +59,13 @@ class AccessOwnTeamOnly(permissions.BasePermission):
         accessed_team = view.kwargs.get('pk', None)
         if not accessed_team:
             return True
-        return request.user.member_set.filter(team__id=accessed_team).exists()
+        return get_memberships(request).in_team(accessed_team)
 
     def has_object_permission(self, request, view, obj):
         accessed_team = view.kwargs.get('pk', None)
         if not accessed_team or request.user.is_staff:
             return True
-        return request.user.member_set.filter(team__id=accessed_team).exists()
+        return get_memberships(request).in_team(accessed_team)
 
 
 class MemberPermissions(permissions.BasePermission):
@@ -26,22 +75,21 @@ class MemberPermissions(permissions.BasePermission):
         if request.method not in ['PATCH', 'DELETE']:
             return False
         member_id = view.kwargs.get('pk', None)
-        member = Member.objects.filter(pk=member_id).first()
-        is_self = request.user.id == member.player.id if member else False
+        memberships = get_memberships(request)
+        is_self = memberships.is_member(member_id)
         is_accepting = list(request.data.keys()) in [['is_accepted'], []]
         if is_self or not is_accepting:
             return False
-        request_teams = request.user.member_set.all().values_list('team__name', flat=True)
-        is_correct_team = view.get_object().team.name in request_teams
-        return is_correct_team
+        return view.get_queryset().filter(pk=member_id, team_id__in=list(memberships.teams)).exists()
 
     def has_permission(self, request, view):
         if request.method == 'GET':
             return True
         team = view.kwargs.get('parent_lookup_team', None)
         member_id = view.kwargs.get('pk', None)
-        is_admin = request.user.member_set.filter(team__id=team, is_team_admin=True).count() > 0
-        is_owner = request.user.member_set.filter(team__id=team, id=member_id).count() > 0
+        memberships = get_memberships(request)
+        is_admin = team is not None and memberships.is_admin(team)
+        is_owner = team is not None and memberships.is_member(member_id, team)
         return is_admin or is_owner or self.allow_accepting(request, view)
 
 
@@ -50,11 +98,11 @@ class IsMatchOwner(permissions.BasePermission):
         accessed_team = view.kwargs.get('team', None)
         if not accessed_team:
             return True
-        return request.user.member_set.filter(team__id=accessed_team).exists()
+        return get_memberships(request).in_team(accessed_team)
 
     def has_object_permission(self, request, view, obj):
-        owners = [u.pk for u in obj.users]
-        return request.user.member_set.filter(pk__in=owners).count() > 0
+        memberships = get_memberships(request)
+        return any(memberships.is_member(getattr(obj, f'{slot}_id')) for slot in obj.SLOTS)
 
 
 class IsAdmin(permissions.BasePermission):
@@ -62,4 +110,14 @@ class IsAdmin(permissions.BasePermission):
         accessed_team = view.kwargs.get('team', None)
         if not accessed_team:
             return True
-        return request.user.member_set.filter(team__id=accessed_team).is_team_admin
+        return get_memberships(request).is_admin(accessed_team)
+
+
+class IsTeamMember(permissions.BasePermission):
+    message = 'You cannot access team you don\'t belong to.'
+
+    def has_permission(self, request, view):
+        accessed_team = view.kwargs.get('parent_lookup_team', None)
+        if not accessed_team:
+            return True
+        return get_memberships(request).in_team(accessed_team)
@@ -1,8 +1,13 @@
+import numpy as np
+from django.utils.dateparse import parse_date
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
-from tfoosball.models import Player, Member, Match, Team, WhatsNew
-from django.db.models import Func, F
+from tfoosball.models import Player, Member, Match, Team, WhatsNew, LeaderboardEntry, Event, PairStats
+from django.db.models import Func
+
+from .authentication import invalidate_user
+from .downsampling import lttb
 
 
 class Round(Func):
@@ -15,7 +20,9 @@ class TeamSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Team
-        fields = ('id', 'name', 'links')
+        fields = ('id', 'name', 'rating_engine', 'links')
+        # Switched by the recalc_member_stats command only, which replays the history of the team
+        read_only_fields = ('rating_engine',)
 
     def get_links(self, obj):
         return {
@@ -28,7 +35,8 @@ class TeamSerializer(serializers.ModelSerializer):
 class TeamDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Team
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'rating_engine')
+        read_only_fields = ('rating_engine',)
 
 
 class PlayerSerializer(serializers.ModelSerializer):
@@ -48,6 +56,7 @@ class MemberSerializer(serializers.ModelSerializer):
     whats_new_version = serializers.IntegerField(source='player.whats_new_version', read_only=True)
     default_team = serializers.IntegerField(source='player.default_team.pk', default=-1)
     user_id = serializers.IntegerField(source='player.pk', read_only=True)
+    rating_deviation = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Member
@@ -55,7 +64,7 @@ class MemberSerializer(serializers.ModelSerializer):
             'id', 'username', 'email', 'first_name', 'last_name', 'exp', 'played', 'att_ratio', 'def_ratio',
             'win_ratio', 'win_streak', 'lose_streak', 'curr_lose_streak', 'curr_win_streak', 'lowest_exp',
             'default_team', 'highest_exp', 'is_accepted', 'hidden', 'whats_new_version', 'user_id',
-            'is_team_admin',
+            'is_team_admin', 'rating_deviation',
         )
 
     def create(self, validated_data):
@@ -69,6 +78,7 @@ class MemberSerializer(serializers.ModelSerializer):
         updated = super(MemberSerializer, self).update(instance, validated_data)
         if player_data:
             Player.objects.filter(id=updated.player.id).update(**player_data)
+            invalidate_user(updated.player.id)
         return updated
 
     def get_att_ratio(self, obj):
@@ -82,18 +92,54 @@ class MemberSerializer(serializers.ModelSerializer):
 
 
 class MemberDetailSerializer(MemberSerializer):
+    """
+    Member with the exp history, optionally limited by `date_from` and `date_to` query parameters
+    and downsampled to at most `max_points` points.
+    """
     exp_history = serializers.SerializerMethodField()
+    default_history_points = 500
+    max_history_points = 5000
 
     class Meta:
         fields = MemberSerializer.Meta.fields + ('exp_history',)
         model = Member
 
+    def get_history_params(self):
+        if not hasattr(self, '_history_params'):
+            request = self.context.get('request', None)
+            params = request.query_params if request else {}
+            try:
+                date_from, date_to = [
+                    self.parse_date_param(params.get(name, None)) for name in ('date_from', 'date_to')
+                ]
+                max_points = int(params.get('max_points', self.default_history_points))
+            except ValueError:
+                raise serializers.ValidationError('Invalid date range or number of points of exp history')
+            self._history_params = date_from, date_to, min(max(max_points, 3), self.max_history_points)
+        return self._history_params
+
+    @staticmethod
+    def parse_date_param(value):
+        if not value:
+            return None
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(value)
+        return date
+
     def get_exp_history(self, obj):
-        return obj.exp_history.all() \
-            .values('date') \
-            .annotate(daily_avg=F('exp')) \
-            .annotate(amount=F('matches_played')) \
-            .order_by('date')
+        date_from, date_to, max_points = self.get_history_params()
+        history = obj.exp_history.all()
+        if date_from:
+            history = history.filter(date__gte=date_from)
+        if date_to:
+            history = history.filter(date__lte=date_to)
+        rows = list(history.order_by('date').values_list('date', 'exp', 'matches_played'))
+        if len(rows) > max_points:
+            days = np.array([row[0].toordinal() for row in rows])
+            exp = np.array([row[1] for row in rows])
+            rows = [rows[index] for index in lttb(days, exp, max_points).tolist()]
+        return [{'date': date, 'daily_avg': exp, 'amount': amount} for date, exp, amount in rows]
 
 
 class MatchSerializer(serializers.ModelSerializer):
@@ -132,6 +178,36 @@ class MatchSerializer(serializers.ModelSerializer):
         return data
 
 
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='member_id', read_only=True)
+    username = serializers.CharField(source='member.username', read_only=True)
+    played = serializers.IntegerField(source='member.played', read_only=True)
+    win_ratio = serializers.FloatField(source='member.win_ratio', read_only=True)
+    att_ratio = serializers.FloatField(source='member.att_ratio', read_only=True)
+    def_ratio = serializers.FloatField(source='member.def_ratio', read_only=True)
+    hidden = serializers.BooleanField(source='member.hidden', read_only=True)
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ('rank', 'id', 'username', 'exp', 'played', 'win_ratio', 'att_ratio', 'def_ratio', 'hidden')
+
+
+class PairStatsSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='other_id', read_only=True)
+    username = serializers.CharField(source='other.username', read_only=True)
+    win_ratio = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = PairStats
+        fields = ('id', 'username', 'games', 'wins', 'win_ratio', 'exp')
+
+
+class EventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Event
+        fields = ('date', 'event', 'type')
+
+
 class WhatsNewSerializer(serializers.ModelSerializer):
     links = serializers.SerializerMethodField(read_only=True)
 
@@ -0,0 +1,51 @@
+import json
+import time
+
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Allows `text/event-stream` requests to pass content negotiation, only error responses are rendered by it.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_message({'type': 'error', 'event': data}).encode(self.charset)
+
+
+def format_message(message):
+    lines = [f'id: {message["id"]}'] if message.get('id') is not None else []
+    lines.append(f'event: {message["type"]}')
+    lines.append(f'data: {json.dumps(message)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(subscription, backlog, timeout, keepalive):
+    """
+    Generates server-sent events: first the backlog, then messages published to the subscription.
+    The stream ends after `timeout` seconds, so that the connection does not occupy a worker forever;
+    EventSource clients reconnect with the Last-Event-ID header and receive what they missed from the backlog.
+    :param subscription: Subscription made before the backlog was read, so that no message falls in between
+    :param backlog: Messages stored since the last event received by the client, oldest first
+    :param timeout: Number of seconds after which the stream ends
+    :param keepalive: Maximum number of seconds between two writes
+    """
+    try:
+        sent = {}
+        for message in backlog:
+            sent[message['id']] = message
+            yield format_message(message)
+        deadline = time.monotonic() + timeout
+        remaining = timeout
+        while remaining > 0:
+            message = subscription.get(timeout=min(keepalive, remaining))
+            if message is None:
+                yield ': keepalive\n\n'
+            elif sent.pop(message['id'], None) != message:
+                yield format_message(message)
+            remaining = deadline - time.monotonic()
+    finally:
+        subscription.close()
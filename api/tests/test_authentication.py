@@ -0,0 +1,137 @@
+import base64
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, force_authenticate
+from api.authentication import (
+    CachedBasicAuthentication, CachedTokenAuthentication, get_credentials_cache, get_token_cache
+)
+from api.serializers import MemberSerializer
+from api.views import PlayerViewSet
+from tfoosball.models import Member, Player
+
+factory = APIRequestFactory()
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tokens'},
+}
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json']
+
+    def setUp(self):
+        get_token_cache.cache_clear()
+        self.user = Player.objects.get(username='pflores6')
+        self.token = Token.objects.create(user=self.user)
+
+    def authenticate(self, token=None):
+        request = factory.get('/', HTTP_AUTHORIZATION='Token {0}'.format((token or self.token).key))
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), (self.user, self.token))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), (self.user, self.token))
+
+    def test_deleted_token(self):
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_close_all_sessions(self):
+        self.authenticate()
+        call_command('close_all_sessions', force=True)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivated_user(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_member_updated(self):
+        self.authenticate()
+        member = Member.objects.create(player=self.user, team_id=4, username='member')
+        serializer = MemberSerializer(member, data={'first_name': 'Changed'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        user, _ = self.authenticate()
+        self.assertEqual(user.first_name, 'Changed')
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 1})
+    def test_least_recently_used_evicted(self):
+        other = Token.objects.create(user=Player.objects.get(username='lfields7'))
+        self.authenticate()
+        self.authenticate(other)
+        self.assertEqual(len(get_token_cache().local), 1)
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    @override_settings(TOKEN_AUTH_CACHE={'TIMEOUT': 0})
+    def test_expired(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    @override_settings(CACHES=SHARED_CACHES, TOKEN_AUTH_CACHE={'CACHE': 'tokens'})
+    def test_shared_cache(self):
+        self.authenticate()
+        other_process = get_token_cache()
+        # A token cache of another process, backed by the same shared cache
+        get_token_cache.cache_clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), (self.user, self.token))
+        key = self.token.key
+        self.token.delete()
+        self.assertIsNone(other_process.get(key))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+class CachedBasicAuthenticationTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json']
+
+    def setUp(self):
+        get_credentials_cache.cache_clear()
+        self.user = Player.objects.get(username='pflores6')
+        self.user.set_password('secret')
+        self.user.save()
+
+    def authenticate(self, password='secret'):
+        credentials = base64.b64encode('pflores6:{0}'.format(password).encode('utf-8')).decode('ascii')
+        request = factory.get('/', HTTP_AUTHORIZATION='Basic {0}'.format(credentials))
+        return CachedBasicAuthentication().authenticate(request)
+
+    def test_cached(self):
+        self.assertEqual(self.authenticate(), (self.user, None))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), (self.user, None))
+        self.assertNotIn('secret', repr(list(get_credentials_cache().entries)))
+
+    def test_invalid_password_not_cached(self):
+        self.authenticate()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate('invalid')
+
+    def test_password_changed(self):
+        self.authenticate()
+        self.user.set_password('changed')
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_token_exchange(self):
+        request = factory.post('/api/players/token/')
+        force_authenticate(request, user=self.user)
+        response = PlayerViewSet.as_view({'post': 'token'})(request)
+        self.assertEqual(response.status_code, 201, 'expected HTTP 201')
+        self.assertEqual(response.data['token'], Token.objects.get(user=self.user).key)
+        response = PlayerViewSet.as_view({'post': 'token'})(request)
+        self.assertEqual(response.status_code, 200, 'expected HTTP 200')
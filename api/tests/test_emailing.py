@@ -0,0 +1,76 @@
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase
+from django.utils import timezone
+from api.emailing import EmailWorker, queue_invitation, retry_delay
+from tfoosball.models import QueuedEmail
+
+
+class FlakyBackend(EmailBackend):
+    """
+    Locmem backend failing the given number of deliveries.
+    """
+
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def send_messages(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+class EmailWorkerTest(TestCase):
+    def setUp(self):
+        self.emails = [queue_invitation(f'invited{i}@example.com', f'code{i}') for i in range(3)]
+        self.now = timezone.now()
+
+    def test_deliver(self):
+        self.assertEqual(mail.outbox, [])
+        backend = FlakyBackend()
+        processed = EmailWorker(backend).deliver(self.now)
+        self.assertEqual(len(processed), 3)
+        self.assertEqual([message.to for message in mail.outbox], [[email.recipient] for email in self.emails])
+        self.assertIn('/accept/code0/', mail.outbox[0].body)
+        self.assertEqual(QueuedEmail.objects.filter(status=QueuedEmail.SENT, attempts=1).count(), 3)
+        self.assertEqual(EmailWorker(backend).deliver(self.now), [])
+
+    def test_batches(self):
+        worker = EmailWorker(FlakyBackend(), batch_size=2)
+        self.assertEqual(len(worker.deliver(self.now)), 2)
+        self.assertEqual(len(worker.deliver(self.now)), 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_reconnect(self):
+        # A connection dropped by the server is reopened once before the delivery fails
+        backend = FlakyBackend(failures=1)
+        EmailWorker(backend).deliver(self.now)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(QueuedEmail.objects.filter(status=QueuedEmail.SENT).count(), 3)
+
+    def test_retry_with_backoff(self):
+        worker = EmailWorker(FlakyBackend(failures=2), batch_size=1, max_attempts=2)
+        worker.deliver(self.now)
+        failed = QueuedEmail.objects.get(pk=self.emails[0].pk)
+        self.assertEqual((failed.status, failed.attempts), (QueuedEmail.PENDING, 1))
+        self.assertEqual(failed.next_attempt, self.now + timedelta(seconds=retry_delay(1)))
+        self.assertIn('unexpectedly closed', failed.last_error)
+        # The failed email is not due yet, so the next one is sent instead
+        self.assertEqual([email.pk for email in worker.deliver(self.now)], [self.emails[1].pk])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_lease(self):
+        self.assertEqual(QueuedEmail.objects.claim(2, 60, self.now), self.emails[:2])
+        # Claimed emails are left alone by other workers until the lease expires
+        self.assertEqual(QueuedEmail.objects.claim(3, 60, self.now), self.emails[2:])
+        self.assertEqual(QueuedEmail.objects.claim(3, 60, self.now + timedelta(seconds=61)), self.emails)
+
+    def test_give_up(self):
+        worker = EmailWorker(FlakyBackend(failures=2), batch_size=1, max_attempts=1)
+        worker.deliver(self.now)
+        self.assertEqual(QueuedEmail.objects.get(pk=self.emails[0].pk).status, QueuedEmail.FAILED)
+        self.assertEqual(retry_delay(100), retry_delay(10))
@@ -0,0 +1,83 @@
+from itertools import permutations
+from django.test import TestCase
+from rest_framework.test import force_authenticate, APIRequestFactory
+from rest_framework import status
+from api.views import MatchViewSet
+from tfoosball.models import Player, Team, Match, Member
+
+factory = APIRequestFactory()
+
+
+class MatchPreviewTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json', 'matches.json']
+
+    def setUp(self):
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        self.members = list(Member.objects.filter(team=self.dev_team).order_by('pk')[:5])
+        self.lineups = [dict(zip(Match.SLOTS, (m.pk for m in players))) for players in permutations(self.members, 4)]
+
+    def post(self, data):
+        request = factory.post('/api/teams/{0}/matches/preview/'.format(self.dev_team.id), data, format='json')
+        force_authenticate(request, user=self.user)
+        response = MatchViewSet.as_view({'post': 'preview'})(request, parent_lookup_team=str(self.dev_team.id))
+        response.render()
+        return response
+
+    def test_matches_calculate_points(self):
+        with self.assertNumQueries(1):
+            response = self.post({'lineups': self.lineups})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual(len(response.data), len(self.lineups))
+        for lineup, preview in zip(self.lineups, response.data):
+            red_win = Match(red_score=10, blue_score=0, **{slot + '_id': pk for slot, pk in lineup.items()})
+            blue_win = Match(red_score=0, blue_score=10, **{slot + '_id': pk for slot, pk in lineup.items()})
+            self.assertEqual(preview['red'], red_win.calculate_points()[0])
+            self.assertEqual(preview['blue'], -blue_win.calculate_points()[0])
+            self.assertTrue(0 < preview['red_win_probability'] < 1)
+            self.assertEqual(preview['red_att'], lineup['red_att'])
+
+    def test_unknown_member(self):
+        other = Member.objects.exclude(team=self.dev_team).first()
+        response = self.post({'lineups': [dict(self.lineups[0], blue_def=other.pk)]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
+        self.assertIn(str(other.pk), response.data['detail'])
+
+    def test_invalid_lineups(self):
+        incomplete = {'red_att': self.members[0].pk}
+        for data in ({}, {'lineups': []}, {'lineups': [incomplete]}, {'lineups': ['x']}):
+            response = self.post(data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
+
+
+class MatchmakingTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        self.member_ids = list(Member.objects.filter(team=self.dev_team).values_list('pk', flat=True))
+
+    def post(self, data):
+        request = factory.post('/api/teams/{0}/matches/matchmaking/'.format(self.dev_team.id), data, format='json')
+        force_authenticate(request, user=self.user)
+        response = MatchViewSet.as_view({'post': 'matchmaking'})(request, parent_lookup_team=str(self.dev_team.id))
+        response.render()
+        return response
+
+    def test_proposals(self):
+        with self.assertNumQueries(2):
+            response = self.post({'members': self.member_ids, 'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual(len(response.data), 3)
+        for proposal in response.data:
+            self.assertEqual(len({proposal[slot] for slot in Match.SLOTS}), 4)
+            self.assertTrue(set(proposal[slot] for slot in Match.SLOTS) <= set(self.member_ids))
+        probabilities = [abs(proposal['red_win_probability'] - 0.5) for proposal in response.data]
+        self.assertEqual(probabilities, sorted(probabilities))
+
+    def test_invalid_pool(self):
+        other = Member.objects.exclude(team=self.dev_team).first()
+        for data in ({}, {'members': self.member_ids[:3]}, {'members': self.member_ids[:3] + [other.pk]}):
+            response = self.post(data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
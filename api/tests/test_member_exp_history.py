@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+import numpy as np
+from django.test import TestCase, SimpleTestCase
+from rest_framework.test import force_authenticate, APIRequestFactory
+from rest_framework import status
+from api.downsampling import lttb
+from api.views import MemberViewSet
+from tfoosball.models import ExpHistory, Player, Member
+
+factory = APIRequestFactory()
+
+
+class LTTBTestCase(SimpleTestCase):
+    def test_short_series_unchanged(self):
+        self.assertEqual(lttb([1, 2, 3], [5, 1, 5], 10).tolist(), [0, 1, 2])
+
+    def test_keeps_extremes(self):
+        x = np.arange(1000)
+        y = np.zeros(1000)
+        y[300], y[700] = 50, -50
+        selected = lttb(x, y, 20)
+        self.assertEqual(len(selected), 20)
+        self.assertEqual(selected[0], 0)
+        self.assertEqual(selected[-1], 999)
+        self.assertIn(300, selected)
+        self.assertIn(700, selected)
+        self.assertTrue((np.diff(selected) > 0).all())
+
+
+class MemberExpHistoryTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.admin_user = Player.objects.get(username='admin')
+        self.member = Member.objects.get(player_id=8, team__domain='dev')
+        self.start = date(2017, 1, 1)
+        ExpHistory.objects.bulk_create([
+            ExpHistory(player=self.member, date=self.start + timedelta(days=i), exp=1000 + i % 50, matches_played=1)
+            for i in range(1000)
+        ])
+
+    def get(self, query=''):
+        request = factory.get('/api/teams/dev/members/{0}/{1}'.format(self.member.pk, query))
+        force_authenticate(request, user=self.admin_user)
+        view = MemberViewSet.as_view({'get': 'retrieve'})
+        response = view(request, parent_lookup_team=str(self.member.team_id), pk=self.member.pk)
+        response.render()
+        return response
+
+    def test_downsampled_by_default(self):
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        history = response.data['exp_history']
+        self.assertEqual(len(history), 500)
+        self.assertEqual(history[0], {'date': self.start, 'daily_avg': 1000, 'amount': 1})
+        self.assertEqual(history[-1]['date'], self.start + timedelta(days=999))
+
+    def test_date_range(self):
+        response = self.get('?date_from=2017-02-01&date_to=2017-02-28&max_points=1000')
+        history = response.data['exp_history']
+        self.assertEqual(len(history), 28)
+        self.assertEqual(history[0]['date'], date(2017, 2, 1))
+
+    def test_invalid_parameters(self):
+        for query in ('?date_from=yesterday', '?date_to=2017-02-30', '?max_points=all'):
+            response = self.get(query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
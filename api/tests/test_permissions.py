@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from api.permissions import AccessOwnTeamOnly, IsMatchOwner, IsTeamMember, MemberPermissions, get_memberships
+from tfoosball.models import Match, Member, Player, Team
+
+factory = APIRequestFactory()
+
+
+class MembershipsTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        self.other_team = Team.objects.exclude(pk=self.dev_team.pk).first()
+        self.member = Member.objects.get(team=self.dev_team, player=self.user)
+
+    def request(self, user, method='get'):
+        request = Request(getattr(factory, method)('/'))
+        request.user = user
+        return request
+
+    def test_loaded_once(self):
+        request = self.request(self.user, 'patch')
+        team_view = SimpleNamespace(kwargs={'pk': str(self.dev_team.pk)})
+        member_view = SimpleNamespace(kwargs={
+            'parent_lookup_team': str(self.dev_team.pk), 'pk': str(self.member.pk)
+        })
+        match = Match(red_att_id=self.member.pk, red_def_id=0, blue_att_id=0, blue_def_id=0)
+        with self.assertNumQueries(1):
+            self.assertTrue(AccessOwnTeamOnly().has_permission(request, team_view))
+            self.assertTrue(AccessOwnTeamOnly().has_object_permission(request, team_view, self.dev_team))
+            self.assertTrue(IsTeamMember().has_permission(request, member_view))
+            self.assertTrue(MemberPermissions().has_permission(request, member_view))
+            self.assertTrue(IsMatchOwner().has_object_permission(request, member_view, match))
+
+    def test_memberships(self):
+        memberships = get_memberships(self.request(self.user))
+        self.assertTrue(memberships.in_team(str(self.dev_team.pk)))
+        self.assertFalse(memberships.in_team('invalid'))
+        self.assertTrue(memberships.is_member(self.member.pk, self.dev_team.pk))
+        self.assertFalse(memberships.is_member(self.member.pk, self.other_team.pk))
+        self.assertEqual(memberships.is_admin(self.dev_team.pk), self.member.is_team_admin)
+
+    def test_anonymous(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(get_memberships(self.request(AnonymousUser())).in_team(self.dev_team.pk))
@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import force_authenticate, APIRequestFactory
+from rest_framework import status
+from api.views import MatchViewSet, MemberViewSet
+from tfoosball.models import Player, Team, Match, Member
+
+factory = APIRequestFactory()
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Number of queries of list endpoints must not depend on the number of returned items.
+    """
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.admin_user = Player.objects.get(username='admin')
+        self.team = Team.objects.get(domain='dev')
+        self.members = list(Member.objects.filter(team=self.team, is_accepted=True)[:4])
+        for i in range(12):
+            Match.objects.create(
+                red_att=self.members[i % 4], red_def=self.members[(i + 1) % 4],
+                blue_att=self.members[(i + 2) % 4], blue_def=self.members[(i + 3) % 4],
+                red_score=i % 10, blue_score=10
+            )
+
+    def count_queries(self, view, url, **kwargs):
+        request = factory.get(url)
+        force_authenticate(request, user=self.admin_user)
+        with CaptureQueriesContext(connection) as context:
+            response = view(request, parent_lookup_team=str(self.team.id), **kwargs)
+            response.render()
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        return len(context)
+
+    def assert_constant(self, view, url_template, small, large):
+        self.assertEqual(
+            self.count_queries(view, url_template.format(self.team.id, small)),
+            self.count_queries(view, url_template.format(self.team.id, large)),
+            'expected the number of queries not to grow with page size'
+        )
+
+    def test_match_list(self):
+        view = MatchViewSet.as_view({'get': 'list'})
+        self.assert_constant(view, '/api/teams/{0}/matches/?page_size={1}', 1, 12)
+
+    def test_match_list_cursor(self):
+        view = MatchViewSet.as_view({'get': 'list'})
+        self.assert_constant(view, '/api/teams/{0}/matches/?cursor=&page_size={1}', 1, 12)
+
+    def test_member_list(self):
+        view = MemberViewSet.as_view({'get': 'list'})
+        baseline = self.count_queries(view, '/api/teams/{0}/members/'.format(self.team.id))
+        default_team = Team.objects.create(name='Other', domain='other')
+        for i in range(5):
+            player = Player.objects.create(username=f'b{i}', email=f'b{i}@mail.com', default_team=default_team)
+            Member.objects.create(team=self.team, player=player, username=f'b{i}', is_accepted=True)
+        self.assertEqual(self.count_queries(view, '/api/teams/{0}/members/'.format(self.team.id)), baseline)
+
+    def test_match_item(self):
+        match = Match.objects.filter(team=self.team).first()
+        view = MatchViewSet.as_view({'get': 'retrieve'})
+        # The match with its players and the ownership check
+        self.assertLessEqual(
+            self.count_queries(view, '/api/teams/{0}/matches/{1}/'.format(self.team.id, match.id), pk=match.id), 2
+        )
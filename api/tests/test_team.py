@@ -4,6 +4,7 @@ from rest_framework.test import force_authenticate, APIRequestFactory
 from rest_framework import status
 from api.views import TeamViewSet
 from tfoosball.models import Player, Team, Member
+from tfoosball.rating import ELO, GLICKO2
 import json
 
 factory = APIRequestFactory()
@@ -15,7 +16,7 @@ class TeamEndpointTestCase(TestCase):
     def setUp(self):
         self.admin_user = Player.objects.get(username='admin')
         self.dev_team = Team.objects.get(domain='dev')
-        self.fields = ('id', 'name')
+        self.fields = ('id', 'name', 'rating_engine')
 
     def test_get_list(self):
         request = factory.get('/api/teams/')
@@ -37,6 +38,15 @@ class TeamEndpointTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
         self.assertDictEqual(response.data, expected_data, 'expected dev team data')
 
+    def test_rating_engine_read_only(self):
+        request = factory.patch('/api/teams/{0}/'.format(self.dev_team.id), data={'rating_engine': GLICKO2})
+        force_authenticate(request, user=self.admin_user)
+        view = TeamViewSet.as_view({'patch': 'partial_update'})
+        response = view(request, pk=str(self.dev_team.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.dev_team.refresh_from_db()
+        self.assertEqual(self.dev_team.rating_engine, ELO, 'expected rating engine to be unchanged')
+
     def test_post_list(self):
         request = factory.post('/api/teams/', data={'name': 'Frogz', 'username': 'Ezyme'})
         force_authenticate(request, user=self.admin_user)
@@ -0,0 +1,123 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import force_authenticate, APIRequestFactory
+from rest_framework import status
+from api.views import EventsViewSet, TeamViewSet
+from tfoosball.broker import get_broker, team_channel
+from tfoosball.models import Event, Match, Member, Player, Team
+
+factory = APIRequestFactory()
+
+
+class TeamEventsTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        members = Member.objects.filter(team=self.dev_team)
+        self.match = Match.objects.create(
+            red_att=members[0], red_def=members[1], blue_att=members[2], blue_def=members[3],
+            red_score=10, blue_score=4
+        )
+
+    def get(self, query=''):
+        request = factory.get('/api/teams/{0}/events/{1}'.format(self.dev_team.id, query))
+        force_authenticate(request, user=self.user)
+        response = EventsViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        response.render()
+        return response
+
+    def test_non_member(self):
+        request = factory.get('/api/teams/{0}/events/'.format(self.dev_team.id))
+        force_authenticate(request, user=Player.objects.get(username='phawkins1'))
+        response = EventsViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, 'expected HTTP 403')
+
+    def test_match_event(self):
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual(response.data[0]['type'], Event.MATCH)
+        self.assertEqual(response.data[0]['event'], self.match.get_event()['event'])
+
+    def test_match_event_updated_and_deleted(self):
+        self.match.red_score = 7
+        self.match.blue_score = 10
+        self.match.save()
+        event = Event.objects.get(match=self.match)
+        self.assertIn('**7**&nbsp;-&nbsp;**10**', event.event)
+        self.match.delete()
+        self.assertFalse(Event.objects.filter(type=Event.MATCH).exists())
+
+    def test_invitation_and_joined_events(self):
+        request = factory.post('/api/teams/{0}/invite/'.format(self.dev_team.pk), data={
+            'email': 'newcomer@example.com', 'username': 'NEW'
+        })
+        force_authenticate(request, user=self.user)
+        TeamViewSet.as_view({'post': 'invite'})(request, pk=self.dev_team.pk)
+        member = Member.objects.get(team=self.dev_team, username='NEW')
+        member.activate()
+        events = self.get().data
+        self.assertEqual([event['type'] for event in events[:2]], [Event.JOINED, Event.INVITATION])
+        self.assertIn('newcomer@example.com', events[1]['event'])
+
+    def test_cursor_pagination(self):
+        members = Member.objects.filter(team=self.dev_team)
+        for score in range(5):
+            Match.objects.create(
+                red_att=members[0], red_def=members[1], blue_att=members[2], blue_def=members[3],
+                red_score=score, blue_score=10
+            )
+        first = self.get('?cursor=&page_size=4').data
+        self.assertEqual(len(first['results']), 4)
+        self.assertIsNone(first['previous'])
+        second = self.get('?' + first['next'].split('?')[1]).data
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next'])
+
+    def test_feed_queries(self):
+        # Memberships of the user and the events
+        with self.assertNumQueries(2):
+            self.get()
+
+
+class TeamEventsStreamTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        self.events = [
+            Event.objects.create(team=self.dev_team, date=timezone.now(), type=Event.JOINED, event=f'joined {i}')
+            for i in range(3)
+        ]
+
+    def stream(self, **extra):
+        request = factory.get('/api/teams/{0}/events/stream/'.format(self.dev_team.id), **extra)
+        force_authenticate(request, user=self.user)
+        view = EventsViewSet.as_view({'get': 'stream'}, stream_timeout=0.2, stream_keepalive=0.1)
+        return view(request, parent_lookup_team=str(self.dev_team.id))
+
+    def test_backlog_since_last_event(self):
+        response = self.stream(HTTP_LAST_EVENT_ID=str(self.events[0].id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertNotIn('joined 0', content)
+        self.assertIn('id: {0}\nevent: joined\n'.format(self.events[1].id), content)
+        self.assertIn('joined 2', content)
+        self.assertIn(': keepalive', content)
+
+    def test_non_member(self):
+        request = factory.get('/api/teams/{0}/events/stream/'.format(self.dev_team.id))
+        force_authenticate(request, user=Player.objects.get(username='phawkins1'))
+        view = EventsViewSet.as_view({'get': 'stream'}, stream_timeout=0.2, stream_keepalive=0.1)
+        response = view(request, parent_lookup_team=str(self.dev_team.id))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, 'expected HTTP 403')
+
+    def test_live_events(self):
+        response = self.stream()
+        get_broker().publish(team_channel(self.dev_team.id), self.events[2].as_message())
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content.count('event: joined'), 1)
+        self.assertIn('joined 2', content)
@@ -0,0 +1,76 @@
+import csv
+import json
+from django.test import TestCase
+from rest_framework.test import force_authenticate, APIRequestFactory
+from rest_framework import status
+from api.views import ExportViewSet
+from tfoosball import importing
+from tfoosball.models import ExpHistory, Match, Member, Player, Team
+
+factory = APIRequestFactory()
+
+
+class TeamExportTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        self.members = list(Member.objects.filter(team=self.dev_team).order_by('id')[:4])
+        self.matches = [
+            Match.objects.create(
+                red_att=self.members[0], red_def=self.members[1], blue_att=self.members[2], blue_def=self.members[3],
+                red_score=score, blue_score=10
+            )
+            for score in range(3)
+        ]
+
+    def export(self, dataset, query='', user=None):
+        request = factory.get('/api/teams/{0}/export/{1}/{2}'.format(self.dev_team.id, dataset, query))
+        force_authenticate(request, user=user or self.user)
+        return ExportViewSet.as_view({'get': 'retrieve'})(request, pk=dataset, parent_lookup_team=str(self.dev_team.id))
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_matches_csv(self):
+        response = self.export('matches')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(self.content(response).splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [match.id for match in self.matches])
+        self.assertEqual(rows[0]['red_att'], self.members[0].username)
+        self.assertEqual(rows[2]['red_score'], '2')
+
+    def test_matches_csv_can_be_imported(self):
+        content = self.content(self.export('matches'))
+        members = {member.username: member for member in Member.objects.filter(team=self.dev_team)}
+        matches = importing.parse_rows(importing.read_rows(content.splitlines(), importing.CSV), members)
+        self.assertEqual([match.date for match in matches], [match.date for match in self.matches])
+
+    def test_members_ndjson(self):
+        response = self.export('members', '?format=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(len(rows), Member.objects.filter(team=self.dev_team).count())
+        self.assertNotIn('activation_code', rows[0])
+        exported = next(row for row in rows if row['id'] == self.members[0].id)
+        self.assertEqual(exported['exp'], Member.objects.get(pk=self.members[0].id).exp)
+
+    def test_exp_history_ndjson(self):
+        response = self.export('exp_history', '?format=ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(len(rows), ExpHistory.objects.filter(player__team=self.dev_team).count())
+        self.assertEqual({row['username'] for row in rows}, {member.username for member in self.members})
+
+    def test_queries(self):
+        with self.assertNumQueries(3):
+            self.content(self.export('matches'))
+
+    def test_unknown_dataset(self):
+        response = self.export('players')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, 'expected HTTP 404')
+
+    def test_other_team(self):
+        response = self.export('matches', user=Player.objects.get(username='blewis0'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, 'expected HTTP 403')
@@ -1,9 +1,10 @@
 import unittest
+from django.core import mail
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import force_authenticate, APIRequestFactory
 from api.views import TeamViewSet
-from tfoosball.models import Team, Player, Member, PlayerPlaceholder
+from tfoosball.models import Event, LeaderboardEntry, Team, Player, Member, PlayerPlaceholder, QueuedEmail
 
 factory = APIRequestFactory()
 
@@ -81,7 +82,66 @@ class TeamInviteTestCase(TestCase):
         self.assertEqual(member.count(), 1, 'Member should have been created')
         self.assertTrue(placeholder.exists(), 'Player placeholder should have been created')
         self.assertNotEqual(member[0].activation_code, '', 'Activation code should be set')
+        queued = QueuedEmail.objects.get(recipient=email)
+        self.assertIn(member[0].activation_code, queued.body, 'Invitation should have been queued')
+        self.assertEqual(mail.outbox, [], 'Invitation should be sent by the email worker')
         self.assertEqual(
             response.status_code, status.HTTP_201_CREATED,
             'expected HTTP 201 - Created'
         )
+
+
+class TeamBulkInviteTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.dev_team = Team.objects.get(name='Developer Team')
+        self.member_player = Player.objects.get(username='pflores6')
+        self.non_member_player = Player.objects.get(username='phawkins1')
+
+    def invite(self, emails):
+        url = '/api/teams/{0}/invite-bulk/'.format(self.dev_team.pk)
+        request = factory.post(url, {'emails': emails}, format='json')
+        force_authenticate(request, user=self.member_player)
+        response = TeamViewSet.as_view({'post': 'invite_bulk'})(request, pk=self.dev_team.pk)
+        response.render()
+        return response
+
+    def test_invite(self):
+        new = [f'new{i}@example.com' for i in range(20)]
+        emails = new + [self.non_member_player.email, 'lfields7@globo.com', 'not an email', new[0]]
+        ranked = LeaderboardEntry.objects.by_team(self.dev_team).count()
+        # The number of queries does not depend on the number of emails
+        with self.assertNumQueries(15):
+            response = self.invite(emails)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, 'expected HTTP 201 - Created')
+        self.assertEqual(response.data['invited'], 21)
+        self.assertEqual(
+            [result['status'] for result in response.data['results'][-3:]], ['member', 'invalid', 'duplicate']
+        )
+        members = Member.objects.filter(pk__in=[result['id'] for result in response.data['results'][:21]])
+        self.assertEqual(members.filter(team=self.dev_team, hidden=True, is_accepted=True).count(), 21)
+        self.assertEqual(members.get(player=self.non_member_player).username, response.data['results'][20]['username'])
+        self.assertEqual(PlayerPlaceholder.objects.filter(member__in=members).count(), 20)
+        self.assertEqual(Event.objects.filter(member__in=members, type=Event.INVITATION).count(), 21)
+        self.assertEqual(LeaderboardEntry.objects.by_team(self.dev_team).count(), ranked + 21)
+        self.assertEqual(QueuedEmail.objects.count(), 21)
+        self.assertEqual(mail.outbox, [], 'Invitations should be sent by the email worker')
+
+    def test_activation(self):
+        email = self.non_member_player.email
+        self.invite([email])
+        member = Member.objects.get(team=self.dev_team, player=self.non_member_player)
+        self.assertIn(member.activation_code, QueuedEmail.objects.get(recipient=email).body)
+        member.activate()
+        self.assertFalse(Member.objects.get(pk=member.pk).hidden)
+
+    def test_already_invited(self):
+        self.invite(['new@example.com'])
+        response = self.invite(['new@example.com'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual(response.data['results'], [{'email': 'new@example.com', 'status': 'pending'}])
+
+    def test_invalid_request(self):
+        for emails in ([], 'new@example.com', [1], ['x@example.com'] * 501):
+            self.assertEqual(self.invite(emails).status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import force_authenticate, APIRequestFactory
+from rest_framework import status
+from api.views import LeaderboardViewSet
+from tfoosball.models import ExpHistory, LeaderboardEntry, Match, Player, Team, Member
+
+factory = APIRequestFactory()
+
+
+class TeamLeaderboardEndpointTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        self.ranking = list(
+            Member.objects.filter(team=self.dev_team, is_accepted=True).order_by('-exp', 'pk').values_list('id', 'exp')
+        )
+
+    def get(self, query):
+        request = factory.get('/api/teams/{0}/leaderboard/{1}'.format(self.dev_team.id, query))
+        force_authenticate(request, user=self.user)
+        response = LeaderboardViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        response.render()
+        return response
+
+    def test_top(self):
+        response = self.get('?top=3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual([(row['id'], row['exp']) for row in response.data], self.ranking[:3])
+        self.assertEqual([row['rank'] for row in response.data], [1, 2, 3])
+
+    def test_around_member(self):
+        member_id = self.ranking[4][0]
+        response = self.get('?member={0}&around=1'.format(member_id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual([row['id'] for row in response.data], [pk for pk, _ in self.ranking[3:6]])
+
+    def test_member_of_other_team(self):
+        other = Member.objects.exclude(team=self.dev_team).first()
+        response = self.get('?member={0}'.format(other.id))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, 'expected HTTP 404')
+
+    def test_non_member(self):
+        request = factory.get('/api/teams/{0}/leaderboard/'.format(self.dev_team.id))
+        force_authenticate(request, user=Player.objects.get(username='phawkins1'))
+        response = LeaderboardViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, 'expected HTTP 403')
+
+    def test_invalid_parameters(self):
+        response = self.get('?top=many')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
+
+
+class TeamHistoricalLeaderboardTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        cache.clear()
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        self.members = list(Member.objects.filter(team=self.dev_team, is_accepted=True).order_by('pk')[:4])
+        self.now = timezone.now()
+        self.play((0, 1, 2, 3), days=10)
+        self.play((2, 3, 0, 1), days=5)
+
+    def play(self, lineup, days):
+        return Match.objects.create(
+            red_score=10, blue_score=3, date=self.now - timedelta(days=days),
+            **{slot: self.members[index] for slot, index in zip(Match.SLOTS, lineup)}
+        )
+
+    def day(self, days):
+        return ExpHistory.day(self.now - timedelta(days=days))
+
+    def get(self, days, query=''):
+        request = factory.get('/api/teams/{0}/leaderboard/?date={1}{2}'.format(
+            self.dev_team.id, self.day(days).isoformat(), query
+        ))
+        force_authenticate(request, user=self.user)
+        response = LeaderboardViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        response.render()
+        return response
+
+    def expected(self, days):
+        exp = {}
+        for member_id, value in ExpHistory.objects.filter(date__lte=self.day(days)).order_by('date').values_list(
+            'player_id', 'exp'
+        ):
+            exp[member_id] = value
+        return sorted(exp.items(), key=lambda item: (-item[1], item[0]))
+
+    def test_as_of_date(self):
+        ranking = LeaderboardEntry.objects.as_of(self.dev_team.id, self.day(7))
+        self.assertEqual(ranking, self.expected(7))
+        self.assertEqual(len(ranking), 4)
+        self.assertEqual(LeaderboardEntry.objects.as_of(self.dev_team.id, self.day(11)), [])
+        response = self.get(5, '&top=3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual([(row['id'], row['exp']) for row in response.data], self.expected(5)[:3])
+        self.assertEqual([row['rank'] for row in response.data], [1, 2, 3])
+
+    def test_around_member(self):
+        ranking = self.expected(5)
+        response = self.get(5, '&member={0}&around=1'.format(ranking[2][0]))
+        self.assertEqual([row['id'] for row in response.data], [pk for pk, _ in ranking[1:4]])
+        self.assertEqual(response.data[0]['rank'], 2)
+        self.assertEqual(self.get(11, '&member={0}'.format(ranking[0][0])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cached_until_backdated_match(self):
+        self.get(7)
+        # Memberships of the user, the history version of the team and usernames
+        with self.assertNumQueries(3):
+            cached = self.get(7)
+        self.assertEqual([row['id'] for row in cached.data], [pk for pk, _ in self.expected(7)])
+        self.play((2, 3, 0, 1), days=8)
+        self.play((2, 3, 0, 1), days=8)
+        response = self.get(7)
+        self.assertEqual([(row['id'], row['exp']) for row in response.data], self.expected(7))
+        self.assertNotEqual(response.data, cached.data)
+
+    def test_today_is_not_cached(self):
+        self.get(0)
+        self.play((2, 3, 0, 1), days=0)
+        response = self.get(0)
+        self.assertEqual([(row['id'], row['exp']) for row in response.data], self.expected(0))
+
+    def test_non_member(self):
+        LeaderboardEntry.objects.historical(self.dev_team.id, self.day(7))
+        request = factory.get('/api/teams/{0}/leaderboard/?date={1}'.format(self.dev_team.id, self.day(7).isoformat()))
+        force_authenticate(request, user=Player.objects.get(username='phawkins1'))
+        response = LeaderboardViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, 'cached rankings are not exposed either')
+
+    def test_invalid_date(self):
+        for date in ('yesterday', '2026-02-30'):
+            request = factory.get('/api/teams/{0}/leaderboard/?date={1}'.format(self.dev_team.id, date))
+            force_authenticate(request, user=self.user)
+            response = LeaderboardViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
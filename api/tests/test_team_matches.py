@@ -1,9 +1,11 @@
+from datetime import timedelta
 from django.test import TestCase
+from django.utils import timezone
 from rest_framework.test import force_authenticate, APIRequestFactory
 from rest_framework import status
 from api.views import MatchViewSet
 from api.serializers import MatchSerializer
-from tfoosball.models import Player, Team, Match
+from tfoosball.models import Player, Team, Match, Member
 import json
 
 factory = APIRequestFactory()
@@ -90,3 +92,50 @@ class TeamMatchesEndpointTestCase(TestCase):
         response = view(request, parent_lookup_team=str(self.dev_team.id), pk=9)
         response.render()
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, 'expected HTTP 403')
+
+
+class TeamMatchesCursorTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json', 'matches.json']
+
+    def setUp(self):
+        self.admin_user = Player.objects.get(username='admin')
+        self.dev_team = Team.objects.get(domain='dev')
+        members = list(Member.objects.filter(team=self.dev_team)[:4])
+        date = timezone.now()
+        for i in range(22):
+            # Every other match shares its date with the previous one, so the id breaks ties
+            Match.objects.create(
+                red_att=members[0], red_def=members[1], blue_att=members[2], blue_def=members[3],
+                red_score=i % 10, blue_score=10, date=date - timedelta(minutes=i // 2)
+            )
+        matches = Match.objects.by_team(self.dev_team.id).order_by('-date', '-id')
+        self.expected = list(matches.values_list('id', flat=True))
+
+    def get(self, url):
+        request = factory.get(url)
+        force_authenticate(request, user=self.admin_user)
+        view = MatchViewSet.as_view({'get': 'list'})
+        response = view(request, parent_lookup_team=str(self.dev_team.id))
+        response.render()
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        return json.loads(str(response.content, encoding='utf8'))
+
+    def test_walk_forward_and_back(self):
+        page = self.get('/api/teams/{0}/matches/?cursor=&page_size=5'.format(self.dev_team.id))
+        self.assertNotIn('count', page)
+        self.assertIsNone(page['previous'])
+        pages = [[m['id'] for m in page['results']]]
+        while page['next']:
+            page = self.get(page['next'])
+            pages.append([m['id'] for m in page['results']])
+        self.assertEqual(sum(pages, []), self.expected)
+        for expected in reversed(pages[:-1]):
+            page = self.get(page['previous'])
+            self.assertEqual([m['id'] for m in page['results']], expected)
+        self.assertIsNone(page['previous'])
+
+    def test_invalid_cursor(self):
+        request = factory.get('/api/teams/{0}/matches/?cursor=abc'.format(self.dev_team.id))
+        force_authenticate(request, user=self.admin_user)
+        response = MatchViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, 'expected HTTP 404')
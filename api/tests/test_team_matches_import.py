@@ -0,0 +1,54 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import force_authenticate, APIRequestFactory
+from rest_framework import status
+from api.views import MatchViewSet
+from tfoosball.models import Player, Team, Match
+
+factory = APIRequestFactory()
+
+CSV = (
+    'date,red_att,red_def,blue_att,blue_def,red_score,blue_score\n'
+    '2017-05-01 12:00,pflores6,lfields7,kscott8,Petrov,10,4\n'
+    '2017-05-02,kscott8,pflores6,lfields7,Petrov,6,10\n'
+)
+
+
+class TeamMatchesImportTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.admin = Player.objects.get(username='admin')
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+
+    def post(self, user, content, name='matches.csv'):
+        request = factory.post(
+            '/api/teams/{0}/matches/import/'.format(self.dev_team.id),
+            {'file': SimpleUploadedFile(name, content.encode('utf-8'))}, format='multipart'
+        )
+        force_authenticate(request, user=user)
+        view = MatchViewSet.as_view({'post': 'import_matches'})
+        response = view(request, parent_lookup_team=str(self.dev_team.id))
+        response.render()
+        return response
+
+    def test_import(self):
+        response = self.post(self.admin, CSV)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, 'expected HTTP 201')
+        self.assertEqual(response.data, {'imported': 2})
+        self.assertEqual(Match.objects.by_team(self.dev_team.id).count(), 2)
+
+    def test_invalid_rows(self):
+        response = self.post(self.admin, CSV.replace('Petrov,6', 'nobody,6'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
+        self.assertEqual(response.data['errors'], [{'line': 3, 'error': 'Unknown members nobody'}])
+        self.assertFalse(Match.objects.by_team(self.dev_team.id).exists())
+
+    def test_unsupported_format(self):
+        response = self.post(self.admin, CSV, name='matches.xlsx')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
+
+    def test_non_admin(self):
+        response = self.post(self.user, CSV)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, 'expected HTTP 403')
@@ -0,0 +1,67 @@
+from django.test import TestCase
+from rest_framework.test import force_authenticate, APIRequestFactory
+from rest_framework import status
+from api.views import MemberViewSet, PairStatsViewSet
+from tfoosball.models import Match, Member, PairStats, Player, Team
+
+factory = APIRequestFactory()
+
+
+class TeamPairsTestCase(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.user = Player.objects.get(username='pflores6')
+        self.dev_team = Team.objects.get(domain='dev')
+        self.members = list(Member.objects.filter(team=self.dev_team).order_by('pk')[:4])
+        a, b, c, d = self.members
+        for red_score in (10, 10, 10):
+            Match.objects.create(red_att=a, red_def=b, blue_att=c, blue_def=d, red_score=red_score, blue_score=5)
+        Match.objects.create(red_att=a, red_def=c, blue_att=b, blue_def=d, red_score=2, blue_score=10)
+
+    def get_pairs(self, member, query=''):
+        request = factory.get('/api/teams/{0}/members/{1}/pairs/{2}'.format(self.dev_team.id, member.pk, query))
+        force_authenticate(request, user=self.user)
+        view = MemberViewSet.as_view({'get': 'pairs'})
+        return view(request, pk=str(member.pk), parent_lookup_team=str(self.dev_team.id))
+
+    def test_member_pairs(self):
+        a, b, c, d = self.members
+        with self.assertNumQueries(1):
+            response = self.get_pairs(a)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        self.assertEqual(response.data['best_partner']['id'], b.pk)
+        self.assertEqual(response.data['best_partner']['games'], 3)
+        self.assertEqual(response.data['best_partner']['win_ratio'], 1)
+        self.assertEqual([pair['id'] for pair in response.data['partners']], [b.pk, c.pk])
+        # d was beaten three times out of four, c three out of three
+        self.assertEqual(response.data['nemesis']['id'], d.pk)
+
+    def test_min_games(self):
+        response = self.get_pairs(self.members[0], '?min_games=5')
+        self.assertIsNone(response.data['best_partner'])
+        self.assertIsNone(response.data['nemesis'])
+        self.assertEqual(self.get_pairs(self.members[0], '?min_games=x').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_team_matrix(self):
+        request = factory.get('/api/teams/{0}/pairs/?relation=opponent'.format(self.dev_team.id))
+        force_authenticate(request, user=self.user)
+        with self.assertNumQueries(2):
+            response = PairStatsViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, 'expected HTTP 200')
+        ids = [member['id'] for member in response.data['members']]
+        self.assertEqual(ids, sorted(member.pk for member in self.members))
+        a, d = ids.index(self.members[0].pk), ids.index(self.members[3].pk)
+        self.assertEqual(response.data['games'][a][d], 4)
+        self.assertEqual(response.data['wins'][a][d], 3)
+        self.assertEqual(response.data['wins'][d][a], 1)
+        self.assertEqual(response.data['games'][a][a], 0)
+
+    def test_invalid_relation(self):
+        request = factory.get('/api/teams/{0}/pairs/?relation=rival'.format(self.dev_team.id))
+        force_authenticate(request, user=self.user)
+        response = PairStatsViewSet.as_view({'get': 'list'})(request, parent_lookup_team=str(self.dev_team.id))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, 'expected HTTP 400')
+
+    def test_stored_pairs(self):
+        self.assertEqual(PairStats.objects.filter(team=self.dev_team, games__gt=0).count(), 20)
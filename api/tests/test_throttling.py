@@ -0,0 +1,69 @@
+import unittest
+import uuid
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from api.throttling import FIXED_WINDOW, AnonRateThrottle, CacheThrottleStore, RedisThrottleStore
+from tfoosball.tests.test_broker import REDIS_URL, redis_available
+
+factory = APIRequestFactory()
+
+
+class ThrottleStoreTestMixin:
+    def test_hit(self):
+        key = str(uuid.uuid4())
+        self.assertEqual(self.store.hit(key + ':1', key + ':0', 60), (1, 0))
+        self.assertEqual(self.store.hit(key + ':1', key + ':0', 60), (2, 0))
+        self.assertEqual(self.store.hit(key + ':2', key + ':1', 60), (1, 2))
+
+
+class CacheThrottleStoreTest(ThrottleStoreTestMixin, SimpleTestCase):
+    def setUp(self):
+        self.store = CacheThrottleStore()
+
+
+@unittest.skipUnless(redis_available(), 'Redis server is not available')
+class RedisThrottleStoreTest(ThrottleStoreTestMixin, SimpleTestCase):
+    def setUp(self):
+        self.store = RedisThrottleStore(REDIS_URL)
+
+
+@override_settings(THROTTLE_STORE={'BACKEND': 'api.throttling.CacheThrottleStore'})
+class CounterRateThrottleTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 30
+
+    def throttle(self, algorithm=None):
+        throttle = AnonRateThrottle()
+        throttle.rate, (throttle.num_requests, throttle.duration) = '2/min', (2, 60)
+        throttle.timer = lambda: self.now
+        throttle.algorithm = algorithm or throttle.algorithm
+        return throttle
+
+    def request(self):
+        request = factory.get('/', REMOTE_ADDR='10.0.0.1')
+        request.user = AnonymousUser()
+        return request
+
+    def allowed(self, algorithm=None, count=1):
+        return [self.throttle(algorithm).allow_request(self.request(), None) for _ in range(count)]
+
+    def test_fixed_window(self):
+        self.assertEqual(self.allowed(FIXED_WINDOW, 3), [True, True, False])
+        self.now = 105
+        self.assertEqual(self.allowed(FIXED_WINDOW, 3), [True, True, False])
+
+    def test_sliding_window(self):
+        self.assertEqual(self.allowed(count=3), [True, True, False])
+        # Three requests of the previous window count as 3 * 15 / 60
+        self.now = 105
+        self.assertEqual(self.allowed(count=2), [True, False])
+        self.now = 180
+        self.assertEqual(self.allowed(count=2), [True, True])
+
+    def test_wait(self):
+        throttle = self.throttle()
+        throttle.allow_request(self.request(), None)
+        self.assertEqual(throttle.wait(), 30)
@@ -0,0 +1,120 @@
+import logging
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+
+FIXED_WINDOW = 'fixed'
+SLIDING_WINDOW = 'sliding'
+DEFAULT_STORE = {'BACKEND': 'api.throttling.CacheThrottleStore'}
+
+logger = logging.getLogger(__name__)
+
+
+class CacheThrottleStore:
+    """
+    Counters kept in a Django cache. Shared between workers only if the cache is, e.g. a database or memcached cache,
+    the default local memory cache counts requests per process. Suitable for development and tests.
+    """
+
+    def __init__(self, cache='default'):
+        self.cache = caches[cache]
+
+    def hit(self, key, previous_key, timeout):
+        """
+        Increments the counter of the current window.
+        :param timeout: Number of seconds after which the counter expires
+        :return: A tuple of counts of the current and the previous window
+        """
+        self.cache.add(key, 0, timeout)
+        try:
+            count = self.cache.incr(key)
+        except ValueError:
+            # The counter has just expired
+            self.cache.set(key, 1, timeout)
+            count = 1
+        return count, self.cache.get(previous_key, 0)
+
+
+class RedisThrottleStore:
+    """
+    Counters kept in Redis, shared by all processes connected to the server. Every hit is a single round trip.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0'):
+        self.connection = redis.StrictRedis.from_url(url)
+
+    def hit(self, key, previous_key, timeout):
+        """
+        Increments the counter of the current window.
+        :param timeout: Number of seconds after which the counter expires
+        :return: A tuple of counts of the current and the previous window
+        """
+        pipeline = self.connection.pipeline(transaction=False)
+        pipeline.incr(key)
+        pipeline.expire(key, timeout)
+        pipeline.get(previous_key)
+        count, _, previous = pipeline.execute()
+        return count, int(previous or 0)
+
+
+@lru_cache(maxsize=None)
+def get_throttle_store():
+    """
+    :return: Store configured by the THROTTLE_STORE setting, shared by the whole process
+    """
+    config = getattr(settings, 'THROTTLE_STORE', DEFAULT_STORE)
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_store(setting, *args, **kwargs):
+    if setting == 'THROTTLE_STORE':
+        get_throttle_store.cache_clear()
+
+
+class CounterRateThrottle(throttling.SimpleRateThrottle):
+    """
+    Rate throttle counting requests with one counter per time window instead of a history of request timestamps.
+    The `fixed` algorithm compares the counter of the current window with the rate. The `sliding` one weights
+    the counter of the previous window by the part of it still covered by a window ending now, which smooths
+    bursts at window boundaries.
+    """
+    algorithm = SLIDING_WINDOW
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        now = self.timer()
+        window, elapsed = divmod(now, self.duration)
+        self.remaining = self.duration - elapsed
+        try:
+            count, previous = get_throttle_store().hit(
+                f'{self.key}:{int(window)}', f'{self.key}:{int(window) - 1}', self.duration * 2
+            )
+        except redis.RedisError:
+            # Throttling is a safeguard, requests are not refused because the store is unavailable
+            logger.exception('Failed to count a request of %s', self.key)
+            return True
+        if self.algorithm == SLIDING_WINDOW:
+            count += previous * self.remaining / self.duration
+        return count <= self.num_requests
+
+    def wait(self):
+        return self.remaining
+
+
+class AnonRateThrottle(CounterRateThrottle, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(CounterRateThrottle, throttling.UserRateThrottle):
+    pass
@@ -9,6 +9,9 @@ from .views import (
     PlayerViewSet,
     WhatsNewViewSet,
     EventsViewSet,
+    LeaderboardViewSet,
+    ExportViewSet,
+    PairStatsViewSet,
 )
 
 router = DefaultRouter()
@@ -17,6 +20,11 @@ team_routes = router.register(r'teams', TeamViewSet, base_name='team')
 team_routes.register(r'members', MemberViewSet, base_name='team-member', parents_query_lookups=['team'])
 team_routes.register(r'matches', MatchViewSet, base_name='team-matches', parents_query_lookups=['team'])
 team_routes.register(r'events', EventsViewSet, base_name='team-events', parents_query_lookups=['team'])
+team_routes.register(
+    r'leaderboard', LeaderboardViewSet, base_name='team-leaderboard', parents_query_lookups=['team']
+)
+team_routes.register(r'export', ExportViewSet, base_name='team-export', parents_query_lookups=['team'])
+team_routes.register(r'pairs', PairStatsViewSet, base_name='team-pairs', parents_query_lookups=['team'])
 whatsnew = router.register(r'whatsnew', WhatsNewViewSet, base_name='whatsnew')
 
 urlpatterns = [
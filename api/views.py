@@ -1,12 +1,18 @@
+import codecs
+import os
 from random import randint
-from smtplib import SMTPException
+import numpy as np
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.core.exceptions import ValidationError
 from django.core.signing import BadSignature, SignatureExpired
 from django.shortcuts import get_object_or_404
 from django.forms.models import model_to_dict
+from django.db import transaction
 from django.db.models import F
+from django.http import StreamingHttpResponse
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.decorators import list_route, detail_route
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
@@ -14,8 +20,14 @@ from rest_framework.viewsets import ModelViewSet, ViewSet
 from rest_framework_extensions.mixins import NestedViewSetMixin, DetailSerializerMixin
 from rest_framework.permissions import IsAuthenticated
 
-from api.emailing import send_invitation
-from tfoosball.models import Member, Match, Player, Team, WhatsNew
+from api.emailing import queue_invitation
+from api import inviting
+from tfoosball.models import Member, Match, Player, Team, WhatsNew, LeaderboardEntry, Event, PairStats
+from tfoosball.broker import get_broker, team_channel
+from tfoosball import importing
+from tfoosball.matchmaking import Matchmaker
+from tfoosball.rating import preview_points
+from tfoosball.signals import member_invited
 from .serializers import (
     MatchSerializer,
     MemberSerializer,
@@ -23,9 +35,15 @@ from .serializers import (
     PlayerSerializer,
     WhatsNewSerializer,
     TeamDetailSerializer,
-    MemberDetailSerializer
+    MemberDetailSerializer,
+    LeaderboardEntrySerializer,
+    EventSerializer,
+    PairStatsSerializer,
 )
-from .permissions import MemberPermissions, AccessOwnTeamOnly, IsMatchOwner
+from .pagination import KeysetPagination
+from . import export
+from .streaming import EventStreamRenderer, event_stream
+from .permissions import MemberPermissions, AccessOwnTeamOnly, IsMatchOwner, IsTeamMember, get_memberships
 
 
 def displayable(message):
@@ -41,6 +59,25 @@ class StandardPagination(PageNumberPagination):
     max_page_size = 50
 
 
+class MatchPagination(StandardPagination):
+    """
+    Page number pagination, switching to keyset pagination when the cursor parameter is present.
+    """
+    def is_keyset(self, request):
+        return KeysetPagination.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = KeysetPagination() if self.is_keyset(request) else None
+        if self.keyset:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super(MatchPagination, self).paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super(MatchPagination, self).get_paginated_response(data)
+
+
 class TeamViewSet(NestedViewSetMixin, DetailSerializerMixin, ModelViewSet):
     serializer_class = TeamSerializer
     serializer_detail_class = TeamDetailSerializer
@@ -179,31 +216,48 @@ class TeamViewSet(NestedViewSetMixin, DetailSerializerMixin, ModelViewSet):
                 displayable('User of email {0} is already a member of {1}'.format(email, team.name)),
                 status=status.HTTP_409_CONFLICT
             )
-        member, placeholder = Member.create_member(
-            username, email, pk,
-            is_accepted=True,
-            hidden=True,
-            invitation_date=timezone.now()
-        )
-        activation_code = member.generate_activation_code()
-        try:
-            send_invitation(email, activation_code)
-        except SMTPException:
-            return Response(
-                'Unknown error while sending an invitation, please try again.',
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        # The invitation email is queued along with the member, so neither is left without the other
+        with transaction.atomic():
+            member, placeholder = Member.create_member(
+                username, email, pk,
+                is_accepted=True,
+                hidden=True,
+                invitation_date=timezone.now()
             )
-            # TODO Revert member
-        else:
+            member_invited.send(sender=Member, member=member, email=email)
+            queue_invitation(email, member.generate_activation_code())
+        return Response(
+            displayable('Invitation was sent to {0}'.format(email)),
+            status=status.HTTP_201_CREATED
+        )
+
+    @detail_route(methods=['post'], url_path='invite-bulk', permission_classes=[AccessOwnTeamOnly, IsAuthenticated])
+    def invite_bulk(self, request, pk=None):
+        """
+        Invites people of the given `emails` at once.
+        :return: Status of every email, one of invited, invalid, duplicate, member or pending
+        """
+        team = get_object_or_404(Team, pk=pk)
+        emails = request.data.get('emails', None)
+        if not isinstance(emails, list) or not emails or not all(isinstance(email, str) for email in emails):
+            return Response(displayable('You haven\'t provided a list of emails'), status=status.HTTP_400_BAD_REQUEST)
+        if len(emails) > inviting.MAX_INVITATIONS:
             return Response(
-                displayable('Invitation was sent to {0}'.format(email)),
-                status=status.HTTP_201_CREATED
+                displayable('At most {0} people can be invited at once'.format(inviting.MAX_INVITATIONS)),
+                status=status.HTTP_400_BAD_REQUEST
             )
+        results = inviting.invite_members(team, [email.strip() for email in emails])
+        invited = sum(result['status'] == inviting.INVITED for result in results)
+        return Response(
+            {'invited': invited, 'results': results},
+            status=status.HTTP_201_CREATED if invited else status.HTTP_200_OK
+        )
 
 
 class MemberViewSet(NestedViewSetMixin, ModelViewSet):
     filter_fields = ('is_accepted', 'username', 'hidden')
     permission_classes = (MemberPermissions, IsAuthenticated)
+    default_min_games = 3
 
     def get_serializer_class(self, *args, **kwargs):
         username = self.request.query_params.get('username', None)
@@ -216,16 +270,44 @@ class MemberViewSet(NestedViewSetMixin, ModelViewSet):
         is_accepted = self.request.query_params.get('is_accepted', True)
         pk = self.kwargs.get('pk', None)
         username = self.request.query_params.get('username', None)
+        # Serializers read player details of every member
+        queryset = Member.objects.select_related('player__default_team')
         if team and username:
-            return Member.objects.filter(team__id=team, username=username)
+            return queryset.filter(team__id=team, username=username)
         if pk or username:
-            return Member.objects.all()
+            return queryset
         if team:
-            return Member.objects.filter(
+            return queryset.filter(
                 is_accepted=is_accepted,
                 team__pk=team
             )
-        return Member.objects.all()
+        return queryset
+
+    @detail_route(methods=['get'])
+    def pairs(self, request, pk=None, *args, **kwargs):
+        """
+        Partners and opponents of the member, best first, with the best partner and the nemesis: the opponent
+        the member loses to most often. Only pairs with at least `min_games` games are considered for both.
+        """
+        try:
+            min_games = max(int(request.query_params.get('min_games', self.default_min_games)), 1)
+        except ValueError:
+            return Response({'detail': 'Invalid min_games'}, status=status.HTTP_400_BAD_REQUEST)
+        pairs = PairStats.objects.filter(member_id=pk, games__gt=0).select_related('other')
+        team_id = kwargs.get('parent_lookup_team', None)
+        if team_id:
+            pairs = pairs.filter(team_id=team_id)
+        pairs = sorted(pairs, key=lambda pair: (-pair.win_ratio, -pair.games, pair.other_id))
+        partners = [pair for pair in pairs if pair.relation == PairStats.PARTNER]
+        opponents = [pair for pair in pairs if pair.relation == PairStats.OPPONENT]
+        best_partner = next((pair for pair in partners if pair.games >= min_games), None)
+        nemesis = next((pair for pair in reversed(opponents) if pair.games >= min_games), None)
+        return Response({
+            'best_partner': PairStatsSerializer(best_partner).data if best_partner else None,
+            'nemesis': PairStatsSerializer(nemesis).data if nemesis else None,
+            'partners': PairStatsSerializer(partners, many=True).data,
+            'opponents': PairStatsSerializer(opponents, many=True).data,
+        })
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -240,11 +322,15 @@ class MemberViewSet(NestedViewSetMixin, ModelViewSet):
 class MatchViewSet(ModelViewSet):
     serializer_class = MatchSerializer
     allowed_methods = [u'GET', u'POST', u'PUT', u'PATCH', u'DELETE', u'OPTIONS']
-    pagination_class = StandardPagination
+    pagination_class = MatchPagination
     permission_classes = (IsMatchOwner, IsAuthenticated)
+    default_status = Match._meta.get_field('status').default
+    max_preview_lineups = 500
+    max_matchmaking_pool = 32
+    max_matchmaking_proposals = 20
 
     def get_queryset(self):
-        queryset = Match.objects.all()
+        queryset = Match.objects.select_related(*Match.SLOTS)
         team_id = self.kwargs.get('parent_lookup_team', None)
         username = self.request.query_params.get('username', None)
         if team_id:
@@ -256,24 +342,128 @@ class MatchViewSet(ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         response = super(MatchViewSet, self).list(request, args, kwargs)
+        if self.paginator.is_keyset(request):
+            return response
         response.data['page'] = request.GET.get('page', 1)
         response.data['page_size'] = request.GET.get('page_size', StandardPagination.page_size)
         return response
 
+    def get_lineups_exp(self, lineups):
+        """
+        Loads exp of all players of the lineups with a single query.
+        :param lineups: A list of dicts mapping every slot in Match.SLOTS to a member id
+        :raises ValueError: A lineup is incomplete or refers to a member that does not exist
+        :return: An array of exp of the players, one row per lineup and one column per slot
+        """
+        ids = np.array([[int(lineup[slot]) for slot in Match.SLOTS] for lineup in lineups], dtype=np.int64)
+        members = Member.objects.filter(pk__in=set(ids.ravel().tolist()))
+        team_id = self.kwargs.get('parent_lookup_team', None)
+        if team_id:
+            members = members.filter(team_id=team_id)
+        known = dict(members.values_list('id', 'exp'))
+        missing = set(ids.ravel().tolist()) - set(known)
+        if missing:
+            raise ValueError('Unknown members: {0}'.format(', '.join(str(pk) for pk in sorted(missing))))
+        member_ids = np.array(sorted(known), dtype=np.int64)
+        exp = np.array([known[pk] for pk in member_ids.tolist()], dtype=np.int64)
+        return exp[np.searchsorted(member_ids, ids)].reshape(-1, len(Match.SLOTS))
+
     @list_route(methods=['get'])
     def points(self, request, *args, **kwargs):
-        data = {k + '_id': v for k, v in request.query_params.items()}
-        match = Match(**data, red_score=0, blue_score=10)
         try:
-            result1 = abs(match.calculate_points()[0])
-        except (Match.red_att.RelatedObjectDoesNotExist,
-                Match.red_def.RelatedObjectDoesNotExist,
-                Match.blue_att.RelatedObjectDoesNotExist,
-                Match.blue_def.RelatedObjectDoesNotExist):
+            exp = self.get_lineups_exp([request.query_params])
+        except (KeyError, ValueError):
             return Response({'detail': 'Players have not been provided'}, status=406)
-        match = Match(**data, red_score=10, blue_score=0)
-        result2 = abs(match.calculate_points()[0])
-        return Response({'blue': result1, 'red': result2})
+        _, red, blue = preview_points(exp[:, 0] + exp[:, 1], exp[:, 2] + exp[:, 3], self.default_status)
+        return Response({'blue': int(blue[0]), 'red': int(red[0])})
+
+    @list_route(methods=['post'])
+    def preview(self, request, *args, **kwargs):
+        """
+        Predicts many candidate lineups at once: the probability of the red team winning and the points
+        that the red and the blue team would gain for a clean win.
+        """
+        lineups = request.data.get('lineups', None)
+        if not isinstance(lineups, list) or not lineups or len(lineups) > self.max_preview_lineups:
+            return Response(
+                {'detail': 'Provide from 1 to {0} lineups'.format(self.max_preview_lineups)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            exp = self.get_lineups_exp(lineups)
+        except (KeyError, TypeError, ValueError) as e:
+            detail = str(e) if isinstance(e, ValueError) else 'Every lineup must contain all players'
+            return Response({'detail': detail}, status=status.HTTP_400_BAD_REQUEST)
+        expected, red, blue = preview_points(exp[:, 0] + exp[:, 1], exp[:, 2] + exp[:, 3], self.default_status)
+        return Response([
+            dict({slot: int(lineup[slot]) for slot in Match.SLOTS}, red_win_probability=p, red=r, blue=b)
+            for lineup, p, r, b in zip(lineups, expected.round(4).tolist(), red.tolist(), blue.tolist())
+        ])
+
+    @list_route(methods=['post'])
+    def matchmaking(self, request, *args, **kwargs):
+        """
+        Proposes the fairest matches among the given `members`, with players assigned to positions.
+        """
+        team_id = kwargs.get('parent_lookup_team', None)
+        member_ids = request.data.get('members', None)
+        try:
+            member_ids = [int(pk) for pk in member_ids]
+            limit = min(max(int(request.data.get('limit', 5)), 1), self.max_matchmaking_proposals)
+        except (TypeError, ValueError):
+            return Response({'detail': 'Provide a list of member ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if not team_id or not 4 <= len(set(member_ids)) <= self.max_matchmaking_pool:
+            return Response(
+                {'detail': 'Provide from 4 to {0} members'.format(self.max_matchmaking_pool)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            matchmaker = Matchmaker.load(team_id, member_ids)
+        except Member.DoesNotExist as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        proposals = matchmaker.propose(limit)
+        slots = proposals['slots']
+        exp = matchmaker.exp[np.searchsorted(matchmaker.member_ids, slots)]
+        _, red, blue = preview_points(exp[:, 0] + exp[:, 1], exp[:, 2] + exp[:, 3], self.default_status)
+        return Response([
+            dict(zip(Match.SLOTS, lineup), red_win_probability=p, repeats=n, red=r, blue=b)
+            for lineup, p, n, r, b in zip(
+                slots.tolist(), proposals['expected'].round(4).tolist(), proposals['repeats'].tolist(),
+                red.tolist(), blue.tolist()
+            )
+        ])
+
+    @list_route(methods=['post'], url_path='import')
+    def import_matches(self, request, *args, **kwargs):
+        """
+        Imports matches from an uploaded CSV or JSONL `file`, available to team admins only.
+        """
+        team_id = kwargs.get('parent_lookup_team', None)
+        if not team_id or not get_memberships(request).is_admin(team_id):
+            return Response({'detail': 'Only team admins can import matches'}, status=status.HTTP_403_FORBIDDEN)
+        upload = request.FILES.get('file', None)
+        if upload is None:
+            return Response({'detail': 'Missing file'}, status=status.HTTP_400_BAD_REQUEST)
+        data_format = request.data.get('format', None) or os.path.splitext(upload.name)[1].lstrip('.').lower()
+        if data_format not in importing.FORMATS:
+            return Response(
+                {'detail': 'Unsupported format, use one of: {0}'.format(', '.join(importing.FORMATS))},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            imported = importing.import_matches(
+                team_id, importing.read_rows(codecs.iterdecode(upload, 'utf-8'), data_format)
+            )
+        except importing.MatchImportError as e:
+            return Response(
+                {'detail': 'Nothing was imported, {0}'.format(e), 'errors': [
+                    {'line': line_num, 'error': error} for line_num, error in e.errors
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except UnicodeDecodeError:
+            return Response({'detail': 'File must be encoded with UTF-8'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'imported': imported}, status=status.HTTP_201_CREATED)
 
 
 class PlayerViewSet(ModelViewSet):
@@ -288,6 +478,15 @@ class PlayerViewSet(ModelViewSet):
             queryset = queryset.filter(email__istartswith=prefix)[:5]
         return queryset
 
+    @list_route(methods=['post'])
+    def token(self, request, *args, **kwargs):
+        """
+        Exchanges credentials of the request, e.g. basic ones, for the API token of the user.
+        Clients should authenticate further requests with the token, which is much cheaper to verify than a password.
+        """
+        token, created = Token.objects.get_or_create(user=request.user)
+        return Response({'token': token.key}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
     @detail_route(methods=['post'])
     def invite(self, request, *args, **kwargs):
         team__id = request.data.get('team', None)
@@ -320,17 +519,171 @@ class WhatsNewViewSet(ModelViewSet):
 
 
 class EventsViewSet(NestedViewSetMixin, ViewSet):
-    permission_classes = (IsAuthenticated,)
+    """
+    Club events feed, newest first. Returns the latest events, or a page of them when `cursor` is given.
+    New and updated events are pushed by the `stream` endpoint as server-sent events.
+    """
+    permission_classes = (IsTeamMember, IsAuthenticated)
+    latest_size = 20
+    # Streams hold a sync worker, so they end below gunicorn's default worker timeout of 30 seconds
+    stream_timeout = 25
+    stream_keepalive = 15
+    max_backlog = 100
+
+    def list(self, request, *args, **kwargs):
+        team_id = kwargs.get('parent_lookup_team', None)
+        if not team_id:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        events = Event.objects.filter(team_id=team_id)
+        if KeysetPagination.cursor_query_param in request.query_params:
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(events, request, view=self)
+            return paginator.get_paginated_response(EventSerializer(page, many=True).data)
+        events = events.order_by('-date', '-id')[:self.latest_size]
+        return Response(EventSerializer(events, many=True).data)
+
+    @list_route(methods=['get'], renderer_classes=[EventStreamRenderer])
+    def stream(self, request, *args, **kwargs):
+        team_id = kwargs.get('parent_lookup_team', None)
+        if not team_id:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        try:
+            last_id = int(request.META.get('HTTP_LAST_EVENT_ID', request.query_params.get('last_event_id', 0)))
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        subscription = get_broker().subscribe(team_channel(team_id))
+        backlog = []
+        if last_id:
+            events = Event.objects.filter(team_id=team_id, id__gt=last_id).order_by('id')[:self.max_backlog]
+            backlog = [event.as_message() for event in events]
+        response = StreamingHttpResponse(
+            event_stream(subscription, backlog, self.stream_timeout, self.stream_keepalive),
+            content_type=EventStreamRenderer.media_type
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class ExportViewSet(NestedViewSetMixin, ViewSet):
+    """
+    Streams a whole dataset of a team: `matches`, `members` or `exp_history`, as CSV or NDJSON
+    depending on the `format` parameter or the Accept header.
+    Rows are read with a database cursor and written as they come, so memory use does not depend on the team size.
+    """
+    permission_classes = (IsTeamMember, IsAuthenticated)
+    renderer_classes = (export.CSVRenderer, export.NDJSONRenderer)
 
-    def get_club_events(self, team_id):
-        date_from = timezone.now() - timezone.timedelta(days=2)
-        matches = Match.objects.by_team(team_id=team_id).filter(date__gte=date_from)[:10]
-        members = Member.objects.filter(team__id=team_id)[:10]
-        events = members.get_events() + matches.get_events()
-        return sorted(events, key=lambda ev: ev['date'], reverse=True)
+    def retrieve(self, request, pk=None, *args, **kwargs):
+        team_id = kwargs.get('parent_lookup_team', None)
+        if not team_id or pk not in export.DATASETS:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        data_format = request.accepted_renderer.format
+        fields, rows = export.DATASETS[pk](team_id)
+        response = StreamingHttpResponse(
+            export.stream_rows(fields, rows, data_format), content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = 'attachment; filename="team-{0}-{1}.{2}"'.format(team_id, pk, data_format)
+        return response
+
+
+class PairStatsViewSet(NestedViewSetMixin, ViewSet):
+    """
+    Pair statistics of all members of a team as matrices for the given `relation`, partner or opponent.
+    Row i and column j hold statistics of members[i] playing with or against members[j].
+    """
+    permission_classes = (IsTeamMember, IsAuthenticated)
+
+    def list(self, request, *args, **kwargs):
+        team_id = kwargs.get('parent_lookup_team', None)
+        relation = request.query_params.get('relation', PairStats.PARTNER)
+        if not team_id or relation not in dict(PairStats.RELATION_CHOICES):
+            return Response({'detail': 'Invalid relation'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = list(PairStats.objects.filter(team_id=team_id, relation=relation).values_list(
+            'member_id', 'member__username', 'other_id', 'games', 'wins', 'exp'
+        ))
+        usernames = dict((member_id, username) for member_id, username, *_ in rows)
+        member_ids = np.array(sorted(set(usernames) | {row[2] for row in rows}), dtype=np.int64)
+        data = np.array([(row[0], row[2]) + row[3:] for row in rows], dtype=np.int64).reshape(-1, 5)
+        first, second = np.searchsorted(member_ids, data[:, 0]), np.searchsorted(member_ids, data[:, 1])
+        matrices = {}
+        for column, name in enumerate(('games', 'wins', 'exp'), start=2):
+            matrix = np.zeros((len(member_ids), len(member_ids)), dtype=np.int64)
+            matrix[first, second] = data[:, column]
+            matrices[name] = matrix.tolist()
+        return Response(dict(matrices, relation=relation, members=[
+            {'id': member_id, 'username': usernames.get(member_id)} for member_id in member_ids.tolist()
+        ]))
+
+
+class LeaderboardViewSet(NestedViewSetMixin, ViewSet):
+    """
+    Ranking of team members by exp. Returns the `top` members, or members ranked at most `around` positions
+    above or below the given `member`. With a `date` (YYYY-MM-DD), members are ranked by exp at the end of that day.
+    """
+    permission_classes = (IsTeamMember, IsAuthenticated)
+    default_top = 10
+    max_top = 100
+    default_around = 2
+    max_around = 50
+
+    def get_int_param(self, request, name, default, maximum):
+        value = int(request.query_params.get(name, default))
+        return min(max(value, 0), maximum)
 
     def list(self, request, *args, **kwargs):
         team_id = kwargs.get('parent_lookup_team', None)
         if not team_id:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        return Response(self.get_club_events(team_id))
+        member_id = request.query_params.get('member', None)
+        if 'date' in request.query_params:
+            return self.historical(request, team_id, member_id)
+        try:
+            if member_id:
+                around = self.get_int_param(request, 'around', self.default_around, self.max_around)
+                entries = LeaderboardEntry.objects.around(team_id, int(member_id), around)
+            else:
+                top = self.get_int_param(request, 'top', self.default_top, self.max_top)
+                entries = LeaderboardEntry.objects.top(team_id, top)
+        except ValueError:
+            return Response({'detail': 'Invalid parameters'}, status=status.HTTP_400_BAD_REQUEST)
+        except LeaderboardEntry.DoesNotExist:
+            return Response({'detail': 'Member is not ranked in this team'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(LeaderboardEntrySerializer(entries, many=True).data)
+
+    def historical(self, request, team_id, member_id):
+        """
+        :return: Part of the ranking as of the requested date, as selected by `top` or `member` and `around`
+        """
+        try:
+            date = parse_date(request.query_params['date'])
+            member_id = int(member_id) if member_id else None
+            around = self.get_int_param(request, 'around', self.default_around, self.max_around)
+            top = self.get_int_param(request, 'top', self.default_top, self.max_top)
+        except ValueError:
+            date = None
+        if date is None:
+            return Response({'detail': 'Invalid parameters'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ranking = LeaderboardEntry.objects.historical(team_id, date)
+        except Team.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        start = 0
+        if member_id is not None:
+            ranked = [pk for pk, _ in ranking]
+            if member_id not in ranked:
+                return Response({'detail': 'Member is not ranked in this team'}, status=status.HTTP_404_NOT_FOUND)
+            start = max(ranked.index(member_id) - around, 0)
+            ranking = ranking[start:ranked.index(member_id) + around + 1]
+        else:
+            ranking = ranking[:top]
+        members = {
+            pk: (username, hidden)
+            for pk, username, hidden in Member.objects.filter(pk__in=[pk for pk, _ in ranking]).values_list(
+                'pk', 'username', 'hidden'
+            )
+        }
+        return Response([
+            {'rank': rank, 'id': pk, 'username': members[pk][0], 'exp': exp, 'hidden': members[pk][1]}
+            for rank, (pk, exp) in enumerate(ranking, start=start + 1)
+        ])
@@ -0,0 +1,122 @@
+import json
+import logging
+import threading
+from functools import lru_cache
+from queue import Empty, Queue
+
+import redis
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = {'BACKEND': 'tfoosball.broker.LocalBroker'}
+
+logger = logging.getLogger(__name__)
+
+
+def team_channel(team_id):
+    return f'team:{team_id}:events'
+
+
+class LocalSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = Queue()
+
+    def get(self, timeout=None):
+        """
+        :return: The next published message, or None if there was none within the timeout
+        """
+        try:
+            return json.loads(self.queue.get(timeout=timeout))
+        except Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    In-process broker, delivers messages only to subscribers running within the same process.
+    Suitable for development and tests.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def publish(self, channel, message):
+        payload = json.dumps(message)
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.queue.put(payload)
+        return len(subscriptions)
+
+    def subscribe(self, channel):
+        subscription = LocalSubscription(self, channel)
+        with self.lock:
+            self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.channel, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.channel, None)
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    def get(self, timeout=None):
+        """
+        :return: The next published message, or None if there was none within the timeout
+        """
+        message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout or 0)
+        return json.loads(message['data'].decode('utf-8')) if message else None
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisBroker:
+    """
+    Broker backed by Redis pub/sub, delivers messages to subscribers of all processes connected to the server.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0'):
+        self.connection = redis.StrictRedis.from_url(url)
+
+    def publish(self, channel, message):
+        # Live updates are best effort, clients catch up from the event log when they reconnect
+        try:
+            return self.connection.publish(channel, json.dumps(message))
+        except redis.RedisError:
+            logger.exception('Failed to publish a message to %s', channel)
+            return 0
+
+    def subscribe(self, channel):
+        pubsub = self.connection.pubsub()
+        pubsub.subscribe(channel)
+        return RedisSubscription(pubsub)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """
+    :return: Broker configured by the EVENTS_BROKER setting, shared by the whole process
+    """
+    config = getattr(settings, 'EVENTS_BROKER', DEFAULT_BROKER)
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_broker(setting, *args, **kwargs):
+    if setting == 'EVENTS_BROKER':
+        get_broker.cache_clear()
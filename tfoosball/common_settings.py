@@ -104,12 +104,43 @@ ACCOUNT_USERNAME_MIN_LENGTH = 3
 # ACCOUNT_USERNAME_REQUIRED = False # ?
 AUTH_USER_MODEL = "tfoosball.Player"
 
+# EVENTS BROKER
+# ------------------------------------------------------------------------------
+# Publishes club events to subscribers of the events stream, within a single process by default
+EVENTS_BROKER = {
+    'BACKEND': 'tfoosball.broker.LocalBroker',
+}
+
+# THROTTLING
+# ------------------------------------------------------------------------------
+# Stores request counters of the throttles, in the default cache by default
+THROTTLE_STORE = {
+    'BACKEND': 'api.throttling.CacheThrottleStore',
+}
+
+# AUTHENTICATION CACHES
+# ------------------------------------------------------------------------------
+# Tokens are cached per process, where deleted tokens stay valid in other processes for up to TIMEOUT seconds.
+# Set CACHE to an alias in CACHES to keep them in a cache shared by processes instead, which revokes them at once.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 1024,
+    'TIMEOUT': 60,
+    'CACHE': None,
+    'SHARED_TIMEOUT': 300,
+}
+
+# Verified basic credentials are remembered per process for a short time, so that passwords are not hashed per request
+BASIC_AUTH_CACHE = {
+    'MAX_SIZE': 1024,
+    'TIMEOUT': 30,
+}
+
 # REST FRAMEWORK CONFIG
 # ------------------------------------------------------------------------------
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.BasicAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedBasicAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -120,8 +151,8 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'api.throttling.AnonRateThrottle',
+        'api.throttling.UserRateThrottle'
     ),
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
@@ -0,0 +1,197 @@
+from django.db import connections, router
+from django.db.models import AutoField, Case, When, Value
+
+
+def bulk_update(model, rows, fields, using=None):
+    """
+    Updates many rows of a model with a single UPDATE ... CASE statement per batch.
+    :param model: Model class to be updated
+    :param rows: A dict mapping primary keys to dicts of new field values
+    :param fields: Names of the fields that should be written
+    :param using: Optional database alias
+    :return: Number of updated rows
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    pks = list(rows.keys())
+    batch_size = max(connection.ops.bulk_batch_size(['pk'] + list(fields) * 2, pks), 1)
+    updated = 0
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        changes = {
+            field: Case(
+                *[When(pk=pk, then=Value(rows[pk][field])) for pk in batch],
+                output_field=model._meta.get_field(field)
+            )
+            for field in fields
+        }
+        updated += model._default_manager.using(using).filter(pk__in=batch).update(**changes)
+    return updated
+
+
+def bulk_create(model, objs, batch_size=None, using=None):
+    """
+    Same as QuerySet.bulk_create, but batches never exceed the limits of the database backend,
+    which Django only applies when no batch size is given.
+    :param model: Model class
+    :param objs: Unsaved instances
+    :param batch_size: Maximum number of rows inserted with a single query
+    :param using: Optional database alias
+    :return: List of the created instances
+    """
+    using = using or router.db_for_write(model)
+    objs = list(objs)
+    fields = [field for field in model._meta.concrete_fields if not isinstance(field, AutoField)]
+    limit = max(connections[using].ops.bulk_batch_size(fields, objs), 1)
+    return model._default_manager.using(using).bulk_create(objs, batch_size=min(batch_size or limit, limit))
+
+
+EXCLUDED = 'excluded'
+ADD = 'add'
+
+
+def supports_upsert(connection):
+    """
+    :return: Whether the database supports INSERT ... ON CONFLICT DO UPDATE, added in PostgreSQL 9.5 and SQLite 3.24
+    """
+    if connection.vendor == 'postgresql':
+        return connection.pg_version >= 90500
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 24, 0)
+    return False
+
+
+def upsert(model, rows, unique_fields, update, using=None):
+    """
+    Inserts rows or updates the conflicting ones with a single INSERT ... ON CONFLICT statement.
+    Other databases, and versions without ON CONFLICT support, update or insert every row separately.
+    :param model: Model class
+    :param rows: A list of dicts mapping column names to values, all with the same keys
+    :param unique_fields: Column names of the unique constraint that detects conflicts
+    :param update: A dict mapping column names to EXCLUDED (take the inserted value) or ADD (add it to the stored one)
+    :param using: Optional database alias
+    """
+    if not rows:
+        return
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = list(rows[0].keys())
+    fields = {field.column: field for field in model._meta.concrete_fields}
+    if not supports_upsert(connection):
+        _update_or_insert(connection, table, fields, rows, columns, unique_fields, update)
+        return
+    assignments = []
+    for column, mode in update.items():
+        excluded = f'EXCLUDED.{qn(column)}'
+        value = f'{table}.{qn(column)} + {excluded}' if mode == ADD else excluded
+        assignments.append(f'{qn(column)} = {value}')
+    placeholders = '({0})'.format(', '.join(['%s'] * len(columns)))
+    sql = 'INSERT INTO {0} ({1}) VALUES {2} ON CONFLICT ({3}) DO UPDATE SET {4}'.format(
+        table,
+        ', '.join(qn(column) for column in columns),
+        ', '.join([placeholders] * len(rows)),
+        ', '.join(qn(column) for column in unique_fields),
+        ', '.join(assignments),
+    )
+    params = [fields[column].get_db_prep_save(row[column], connection) for row in rows for column in columns]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _update_or_insert(connection, table, fields, rows, columns, unique_fields, update):
+    """
+    Fallback of upsert issuing an UPDATE per row, followed by an INSERT if no row matched. Rows inserted
+    concurrently by other transactions between both statements make the INSERT fail with IntegrityError.
+    """
+    qn = connection.ops.quote_name
+    assignments = ', '.join(
+        f'{qn(column)} = {qn(column)} + %s' if mode == ADD else f'{qn(column)} = %s' for column, mode in update.items()
+    )
+    conditions = ' AND '.join(f'{qn(column)} = %s' for column in unique_fields)
+    update_sql = f'UPDATE {table} SET {assignments} WHERE {conditions}'
+    insert_sql = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(
+        table, ', '.join(qn(column) for column in columns), ', '.join(['%s'] * len(columns))
+    )
+    with connection.cursor() as cursor:
+        for row in rows:
+            values = {column: fields[column].get_db_prep_save(row[column], connection) for column in columns}
+            keys = [values[column] for column in unique_fields]
+            cursor.execute(update_sql, [values[column] for column in update] + keys)
+            if not cursor.rowcount:
+                cursor.execute(insert_sql, [values[column] for column in columns])
+
+
+def insert(model, columns, rows, batch_size=None, return_ids=False, using=None):
+    """
+    Inserts rows with multi-row INSERT statements, without creating model instances.
+    :param model: Model class
+    :param columns: Column names
+    :param rows: Tuples of values ordered as `columns`, already prepared for the database
+    :param batch_size: Maximum number of rows inserted with a single query
+    :param return_ids: Return primary keys of the inserted rows
+    :param using: Optional database alias
+    :return: List of primary keys of the inserted rows in order if `return_ids` is set, otherwise None
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = model._meta
+    rows = list(rows)
+    limit = max(connection.ops.bulk_batch_size(list(columns), rows), 1)
+    batch_size = min(batch_size or limit, limit)
+    placeholders = '({0})'.format(', '.join(['%s'] * len(columns)))
+    returning = return_ids and connection.features.can_return_ids_from_bulk_insert
+    # Other backends only report the key of the last inserted row, so rows are inserted one by one
+    single = return_ids and not returning and connection.vendor != 'sqlite'
+    if single:
+        batch_size = 1
+    ids = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            sql = 'INSERT INTO {0} ({1}) VALUES {2}'.format(
+                qn(opts.db_table), ', '.join(qn(column) for column in columns), ', '.join([placeholders] * len(batch))
+            )
+            if returning:
+                sql += ' RETURNING {0}'.format(qn(opts.pk.column))
+            cursor.execute(sql, [value for row in batch for value in row])
+            if returning:
+                ids.extend(row[0] for row in cursor.fetchall())
+            elif single:
+                ids.append(connection.ops.last_insert_id(cursor, opts.db_table, opts.pk.column))
+            elif return_ids:
+                # SQLite serializes writes, rows inserted by a single statement get consecutive keys
+                ids.extend(range(cursor.lastrowid - len(batch) + 1, cursor.lastrowid + 1))
+    return ids if return_ids else None
+
+
+def bulk_insert(model, objs, batch_size=None, using=None):
+    """
+    Inserts unsaved instances with multi-row INSERT statements and sets their primary keys, which
+    QuerySet.bulk_create does on PostgreSQL only. Signals are not sent.
+    :param model: Model class
+    :param objs: Unsaved instances
+    :param batch_size: Maximum number of rows inserted with a single query
+    :param using: Optional database alias
+    :return: List of the created instances
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    objs = list(objs)
+    fields = [field for field in model._meta.concrete_fields if not isinstance(field, AutoField)]
+    for obj in objs:
+        for field in fields:
+            # Sets auto_now_add dates and similar values computed on save
+            field.pre_save(obj, add=True)
+    ids = insert(
+        model, [field.column for field in fields],
+        ([field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields] for obj in objs),
+        batch_size, return_ids=True, using=using
+    )
+    for obj, pk in zip(objs, ids):
+        obj.pk = pk
+        obj._state.adding = False
+        obj._state.db = using
+    return objs
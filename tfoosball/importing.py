@@ -0,0 +1,195 @@
+import csv
+import json
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .db import insert
+from .models import Event, LeaderboardEntry, Match, MatchParticipant, Member, PairStats, Team
+from .replay import MatchHistory, SLOT_SIGN, SLOTS, rebuild_exp_history, replay_team
+
+CSV = 'csv'
+JSONL = 'jsonl'
+FORMATS = (CSV, JSONL)
+FIELDS = ('date',) + SLOTS + ('red_score', 'blue_score')
+CHUNK_SIZE = 2000
+MAX_ERRORS = 100
+PARTICIPANT_SIDES = (Match.RED, Match.RED, Match.BLUE, Match.BLUE)
+DEFAULT_STATUS = Match._meta.get_field('status').default
+
+ImportedMatch = namedtuple('ImportedMatch', ('date', 'players', 'red_score', 'blue_score'))
+
+
+class MatchImportError(ValueError):
+    """
+    Raised when imported rows are invalid, nothing is imported then.
+    :param errors: A list of (line number, message) tuples
+    """
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} invalid rows')
+        self.errors = errors
+
+
+def read_rows(stream, data_format):
+    """
+    Reads matches from a text stream: a CSV file with a header row or JSON objects separated by new lines.
+    Both contain `date`, usernames of players in `red_att`, `red_def`, `blue_att`, `blue_def` and the scores.
+    :return: Iterator of (line number, dict) tuples
+    """
+    if data_format == CSV:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif data_format == JSONL:
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_num, row if isinstance(row, dict) else {}
+    else:
+        raise ValueError(f'Unsupported format {data_format}, use one of: {", ".join(FORMATS)}')
+
+
+def parse_match_date(value):
+    value = str(value or '')
+    date = parse_datetime(value)
+    if date is None:
+        day = parse_date(value)
+        date = datetime(day.year, day.month, day.day) if day else None
+    if date is None:
+        raise ValueError(f'Invalid date {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.get_default_timezone())
+    return date
+
+
+def parse_rows(rows, members):
+    """
+    Validates rows read by read_rows.
+    :param members: A dict mapping usernames to members of the team
+    :raises MatchImportError: Some of the rows are invalid
+    :return: A list of ImportedMatch tuples, with players ordered as Match.SLOTS
+    """
+    matches = []
+    errors = []
+    for line_num, row in rows:
+        try:
+            missing = [field for field in FIELDS if row.get(field) in (None, '')]
+            if missing:
+                raise ValueError(f'Missing {", ".join(missing)}')
+            players = tuple(members.get(str(row[slot])) for slot in SLOTS)
+            unknown = [str(row[slot]) for slot, player in zip(SLOTS, players) if player is None]
+            if unknown:
+                raise ValueError(f'Unknown members {", ".join(unknown)}')
+            if len({player.pk for player in players}) != len(SLOTS):
+                raise ValueError('Players must be different')
+            red_score, blue_score = int(row['red_score']), int(row['blue_score'])
+            if red_score < 0 or blue_score < 0 or red_score == blue_score == 0:
+                raise ValueError(f'Invalid score {red_score}-{blue_score}')
+            matches.append(ImportedMatch(parse_match_date(row['date']), players, red_score, blue_score))
+        except (TypeError, ValueError) as e:
+            errors.append((line_num, str(e)))
+            if len(errors) >= MAX_ERRORS:
+                break
+    if errors:
+        raise MatchImportError(errors)
+    return matches
+
+
+def rate_matches(team_id, matches):
+    """
+    Computes points of the imported matches, as if they were saved one by one in date order among the existing
+    matches of the team and rated by its rating engine. Points of the existing matches are kept.
+    :return: A list of points gained by the red team, ordered as `matches`
+    """
+    member_ids = np.array(sorted(Member.objects.filter(team_id=team_id).values_list('id', flat=True)))
+    fields = ('date',) + tuple(f'{slot}_id' for slot in SLOTS) + ('red_score', 'blue_score', 'status', 'points')
+    existing = list(Match.objects.by_team(team_id).order_by('date', 'id').values_list(*fields).iterator())
+    imported = [
+        (match.date,) + tuple(player.pk for player in match.players) +
+        (match.red_score, match.blue_score, DEFAULT_STATUS, 0)
+        for match in matches
+    ]
+    dates = [row[0] for row in existing] + [row[0] for row in imported]
+    data = np.array([row[1:] for row in existing + imported], dtype=np.int64).reshape(-1, len(fields) - 1)
+    kept = np.r_[np.ones(len(existing), dtype=bool), np.zeros(len(imported), dtype=bool)]
+    # Existing matches go before the imported ones played at the same time
+    order = sorted(range(len(dates)), key=lambda index: (dates[index], not kept[index]))
+    data, kept = data[order], kept[order]
+    history = MatchHistory(
+        member_ids, np.zeros(len(data)), np.searchsorted(member_ids, data[:, 0:4]),
+        data[:, 4], data[:, 5], data[:, 6], data[:, 7]
+    )
+    points = [0] * len(matches)
+    imported_order = [index - len(existing) for index in order if index >= len(existing)]
+    engine = Team.objects.values_list('rating_engine', flat=True).get(pk=team_id)
+    for index, value in zip(imported_order, history.rerate(keep=kept, engine=engine)[~kept].tolist()):
+        points[index] = value
+    return points
+
+
+def save_matches(team_id, matches, points, chunk_size):
+    """
+    Inserts matches, their participants and events with chunked multi-row inserts.
+    """
+    date_field = Match._meta.get_field('date')
+    dates = [date_field.get_db_prep_save(match.date, connection) for match in matches]
+    ids = insert(
+        Match, ('team_id',) + tuple(f'{slot}_id' for slot in SLOTS) +
+        ('date', 'red_score', 'blue_score', 'points', 'status'),
+        (
+            (team_id,) + tuple(player.pk for player in match.players) +
+            (date, match.red_score, match.blue_score, value, DEFAULT_STATUS)
+            for match, date, value in zip(matches, dates, points)
+        ),
+        chunk_size, return_ids=True
+    )
+    insert(
+        MatchParticipant, ('match_id', 'member_id', 'side', 'position', 'date', 'exp_delta'),
+        (
+            (pk, player.pk, side, slot.rsplit('_', 1)[1], date, sign * value)
+            for pk, match, date, value in zip(ids, matches, dates, points)
+            for player, slot, side, sign in zip(match.players, SLOTS, PARTICIPANT_SIDES, SLOT_SIGN.tolist())
+        ),
+        chunk_size
+    )
+    insert(
+        Event, ('team_id', 'match_id', 'date', 'type', 'event'),
+        (
+            (team_id, pk, date, Event.MATCH, Match.format_event(*match.players, match.red_score, match.blue_score))
+            for pk, match, date in zip(ids, matches, dates)
+        ),
+        chunk_size
+    )
+
+
+def import_matches(team_id, rows, chunk_size=CHUNK_SIZE):
+    """
+    Imports matches of a team in one transaction. Usernames are validated against members loaded with a single query,
+    points of the new matches are computed in memory in date order, then matches, their participants and events are
+    inserted in chunks and statistics, ExpHistory, pair statistics and the leaderboard of the team are rebuilt.
+    :param rows: Rows as produced by read_rows
+    :raises MatchImportError: Some of the rows are invalid, nothing was imported
+    :return: Number of imported matches
+    """
+    members = {member.username: member for member in Member.objects.filter(team_id=team_id)}
+    matches = parse_rows(rows, members)
+    if not matches:
+        return 0
+    with transaction.atomic():
+        LeaderboardEntry.objects.lock_team(team_id)
+        points = rate_matches(team_id, matches)
+        save_matches(team_id, matches, points, chunk_size)
+        replay_team(team_id)
+        # Statistics and the leaderboard have just been rebuilt by replay_team
+        rebuild_exp_history(chunk_size, team_id=team_id, update_members=False)
+        PairStats.objects.rebuild(team_id)
+    return len(matches)
@@ -0,0 +1,58 @@
+import base64
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import (
+    CachedBasicAuthentication, CachedTokenAuthentication, get_credentials_cache, get_token_cache
+)
+from tfoosball.models import Player
+
+USERNAME = 'benchmark-auth'
+PASSWORD = 'benchmark-auth-password'
+
+
+class Command(BaseCommand):
+    help = 'Measures CPU time spent on authenticating a request by every authentication class'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            dest='requests',
+            default=50,
+            type=int,
+            help='Number of authenticated requests per authentication class',
+        )
+
+    def measure(self, authentication, header, requests):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=header)
+        start = time.process_time()
+        for _ in range(requests):
+            authentication.authenticate(request)
+        return (time.process_time() - start) / requests
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        get_token_cache().clear()
+        get_credentials_cache().clear()
+        # The player and the token are rolled back afterwards
+        with transaction.atomic():
+            player = Player.objects.create_user(USERNAME, password=PASSWORD)
+            token = Token.objects.create(user=player)
+            basic = 'Basic ' + base64.b64encode(f'{USERNAME}:{PASSWORD}'.encode('utf-8')).decode('ascii')
+            results = (
+                ('BasicAuthentication', BasicAuthentication(), basic),
+                ('CachedBasicAuthentication', CachedBasicAuthentication(), basic),
+                ('TokenAuthentication', TokenAuthentication(), f'Token {token.key}'),
+                ('CachedTokenAuthentication', CachedTokenAuthentication(), f'Token {token.key}'),
+            )
+            for name, authentication, header in results:
+                cpu_time = self.measure(authentication, header, requests)
+                self.stdout.write(f'{name:<28}{cpu_time * 1000:>10.3f} ms CPU per request')
+            transaction.set_rollback(True)
+        get_token_cache().clear()
+        get_credentials_cache().clear()
@@ -0,0 +1,88 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from tfoosball.rating import DEFAULT_STATUS, ENGINES, expected_score, match_outcome
+from tfoosball.replay import MatchHistory, SLOTS
+
+MAX_SCORE = 10
+
+
+def synthetic_league(matches, players, spread, seed=None):
+    """
+    Generates matches between random lineups of players with hidden skills, the red team winning with
+    the Elo probability of the skill difference. Losers score a uniformly random number of goals.
+    :param spread: Standard deviation of hidden skills of players
+    :return: A MatchHistory that is not stored in the database
+    """
+    random = np.random.RandomState(seed)
+    skill = random.normal(0, spread, players)
+    slots = random.randint(0, players, (matches, len(SLOTS)))
+    while True:
+        ordered = np.sort(slots, axis=1)
+        duplicated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not duplicated.any():
+            break
+        slots[duplicated] = random.randint(0, players, (duplicated.sum(), len(SLOTS)))
+    team_skill = skill[slots[:, 0]] + skill[slots[:, 1]] - skill[slots[:, 2]] - skill[slots[:, 3]]
+    red_won = random.random_sample(matches) < expected_score(team_skill)
+    loser_score = random.randint(0, MAX_SCORE, matches)
+    red_score = np.where(red_won, MAX_SCORE, loser_score)
+    blue_score = np.where(red_won, loser_score, MAX_SCORE)
+    return MatchHistory(
+        np.arange(players), np.arange(matches), slots, red_score, blue_score,
+        np.full(matches, DEFAULT_STATUS), np.zeros(matches)
+    )
+
+
+class Command(BaseCommand):
+    help = 'Measures time of rating a synthetic league by every rating engine and accuracy of their predictions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--matches',
+            dest='matches',
+            default=10 ** 6,
+            type=int,
+            help='Number of matches in the league',
+        )
+        parser.add_argument(
+            '--players',
+            dest='players',
+            default=200,
+            type=int,
+            help='Number of players in the league',
+        )
+        parser.add_argument(
+            '--spread',
+            dest='spread',
+            default=100.0,
+            type=float,
+            help='Standard deviation of hidden skills of players',
+        )
+        parser.add_argument(
+            '--seed',
+            dest='seed',
+            default=None,
+            type=int,
+            help='Seed of the random generator, for repeatable leagues',
+        )
+
+    def handle(self, *args, **options):
+        history = synthetic_league(options['matches'], options['players'], options['spread'], options['seed'])
+        # Predictions are scored after the first half of the league, when ratings have settled
+        scored = slice(len(history) // 2, None)
+        outcome = match_outcome(history.red_score, history.blue_score)[scored]
+        self.stdout.write(f'{len(history)} matches of {len(history.member_ids)} players')
+        self.stdout.write(f'{"engine":<10}{"seconds":>10}{"matches/s":>12}{"brier":>10}{"log loss":>10}')
+        for name, engine in ENGINES.items():
+            start = time.perf_counter()
+            ratings = engine.replay(history)
+            elapsed = time.perf_counter() - start
+            expected = np.clip(ratings.expected[scored], 1e-9, 1 - 1e-9)
+            brier = np.mean((expected - outcome) ** 2)
+            log_loss = -np.mean(outcome * np.log(expected) + (1 - outcome) * np.log(1 - expected))
+            self.stdout.write(
+                f'{name:<10}{elapsed:>10.2f}{len(history) / elapsed:>12.0f}{brier:>10.4f}{log_loss:>10.4f}'
+            )
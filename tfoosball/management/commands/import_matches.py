@@ -0,0 +1,51 @@
+import os
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from tfoosball.importing import CHUNK_SIZE, FORMATS, MatchImportError, import_matches, read_rows
+from tfoosball.models import Team
+
+
+class Command(BaseCommand):
+    help = 'Imports matches of a team from a CSV or JSONL file, rating them in date order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, - reads standard input')
+        parser.add_argument(
+            '--team',
+            dest='team',
+            default=None,
+            help='Id of the team that played the matches',
+        )
+        parser.add_argument(
+            '--format',
+            dest='format',
+            default=None,
+            choices=FORMATS,
+            help='Format of the file, detected from its extension by default',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            dest='chunk_size',
+            default=CHUNK_SIZE,
+            type=int,
+            help='Number of rows written with a single insert',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if data_format not in FORMATS:
+            raise CommandError(f'Unknown format of {path}, use --format')
+        if not options['team'] or not Team.objects.filter(pk=options['team']).exists():
+            raise CommandError(f'Team {options["team"]} does not exist')
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            imported = import_matches(options['team'], read_rows(stream, data_format), options['chunk_size'])
+        except MatchImportError as e:
+            for line_num, error in e.errors:
+                self.stderr.write(f'Line {line_num}: {error}')
+            raise CommandError(f'Nothing was imported, {e}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(f'Imported {imported} matches')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from tfoosball.models import PairStats
+
+
+class Command(BaseCommand):
+    help = 'Recalculates partner and opponent statistics from the match history in a single pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--team',
+            dest='team',
+            default=None,
+            type=int,
+            help='Rebuild statistics of a single team only',
+        )
+
+    def handle(self, *args, **options):
+        created = PairStats.objects.rebuild(options['team'])
+        self.stdout.write(f'Created {created} pair statistics')
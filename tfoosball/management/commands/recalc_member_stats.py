@@ -1,37 +1,41 @@
 from django.core.management.base import BaseCommand
-from tfoosball.models import Member
+from django.db import transaction
+from tfoosball.models import Team
+from tfoosball.replay import replay_team
 
 
 class Command(BaseCommand):
     help = 'Recalculates members\' number of matches played and won on offence and on defence. Use wisely.'
 
-    def clear_stats(self, member):
-        member.offence_played = 0
-        member.defence_played = 0
-        member.offence_won = 0
-        member.defence_won = 0
-        member.win_streak = 0
-        member.lose_streak = 0
-        member.curr_win_streak = 0
-        member.curr_lose_streak = 0
-        member.exp = 1000
-
-    def update_member(self, member):
-        matches = member.get_matches().order_by('date')
-        for match in matches:
-            _, winner = match.calculate_points()
-            red_result, blue_result = match.get_team_result(winner)
-            if member == match.red_att:
-                member.after_match_update(match.points, red_result, True, save=False)
-            elif member == match.red_def:
-                member.after_match_update(match.points, red_result, False, save=False)
-            elif member == match.blue_att:
-                member.after_match_update(-match.points, blue_result, True, save=False)
-            elif member == match.blue_def:
-                member.after_match_update(-match.points, blue_result, False, save=False)
-        member.save()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--team',
+            dest='team',
+            default=None,
+            help='Recalculate only the team of given id',
+        )
+        parser.add_argument(
+            '--rerate',
+            dest='rerate',
+            default=False,
+            action='store_true',
+            help='Recompute points of every match with the rating engine of the team instead of using the stored ones',
+        )
+        parser.add_argument(
+            '--engine',
+            dest='engine',
+            default=None,
+            choices=[engine for engine, _ in Team.RATING_ENGINE_CHOICES],
+            help='Switch teams to the given rating engine and recompute points of their matches, implies --rerate',
+        )
 
     def handle(self, *args, **options):
-        for member in Member.objects.all():
-            self.clear_stats(member)
-            self.update_member(member)
+        teams = Team.objects.all()
+        if options['team']:
+            teams = teams.filter(pk=options['team'])
+        for team_id, name in teams.values_list('id', 'name'):
+            with transaction.atomic():
+                if options['engine']:
+                    Team.objects.filter(pk=team_id).update(rating_engine=options['engine'])
+                replayed = replay_team(team_id, rerate=options['rerate'] or bool(options['engine']))
+            self.stdout.write(f'{name}: replayed {replayed} matches')
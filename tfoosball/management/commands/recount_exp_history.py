@@ -1,10 +1,27 @@
 from django.core.management.base import BaseCommand
-from tfoosball.models import Match, ExpHistory, Member
+from tfoosball.models import Match, ExpHistory, LeaderboardEntry, Member
+from tfoosball.replay import HISTORY_CHUNK_SIZE, rebuild_exp_history
 
 
 class Command(BaseCommand):
     help = 'Deletes exp history and creates it from scratch'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            dest='rebuild',
+            default=False,
+            action='store_true',
+            help='Stream matches once and write the history with bulk inserts in a single transaction',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            dest='chunk_size',
+            default=HISTORY_CHUNK_SIZE,
+            type=int,
+            help='Number of history rows kept in memory before they are written',
+        )
+
     def delete_history(self):
         ExpHistory.objects.all().delete()
 
@@ -28,6 +45,11 @@ class Command(BaseCommand):
             Match.create_exp_history(match)
 
     def handle(self, *args, **options):
+        if options['rebuild']:
+            created = rebuild_exp_history(options['chunk_size'])
+            self.stdout.write(f'Created {created} exp history entries')
+            return
         self.delete_history()
         self.init_history()
         self.create_history()
+        LeaderboardEntry.objects.invalidate_history()
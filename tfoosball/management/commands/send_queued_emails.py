@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from api.emailing import BATCH_SIZE, MAX_ATTEMPTS, EmailWorker
+
+
+class Command(BaseCommand):
+    help = 'Sends queued emails, retrying failed deliveries with backoff. Runs until interrupted unless --once is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            dest='once',
+            default=False,
+            action='store_true',
+            help='Send a single batch of due emails and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            default=BATCH_SIZE,
+            type=int,
+            help='Number of emails claimed at once and sent over one connection',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            dest='max_attempts',
+            default=MAX_ATTEMPTS,
+            type=int,
+            help='Number of failed attempts after which an email is given up',
+        )
+        parser.add_argument(
+            '--interval',
+            dest='interval',
+            default=5.0,
+            type=float,
+            help='Number of seconds between polls of a drained queue',
+        )
+
+    def handle(self, *args, **options):
+        worker = EmailWorker(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+        if options['once']:
+            emails = worker.deliver()
+            sent = sum(email.status == email.SENT for email in emails)
+            self.stdout.write(f'Sent {sent} of {len(emails)} emails')
+            return
+        worker.run(options['interval'])
@@ -0,0 +1,95 @@
+from itertools import combinations
+
+import numpy as np
+
+from .models import Match, Member
+from .rating import expected_score
+
+# Three ways to split four players into two teams, as indices into a combination: red pair, then blue pair
+SPLITS = np.array([[0, 1, 2, 3], [0, 2, 1, 3], [0, 3, 1, 2]])
+HISTORY_SIZE = 30
+REPEAT_PENALTY = 0.05
+
+
+def lineups(size):
+    """
+    :return: Every 2 vs 2 lineup of players 0..size-1, one row per lineup: two red players, then two blue players
+    """
+    quads = np.fromiter(
+        (index for quad in combinations(range(size), 4) for index in quad), dtype=np.int64
+    ).reshape(-1, 4)
+    return quads[:, SPLITS].reshape(-1, 4)
+
+
+class Matchmaker:
+    """
+    Proposes the fairest matches among a pool of members: lineups closest to an even chance of winning,
+    with a penalty for teammates that have recently played together.
+    """
+
+    def __init__(self, member_ids, exp, preference, pairings, repeat_penalty=REPEAT_PENALTY):
+        """
+        :param member_ids: Ids of the members in the pool
+        :param exp: Exp of the members
+        :param preference: Preference of attack over defence, the member with a higher one plays in attack
+        :param pairings: Symmetric matrix with the number of recent matches played together by two members
+        """
+        self.member_ids = np.asarray(member_ids, dtype=np.int64)
+        self.exp = np.asarray(exp, dtype=np.int64)
+        self.preference = np.asarray(preference, dtype=float)
+        self.pairings = np.asarray(pairings, dtype=np.int64)
+        self.repeat_penalty = repeat_penalty
+
+    @classmethod
+    def load(cls, team_id, member_ids, history_size=HISTORY_SIZE, **kwargs):
+        """
+        Loads the members and their recent pairings with one query each.
+        :raises Member.DoesNotExist: Some of the members do not belong to the team
+        """
+        fields = ('id', 'exp', 'offence_won', 'offence_played', 'defence_won', 'defence_played')
+        rows = Member.objects.filter(team_id=team_id, pk__in=set(member_ids)).order_by('pk').values_list(*fields)
+        data = np.array(list(rows), dtype=np.int64).reshape(-1, len(fields))
+        if len(data) != len(set(member_ids)):
+            raise Member.DoesNotExist('Some of the members do not belong to the team')
+        ids = data[:, 0]
+        att_ratio = np.divide(data[:, 2], data[:, 3], out=np.zeros(len(ids)), where=data[:, 3] > 0)
+        def_ratio = np.divide(data[:, 4], data[:, 5], out=np.zeros(len(ids)), where=data[:, 5] > 0)
+
+        slots = tuple(f'{slot}_id' for slot in Match.SLOTS)
+        recent = Match.objects.by_team(team_id).order_by('-date').values_list(*slots)[:history_size]
+        recent = np.array(list(recent), dtype=np.int64).reshape(-1, len(slots))
+        pairs = np.concatenate([recent[:, :2], recent[:, 2:]])
+        pairs = pairs[np.isin(pairs, ids).all(axis=1)]
+        first, second = np.searchsorted(ids, pairs[:, 0]), np.searchsorted(ids, pairs[:, 1])
+        pairings = np.zeros((len(ids), len(ids)), dtype=np.int64)
+        np.add.at(pairings, (first, second), 1)
+        np.add.at(pairings, (second, first), 1)
+        return cls(ids, data[:, 1], att_ratio - def_ratio, pairings, **kwargs)
+
+    def propose(self, limit=5):
+        """
+        :param limit: Number of proposed matches
+        :return: A dict of arrays describing the best lineups, best first: `slots` with member ids ordered as
+        Match.SLOTS, the red team win probability `expected` and the number of recently repeated pairings `repeats`
+        """
+        candidates = lineups(len(self.member_ids))
+        exp = self.exp[candidates]
+        expected = expected_score((exp[:, 0] + exp[:, 1]) - (exp[:, 2] + exp[:, 3]))
+        repeats = self.pairings[candidates[:, 0], candidates[:, 1]] + self.pairings[candidates[:, 2], candidates[:, 3]]
+        score = np.abs(expected - 0.5) + self.repeat_penalty * repeats
+
+        limit = min(limit, len(candidates))
+        best = np.argpartition(score, limit - 1)[:limit]
+        best = best[np.lexsort((best, score[best]))]
+        slots = self.assign_positions(candidates[best])
+        return {'slots': self.member_ids[slots], 'expected': expected[best], 'repeats': repeats[best]}
+
+    def assign_positions(self, candidates):
+        """
+        :return: Lineups with players of each team ordered as attacker, defender
+        """
+        candidates = candidates.copy()
+        for first in (0, 2):
+            swap = self.preference[candidates[:, first + 1]] > self.preference[candidates[:, first]]
+            candidates[swap, first], candidates[swap, first + 1] = candidates[swap, first + 1], candidates[swap, first]
+        return candidates
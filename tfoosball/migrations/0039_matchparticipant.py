@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 15:58
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0038_auto_20180208_2044'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchParticipant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('side', models.IntegerField(choices=[(1, 'red'), (0, 'blue')])),
+                ('position', models.CharField(choices=[('att', 'attack'), ('def', 'defence')], max_length=3)),
+                ('date', models.DateTimeField()),
+                ('exp_delta', models.IntegerField()),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='tfoosball.Match')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='tfoosball.Member')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='matchparticipant',
+            index=models.Index(fields=['member', 'date'], name='participant_member_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='matchparticipant',
+            unique_together=set([('match', 'side', 'position')]),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+SLOTS = (('red_att', 1, 'att'), ('red_def', 1, 'def'), ('blue_att', 0, 'att'), ('blue_def', 0, 'def'))
+BATCH_SIZE = 2000
+
+
+def create_participants(apps, schema_editor):
+    Match = apps.get_model('tfoosball', 'Match')
+    MatchParticipant = apps.get_model('tfoosball', 'MatchParticipant')
+    fields = ['id', 'date', 'points'] + [f'{slot}_id' for slot, _, _ in SLOTS]
+    participants = []
+    for match in Match.objects.values(*fields).iterator():
+        for slot, side, position in SLOTS:
+            participants.append(MatchParticipant(
+                match_id=match['id'],
+                member_id=match[f'{slot}_id'],
+                side=side,
+                position=position,
+                date=match['date'],
+                exp_delta=match['points'] if side == 1 else -match['points'],
+            ))
+        if len(participants) >= BATCH_SIZE:
+            MatchParticipant.objects.bulk_create(participants)
+            participants = []
+    MatchParticipant.objects.bulk_create(participants)
+
+
+def delete_participants(apps, schema_editor):
+    apps.get_model('tfoosball', 'MatchParticipant').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0039_matchparticipant'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_participants, delete_participants),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 15:59
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0040_backfill_match_participants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='team',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='tfoosball.Team'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team', '-date'], name='match_team_date_idx'),
+        ),
+    ]
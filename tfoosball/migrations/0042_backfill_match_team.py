@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def set_match_team(apps, schema_editor):
+    Match = apps.get_model('tfoosball', 'Match')
+    Team = apps.get_model('tfoosball', 'Team')
+    for team_id in Team.objects.values_list('id', flat=True):
+        Match.objects.filter(team__isnull=True, red_att__team_id=team_id).update(team_id=team_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0041_match_team'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_match_team, migrations.RunPython.noop),
+    ]
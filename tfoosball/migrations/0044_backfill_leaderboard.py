@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def create_leaderboards(apps, schema_editor):
+    Member = apps.get_model('tfoosball', 'Member')
+    LeaderboardEntry = apps.get_model('tfoosball', 'LeaderboardEntry')
+    Team = apps.get_model('tfoosball', 'Team')
+    for team_id in Team.objects.values_list('id', flat=True):
+        members = Member.objects.filter(team_id=team_id, is_accepted=True).order_by('-exp', 'pk')
+        LeaderboardEntry.objects.bulk_create([
+            LeaderboardEntry(member_id=pk, team_id=team_id, exp=exp, rank=rank)
+            for rank, (pk, exp) in enumerate(members.values_list('pk', 'exp'), start=1)
+        ])
+
+
+def delete_leaderboards(apps, schema_editor):
+    apps.get_model('tfoosball', 'LeaderboardEntry').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0043_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_leaderboards, delete_leaderboards),
+    ]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# Events are inserted in chunks of this size; Django splits each chunk further at the limit of the database
+BATCH_SIZE = 1000
+
+
+def link(member):
+    return f'***[{member.username}](/profile/{member.username}/stats)***'
+
+
+def create_events(apps, schema_editor):
+    # Historical models have no methods, so the content is rendered as by Member and Match event getters
+    Event = apps.get_model('tfoosball', 'Event')
+    Match = apps.get_model('tfoosball', 'Match')
+    Member = apps.get_model('tfoosball', 'Member')
+    PlayerPlaceholder = apps.get_model('tfoosball', 'PlayerPlaceholder')
+    emails = dict(PlayerPlaceholder.objects.values_list('member_id', 'email'))
+    events = []
+    for member in Member.objects.select_related('player').iterator():
+        email = member.player.email if member.player else emails.get(member.id)
+        if member.invitation_date and email:
+            events.append(Event(
+                team_id=member.team_id, member_id=member.id, date=member.invitation_date, type='invitation',
+                event=f'Invitation to ***{email}*** has been sent',
+            ))
+        if member.joined_date:
+            events.append(Event(
+                team_id=member.team_id, member_id=member.id, date=member.joined_date, type='joined',
+                event=f'Member {link(member)} has joined',
+            ))
+        if len(events) >= BATCH_SIZE:
+            Event.objects.bulk_create(events)
+            events = []
+    matches = Match.objects.filter(team__isnull=False).select_related('red_att', 'red_def', 'blue_att', 'blue_def')
+    for match in matches.iterator():
+        events.append(Event(
+            team_id=match.team_id, match_id=match.id, date=match.date, type='match',
+            event=f'Match was played: {link(match.red_def)}, {link(match.red_att)} vs. '
+                  f'{link(match.blue_att)}, {link(match.blue_def)}.' + '\n\n'
+                  f'###### Score: **{match.red_score}**&nbsp;-&nbsp;**{match.blue_score}**',
+        ))
+        if len(events) >= BATCH_SIZE:
+            Event.objects.bulk_create(events)
+            events = []
+    Event.objects.bulk_create(events)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0045_event'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:34
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0046_backfill_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PairStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('relation', models.CharField(choices=[('partner', 'partner'), ('opponent', 'opponent')], max_length=8)),
+                ('games', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('exp', models.IntegerField(default=0)),
+                ('member', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pair_stats', to='tfoosball.Member')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tfoosball.Member')),
+                ('team', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pair_stats', to='tfoosball.Team')),
+            ],
+            options={
+                'verbose_name_plural': 'pair stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pairstats',
+            index=models.Index(fields=['team', 'relation'], name='pairstats_team_relation_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='pairstats',
+            unique_together=set([('member', 'relation', 'other')]),
+        ),
+    ]
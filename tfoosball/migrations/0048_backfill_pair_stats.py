@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+SIDES = (('red_att', 'red_def'), ('blue_att', 'blue_def'))
+
+
+def create_pair_stats(apps, schema_editor):
+    # Historical models have no manager methods, so pairs are counted as by PairStatsManager.deltas
+    Match = apps.get_model('tfoosball', 'Match')
+    PairStats = apps.get_model('tfoosball', 'PairStats')
+    fields = ('team_id', 'red_att_id', 'red_def_id', 'blue_att_id', 'blue_def_id', 'red_score', 'blue_score', 'points')
+    totals = {}
+    for values in Match.objects.filter(team__isnull=False).values_list(*fields).iterator():
+        match = dict(zip(fields, values))
+        for side, rivals in (SIDES, SIDES[::-1]):
+            is_red = side[0].startswith('red')
+            won = match['red_score'] > match['blue_score'] if is_red else match['blue_score'] > match['red_score']
+            exp = match['points'] if is_red else -match['points']
+            for member in side:
+                pairs = [(other, 'partner') for other in side if other != member]
+                pairs += [(other, 'opponent') for other in rivals]
+                for other, relation in pairs:
+                    key = (match['team_id'], match[f'{member}_id'], relation, match[f'{other}_id'])
+                    total = totals.setdefault(key, [0, 0, 0])
+                    total[0] += 1
+                    total[1] += won
+                    total[2] += exp
+    PairStats.objects.bulk_create([
+        PairStats(team_id=team_id, member_id=member_id, relation=relation, other_id=other_id,
+                  games=games, wins=wins, exp=exp)
+        for (team_id, member_id, relation, other_id), (games, wins, exp) in totals.items()
+    ])
+
+
+def delete_pair_stats(apps, schema_editor):
+    apps.get_model('tfoosball', 'PairStats').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0047_pairstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_pair_stats, delete_pair_stats),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:42
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0048_backfill_pair_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='rating_deviation',
+            field=models.FloatField(default=350.0),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='volatility',
+            field=models.FloatField(default=0.06),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='rating_engine',
+            field=models.CharField(choices=[('elo', 'Elo'), ('glicko2', 'Glicko-2')], default='elo', max_length=16),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:47
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tfoosball', '0049_rating_engines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='history_version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='exphistory',
+            index=models.Index(fields=['player', 'date', 'exp'], name='exphistory_player_date_exp_idx'),
+        ),
+    ]
@@ -1,12 +1,16 @@
 from datetime import timedelta
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.signing import TimestampSigner
-from django.db import models
-from django.db.models import Q, Func
+from django.db import models, transaction
+from django.db.models import F, Func, OuterRef, Q, Subquery
 from django.core.validators import RegexValidator
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+from .db import ADD, EXCLUDED, bulk_create, bulk_update, upsert
+from .rating import ELO, GLICKO2, INITIAL_DEVIATION, INITIAL_VOLATILITY, get_engine
+
 
 class Round(Func):
     function = 'ROUND'
@@ -15,9 +19,16 @@ class Round(Func):
 
 
 class Team(models.Model):
+    RATING_ENGINE_CHOICES = (
+        (ELO, 'Elo'),
+        (GLICKO2, 'Glicko-2'),
+    )
     alphanumeric = RegexValidator(r'^[0-9a-zA-Z]+$', 'Only alphanumeric characters are allowed.')
     domain = models.CharField(max_length=32, validators=[alphanumeric])
     name = models.CharField(max_length=32, unique=True)
+    rating_engine = models.CharField(max_length=16, choices=RATING_ENGINE_CHOICES, default=ELO)
+    # Incremented whenever exp history of past days changes, versions cached historical leaderboards
+    history_version = models.IntegerField(default=0)
 
     def __str__(self):
         return self.name
@@ -29,28 +40,15 @@ class Player(AbstractUser):
     default_team = models.ForeignKey(Team, blank=True, null=True, related_name='default_team', on_delete=models.CASCADE)
 
 
-class MemberQuerySet(models.QuerySet):
-    def get_events(self):
-        events = []
-        for member in self.all():
-            events.append(member.get_invitation_event())
-            events.append(member.get_joined_event())
-        return list(filter(None, events))
-
-
-class MemberManager(models.Manager):
-    def get_queryset(self):
-        return MemberQuerySet(self.model, using=self._db)
-
-    def get_events(self):
-        return self.get_queryset().get_events()
-
-
 class Member(models.Model):
     WINNER = 1
     LOSER = 0
     username_len = 32
-    objects = MemberManager()
+    STAT_FIELDS = (
+        'exp', 'offence_won', 'defence_won', 'offence_played', 'defence_played', 'win_streak', 'curr_win_streak',
+        'lose_streak', 'curr_lose_streak', 'lowest_exp', 'highest_exp',
+    )
+    RATING_FIELDS = ('rating_deviation', 'volatility')
 
     class Meta:
         unique_together = (('team', 'username'),)
@@ -69,6 +67,8 @@ class Member(models.Model):
     curr_lose_streak = models.IntegerField(default=0)
     lowest_exp = models.IntegerField(default=1000)
     highest_exp = models.IntegerField(default=1000)
+    rating_deviation = models.FloatField(default=INITIAL_DEVIATION)
+    volatility = models.FloatField(default=INITIAL_VOLATILITY)
     is_team_admin = models.BooleanField(default=False)
     is_accepted = models.BooleanField(default=False)
     hidden = models.BooleanField(default=False)
@@ -104,7 +104,7 @@ class Member(models.Model):
         return round(self.won / self.played if self.played > 0 else 0, 2)
 
     def get_matches(self):
-        return Match.objects.filter(Q(red_att=self.id) | Q(red_def=self.id) | Q(blue_att=self.id) | Q(blue_def=self.id))
+        return Match.objects.filter(participants__member=self.id)
 
     def update_extremes(self):
         self.win_streak = max(self.curr_win_streak, self.win_streak)
@@ -143,6 +143,15 @@ class Member(models.Model):
         if save:
             self.save()
 
+    @staticmethod
+    def save_stats(members):
+        """
+        Stores statistics and ratings of given members with a single UPDATE statement, bypassing Member signals.
+        """
+        fields = Member.STAT_FIELDS + Member.RATING_FIELDS
+        rows = {member.pk: {field: getattr(member, field) for field in fields} for member in members}
+        bulk_update(Member, rows, fields)
+
     @staticmethod
     def create_member(username, email, team_id, is_accepted=False, **kwargs):
         member_data = {'team_id': team_id, 'username': username, 'is_accepted': is_accepted}
@@ -160,12 +169,14 @@ class Member(models.Model):
             is_placeholder = True
         return member, is_placeholder
 
+    @staticmethod
+    def sign_activation_code(email, team_name):
+        return TimestampSigner().sign('{0}:{1}'.format(email, team_name))
+
     def generate_activation_code(self):
         email = self.player.email if self.player else self.placeholder.first().email
-        value = '{0}:{1}'.format(email, self.team.name)
-        signer = TimestampSigner()
-        self.activation_code = signer.sign(value)
-        self.save()
+        self.activation_code = Member.sign_activation_code(email, self.team.name)
+        self.save(update_fields=['activation_code'])
         return self.activation_code
 
     def activate(self):
@@ -183,12 +194,12 @@ class Member(models.Model):
         self.hidden = False
         self.activation_code = ''
         self.joined_date = timezone.now()
-        self.save()
+        self.save(update_fields=['hidden', 'activation_code', 'joined_date'])
 
-    def get_invitation_event(self):
+    def get_invitation_event(self, email=None):
         return {
             'date': self.invitation_date,
-            'event': f'Invitation to ***{self.get_email()}*** has been sent',
+            'event': f'Invitation to ***{email or self.get_email()}*** has been sent',
             'type': 'invitation'
         } if self.invitation_date else None
 
@@ -226,23 +237,10 @@ class PlayerPlaceholder(models.Model):
 
 class MatchQuerySet(models.QuerySet):
     def by_team(self, team_id):
-        return self.filter(
-            Q(red_att__team__id=team_id) &
-            Q(red_def__team__id=team_id) &
-            Q(blue_att__team__id=team_id) &
-            Q(blue_def__team__id=team_id)
-        )
+        return self.filter(team_id=team_id)
 
     def by_username(self, username):
-        return self.filter(
-            Q(red_att__username=username) |
-            Q(red_def__username=username) |
-            Q(blue_att__username=username) |
-            Q(blue_def__username=username)
-        )
-
-    def get_events(self):
-        return [match.get_event() for match in self.all()]
+        return self.filter(participants__member__username=username)
 
 
 class MatchManager(models.Manager):
@@ -255,14 +253,12 @@ class MatchManager(models.Manager):
     def by_username(self, username):
         return self.get_queryset().by_username(username)
 
-    def get_events(self):
-        return self.get_queryset().get_events()
-
 
 class Match(models.Model):
     RED = 1
     BLUE = 0
     TIE = 0.5
+    SLOTS = ('red_att', 'red_def', 'blue_att', 'blue_def')
 
     WINNER_CHOICES = (
         (RED, 'red'),
@@ -273,7 +269,13 @@ class Match(models.Model):
 
     class Meta:
         verbose_name_plural = "matches"
+        indexes = [
+            models.Index(fields=['team', '-date'], name='match_team_date_idx'),
+        ]
 
+    team = models.ForeignKey(
+        Team, related_name='matches', on_delete=models.CASCADE, blank=True, null=True, db_index=False
+    )
     red_att = models.ForeignKey(Member, related_name='red_att', on_delete=models.CASCADE)
     red_def = models.ForeignKey(Member, related_name='red_def', on_delete=models.CASCADE)
     blue_att = models.ForeignKey(Member, related_name='blue_att', on_delete=models.CASCADE)
@@ -290,15 +292,56 @@ class Match(models.Model):
 
     @staticmethod
     def create_exp_history(match):
+        """
+        Creates or updates daily ExpHistory entries of all players with a single INSERT ... ON CONFLICT statement.
+        """
+        date = ExpHistory.day(match.date)
+        rows = {}
         for player in match.users:
-            try:
-                eh = ExpHistory.objects.get(player=player, date=match.date)
-            except ExpHistory.DoesNotExist:
-                eh = ExpHistory(player=player, date=match.date, matches_played=0)
-            eh.exp = player.exp
-            eh.match = match
-            eh.matches_played += 1
-            eh.save()
+            row = rows.setdefault(player.pk, {'player_id': player.pk, 'date': date, 'matches_played': 0})
+            row.update(exp=player.exp, match_id=match.pk)
+            row['matches_played'] += 1
+        upsert(
+            ExpHistory, list(rows.values()), ('player_id', 'date'),
+            {'exp': EXCLUDED, 'match_id': EXCLUDED, 'matches_played': ADD}
+        )
+
+    def lock_players(self):
+        """
+        Locks rows of all players in primary key order, so concurrent matches sharing players cannot deadlock,
+        and refreshes their statistics from the locked rows. Players that are not cached yet are fetched.
+        Needs to be called within a transaction.
+        """
+        ids = [getattr(self, f'{slot}_id') for slot in self.SLOTS]
+        locked = {m.pk: m for m in Member.objects.select_for_update().filter(pk__in=ids).order_by('pk')}
+        for slot, member_id in zip(self.SLOTS, ids):
+            field = self._meta.get_field(slot)
+            if member_id not in locked:
+                continue
+            if not hasattr(self, field.get_cache_name()):
+                setattr(self, slot, locked[member_id])
+                continue
+            member = getattr(self, slot)
+            for stat in Member.STAT_FIELDS + Member.RATING_FIELDS:
+                setattr(member, stat, getattr(locked[member_id], stat))
+
+    def update_participants(self, created):
+        """
+        Stores the match in the MatchParticipant index, replacing previous entries of an updated match.
+        """
+        if not created:
+            self.participants.all().delete()
+        MatchParticipant.objects.bulk_create([
+            MatchParticipant(
+                match_id=self.pk,
+                member_id=getattr(self, f'{slot}_id'),
+                side=Match.RED if slot.startswith('red') else Match.BLUE,
+                position=slot.rsplit('_', 1)[1],
+                date=self.date,
+                exp_delta=self.points if slot.startswith('red') else -self.points,
+            )
+            for slot in self.SLOTS
+        ])
 
     def get_team_result(self, winner):
         if winner == Match.RED:
@@ -309,29 +352,51 @@ class Match(models.Model):
 
     def update_players(self, winner):
         red_result, blue_result = self.get_team_result(winner)
-        self.red_att.after_match_update(self.points, red_result, True)
-        self.red_def.after_match_update(self.points, red_result, False)
-        self.blue_att.after_match_update(-self.points, blue_result, True)
-        self.blue_def.after_match_update(-self.points, blue_result, False)
+        self.red_att.after_match_update(self.points, red_result, True, save=False)
+        self.red_def.after_match_update(self.points, red_result, False, save=False)
+        self.blue_att.after_match_update(-self.points, blue_result, True, save=False)
+        self.blue_def.after_match_update(-self.points, blue_result, False, save=False)
+        for slot, deviation, volatility in zip(self.SLOTS, *self._ratings):
+            member = getattr(self, slot)
+            member.rating_deviation, member.volatility = deviation, volatility
+        Member.save_stats(self.users)
+
+    def get_rating_engine(self):
+        """
+        :return: Name of the rating engine of the team. It is read by a separate query, so that the team row
+        is not locked along with the players
+        """
+        if getattr(self, '_rating_engine', None) is None:
+            team_id = self.team_id or self.red_att.team_id
+            self._rating_engine = Team.objects.values_list('rating_engine', flat=True).get(pk=team_id)
+        return self._rating_engine
 
     def calculate_points(self):
         """
+        Rates the match with the rating engine of the team. New deviations and volatilities of players are kept
+        to be stored by update_players.
         :return: The amount of points that red team should gain and information about winner mapped as in WINNER_CHOICES
         """
         assert(self.red_score >= 0 and self.blue_score >= 0)
-        K = int(self.status)
-        G = (11 + abs(self.red_score - self.blue_score)) / 8
-        dr = ((self.red_att.exp + self.red_def.exp) - (self.blue_att.exp + self.blue_def.exp))
-        We = 1 / ((10 ** -(dr / 400)) + 1)
+        users = [getattr(self, slot) for slot in self.SLOTS]
+        points, *self._ratings, _ = get_engine(self.get_rating_engine()).rate(
+            [member.exp for member in users], [member.rating_deviation for member in users],
+            [member.volatility for member in users], self.status, self.red_score, self.blue_score
+        )
         W = 0.5 if self.red_score == self.blue_score else (1 if self.red_score > self.blue_score else 0)
-        return int(K * G * (W - We)), W
+        return points, W
 
     def save(self, *args, **kwargs):
-        self.points, winner = self.calculate_points()
-        self.update_players(winner)
-        if not self.date:
-            self.date = timezone.now()
-        super(Match, self).save(*args, **kwargs)
+        with transaction.atomic():
+            self.lock_players()
+            self.points, winner = self.calculate_points()
+            self.update_players(winner)
+            if not self.date:
+                self.date = timezone.now()
+            if not self.team_id:
+                self.team_id = self.red_att.team_id
+            super(Match, self).save(*args, **kwargs)
+            LeaderboardEntry.objects.move(self.users)
 
     def __str__(self):
         return f'Match {self.red_def.username} {self.red_att.username} - ' \
@@ -339,26 +404,67 @@ class Match(models.Model):
                f'[{self.red_score} - {self.blue_score}]'
 
     def get_event(self):
-        rdname = self.red_def.username
-        rdlink = self.red_def.get_profile_link()
-        raname = self.red_att.username
-        ralink = self.red_att.get_profile_link()
-        bdname = self.blue_def.username
-        bdlink = self.blue_def.get_profile_link()
-        baname = self.blue_att.username
-        balink = self.blue_att.get_profile_link()
         return {
             'date': self.date,
-            'event': f'Match was played: ***[{rdname}]({rdlink})***, ***[{raname}]({ralink})*** vs. '
-                     f'***[{baname}]({balink})***, ***[{bdname}]({bdlink})***.' + '\n\n'
-                     f'###### Score: **{self.red_score}**&nbsp;-&nbsp;**{self.blue_score}**',
+            'event': Match.format_event(
+                self.red_att, self.red_def, self.blue_att, self.blue_def, self.red_score, self.blue_score
+            ),
             'type': 'match'
         }
 
+    @staticmethod
+    def format_event(red_att, red_def, blue_att, blue_def, red_score, blue_score):
+        rdname = red_def.username
+        rdlink = red_def.get_profile_link()
+        raname = red_att.username
+        ralink = red_att.get_profile_link()
+        bdname = blue_def.username
+        bdlink = blue_def.get_profile_link()
+        baname = blue_att.username
+        balink = blue_att.get_profile_link()
+        return f'Match was played: ***[{rdname}]({rdlink})***, ***[{raname}]({ralink})*** vs. ' \
+               f'***[{baname}]({balink})***, ***[{bdname}]({bdlink})***.' + '\n\n' \
+               f'###### Score: **{red_score}**&nbsp;-&nbsp;**{blue_score}**'
+
+
+class MatchParticipant(models.Model):
+    """
+    Denormalized index of match participation, one row per player of a match.
+    Allows per-member match lookups with a single (member, date) index instead of a four-way OR.
+    """
+    ATTACK = 'att'
+    DEFENCE = 'def'
+
+    SIDE_CHOICES = (
+        (Match.RED, 'red'),
+        (Match.BLUE, 'blue'),
+    )
+    POSITION_CHOICES = (
+        (ATTACK, 'attack'),
+        (DEFENCE, 'defence'),
+    )
+
+    class Meta:
+        unique_together = (('match', 'side', 'position'),)
+        indexes = [
+            models.Index(fields=['member', 'date'], name='participant_member_date_idx'),
+        ]
+
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='participants')
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='participations')
+    side = models.IntegerField(choices=SIDE_CHOICES)
+    position = models.CharField(max_length=3, choices=POSITION_CHOICES)
+    date = models.DateTimeField()
+    exp_delta = models.IntegerField()
+
 
 class ExpHistory(models.Model):
     class Meta:
         unique_together = (('player', 'date'),)
+        indexes = [
+            # Covers latest-row-per-member lookups of LeaderboardManager.as_of, which then read no table rows
+            models.Index(fields=['player', 'date', 'exp'], name='exphistory_player_date_exp_idx'),
+        ]
 
     player = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='exp_history')
     date = models.DateField(blank=True)
@@ -371,6 +477,376 @@ class ExpHistory(models.Model):
             self.date = timezone.now().date()
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def day(value):
+        """
+        :return: Date of the history entry that a datetime belongs to, as the date field would store it
+        """
+        return ExpHistory._meta.get_field('date').to_python(value)
+
+
+class LeaderboardQuerySet(models.QuerySet):
+    def by_team(self, team_id):
+        return self.filter(team_id=team_id)
+
+    def ranked(self):
+        return self.order_by('rank')
+
+
+class LeaderboardManager(models.Manager):
+    """
+    Maintains a materialized ranking of accepted members of every team, ordered by exp (descending) and member id.
+    All changes of a team's ranking are serialized by locking the team row.
+    """
+    def get_queryset(self):
+        return LeaderboardQuerySet(self.model, using=self._db)
+
+    def by_team(self, team_id):
+        return self.get_queryset().by_team(team_id)
+
+    @staticmethod
+    def lock_team(team_id):
+        list(Team.objects.select_for_update().filter(pk=team_id).values_list('pk', flat=True))
+
+    def insert(self, member):
+        with transaction.atomic(savepoint=False):
+            self.lock_team(member.team_id)
+            entries = self.by_team(member.team_id)
+            above = Q(exp__gt=member.exp) | Q(exp=member.exp, member_id__lt=member.pk)
+            rank = entries.filter(above).count() + 1
+            entries.filter(rank__gte=rank).update(rank=F('rank') + 1)
+            self.create(member_id=member.pk, team_id=member.team_id, exp=member.exp, rank=rank)
+
+    def remove(self, member):
+        with transaction.atomic(savepoint=False):
+            self.lock_team(member.team_id)
+            entry = self.filter(member_id=member.pk).first()
+            if entry is None:
+                return
+            self.by_team(entry.team_id).filter(rank__gt=entry.rank).update(rank=F('rank') - 1)
+            entry.delete()
+
+    def move(self, members):
+        """
+        Moves entries of given members of a single team to their current exp.
+        Only entries with exp between the lowest and the highest of old and new values can change their rank,
+        and they occupy a contiguous range of ranks, so just that range is read and renumbered.
+        """
+        members = {member.pk: member for member in members}
+        if not members:
+            return
+        team_id = next(iter(members.values())).team_id
+        with transaction.atomic(savepoint=False):
+            self.lock_team(team_id)
+            old = dict(self.filter(member_id__in=members.keys()).values_list('member_id', 'exp'))
+            moved = {pk: members[pk].exp for pk in old if old[pk] != members[pk].exp}
+            if not moved:
+                return
+            exps = list(moved.values()) + [old[pk] for pk in moved]
+            block = list(self.by_team(team_id).filter(exp__range=(min(exps), max(exps))).values_list(
+                'member_id', 'exp', 'rank'
+            ))
+            start = min(rank for _, _, rank in block)
+            ordered = sorted(((-moved.get(pk, exp), pk, rank) for pk, exp, rank in block))
+            rows = {
+                pk: {'exp': -neg_exp, 'rank': start + index}
+                for index, (neg_exp, pk, rank) in enumerate(ordered)
+                if pk in moved or rank != start + index
+            }
+            bulk_update(LeaderboardEntry, rows, ('exp', 'rank'))
+
+    def sync(self, member):
+        """
+        Brings the member's entry in line with its acceptance and exp.
+        """
+        exp = self.filter(member_id=member.pk).values_list('exp', flat=True).first()
+        if member.is_accepted and exp is None:
+            self.insert(member)
+        elif not member.is_accepted and exp is not None:
+            self.remove(member)
+        elif exp is not None and exp != member.exp:
+            self.move([member])
+
+    def rebuild(self, team_id):
+        with transaction.atomic(savepoint=False):
+            self.lock_team(team_id)
+            self.by_team(team_id).delete()
+            members = Member.objects.filter(team_id=team_id, is_accepted=True).order_by('-exp', 'pk')
+            self.bulk_create([
+                LeaderboardEntry(member_id=pk, team_id=team_id, exp=exp, rank=rank)
+                for rank, (pk, exp) in enumerate(members.values_list('pk', 'exp'), start=1)
+            ])
+
+    def top(self, team_id, size):
+        return self.by_team(team_id).filter(rank__lte=size).ranked().select_related('member')
+
+    @staticmethod
+    def as_of(team_id, date):
+        """
+        Ranks accepted members of the team by their exp at the end of the given day, read from the latest ExpHistory
+        row of each member at or before the date. Members without history by then are not ranked.
+        :return: A list of (member id, exp) tuples ordered by rank
+        """
+        latest = ExpHistory.objects.filter(player=OuterRef('pk'), date__lte=date).order_by('-date')
+        members = Member.objects.filter(team_id=team_id, is_accepted=True).annotate(
+            history_exp=Subquery(latest.values('exp')[:1], output_field=models.IntegerField())
+        )
+        # Filtering on the annotation would repeat the subquery in WHERE, so members without history are skipped here
+        rows = members.order_by('-history_exp', 'pk').values_list('pk', 'history_exp')
+        return [(pk, exp) for pk, exp in rows if exp is not None]
+
+    def historical(self, team_id, date):
+        """
+        Ranking of the team as of the given date, see as_of. Rankings of past days are cached without expiration
+        under the team's history version, so only a change of the past history makes them stale.
+        :raises Team.DoesNotExist:
+        """
+        version = Team.objects.values_list('history_version', flat=True).get(pk=team_id)
+        if date >= ExpHistory.day(timezone.now()):
+            return self.as_of(team_id, date)
+        key = f'leaderboard:{team_id}:{version}:{date.isoformat()}'
+        ranking = cache.get(key)
+        if ranking is None:
+            ranking = self.as_of(team_id, date)
+            cache.set(key, ranking, None)
+        return ranking
+
+    @staticmethod
+    def invalidate_history(team_id=None):
+        """
+        Makes cached historical rankings of the team, or of all teams, stale.
+        """
+        teams = Team.objects.all() if team_id is None else Team.objects.filter(pk=team_id)
+        teams.update(history_version=F('history_version') + 1)
+
+    def around(self, team_id, member_id, distance):
+        """
+        :raises LeaderboardEntry.DoesNotExist: The member is not ranked within the team
+        :return: Entries ranked at most `distance` positions above or below the member
+        """
+        rank = self.by_team(team_id).values_list('rank', flat=True).get(member_id=member_id)
+        entries = self.by_team(team_id).filter(rank__range=(rank - distance, rank + distance))
+        return entries.ranked().select_related('member')
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Position of an accepted member in the ranking of its team.
+    """
+    objects = LeaderboardManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['team', 'rank'], name='leaderboard_team_rank_idx'),
+            models.Index(fields=['team', 'exp'], name='leaderboard_team_exp_idx'),
+        ]
+
+    member = models.OneToOneField(
+        Member, primary_key=True, on_delete=models.CASCADE, related_name='leaderboard_entry'
+    )
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='leaderboard', db_index=False)
+    exp = models.IntegerField()
+    rank = models.IntegerField()
+
+
+class PairStatsManager(models.Manager):
+    """
+    Maintains statistics of ordered pairs of members that played together or against each other.
+    Every match adds one row per partner and per opponent of each of its players, twelve in total.
+    """
+    SIDES = (('red_att', 'red_def'), ('blue_att', 'blue_def'))
+    PAIRS = tuple(
+        (member, other, 'partner') for side in SIDES for member in side for other in side if member != other
+    ) + tuple(
+        (member, other, 'opponent') for side, rivals in (SIDES, SIDES[::-1]) for member in side for other in rivals
+    )
+    FIELDS = tuple(f'{slot}_id' for slot in Match.SLOTS) + ('red_score', 'blue_score', 'points')
+
+    def deltas(self, rows, sign=1, totals=None):
+        """
+        Adds statistics of matches to the totals.
+        :param rows: Tuples of the match team id and values of FIELDS
+        :param sign: 1 to add the matches, -1 to subtract them
+        :param totals: A dict mapping (team id, member id, relation, other id) to [games, wins, exp]
+        :return: The totals
+        """
+        totals = {} if totals is None else totals
+        for team_id, *values in rows:
+            match = dict(zip(self.FIELDS, values))
+            red_won = match['red_score'] > match['blue_score']
+            blue_won = match['blue_score'] > match['red_score']
+            for member, other, relation in self.PAIRS:
+                is_red = member.startswith('red')
+                total = totals.setdefault((team_id, match[f'{member}_id'], relation, match[f'{other}_id']), [0, 0, 0])
+                total[0] += sign
+                total[1] += sign * (red_won if is_red else blue_won)
+                total[2] += sign * (match['points'] if is_red else -match['points'])
+        return totals
+
+    def match_row(self, match):
+        return (match.team_id,) + tuple(getattr(match, field) for field in self.FIELDS)
+
+    def apply(self, totals):
+        """
+        Adds the totals to the stored statistics with a single INSERT ... ON CONFLICT statement.
+        """
+        rows = [
+            {
+                'team_id': team_id, 'member_id': member_id, 'relation': relation, 'other_id': other_id,
+                'games': games, 'wins': wins, 'exp': exp,
+            }
+            for (team_id, member_id, relation, other_id), (games, wins, exp) in totals.items()
+            if games or wins or exp
+        ]
+        upsert(
+            PairStats, rows, ('member_id', 'relation', 'other_id'), {'games': ADD, 'wins': ADD, 'exp': ADD}
+        )
+
+    def rebuild(self, team_id=None):
+        """
+        Recalculates statistics of all pairs of the team, or of all teams, in a single pass over matches.
+        :return: Number of stored pairs
+        """
+        matches = Match.objects.all() if team_id is None else Match.objects.by_team(team_id)
+        with transaction.atomic():
+            totals = self.deltas(matches.values_list('team_id', *self.FIELDS).iterator())
+            (self.all() if team_id is None else self.filter(team_id=team_id)).delete()
+            bulk_create(PairStats, [
+                PairStats(
+                    team_id=team, member_id=member_id, relation=relation, other_id=other_id,
+                    games=games, wins=wins, exp=exp
+                )
+                for (team, member_id, relation, other_id), (games, wins, exp) in totals.items()
+            ])
+        return len(totals)
+
+
+class PairStats(models.Model):
+    """
+    Games, wins and exp gained by a member when playing with (partner) or against (opponent) another member.
+    """
+    PARTNER = 'partner'
+    OPPONENT = 'opponent'
+
+    RELATION_CHOICES = (
+        (PARTNER, 'partner'),
+        (OPPONENT, 'opponent'),
+    )
+    objects = PairStatsManager()
+
+    class Meta:
+        verbose_name_plural = 'pair stats'
+        unique_together = (('member', 'relation', 'other'),)
+        indexes = [
+            models.Index(fields=['team', 'relation'], name='pairstats_team_relation_idx'),
+        ]
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='pair_stats', db_index=False)
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='pair_stats', db_index=False)
+    other = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='+')
+    relation = models.CharField(max_length=8, choices=RELATION_CHOICES)
+    games = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    exp = models.IntegerField(default=0)
+
+    @property
+    def win_ratio(self):
+        return self.wins / self.games if self.games else 0
+
+
+class Event(models.Model):
+    """
+    Log of club events with pre-rendered content, as displayed in the events feed.
+    Match events follow their match: they are updated when it is edited and deleted with it.
+    """
+    MATCH = 'match'
+    INVITATION = 'invitation'
+    JOINED = 'joined'
+
+    TYPE_CHOICES = (
+        (MATCH, 'match'),
+        (INVITATION, 'invitation'),
+        (JOINED, 'joined'),
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['team', '-date'], name='event_team_date_idx'),
+        ]
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='events', db_index=False)
+    date = models.DateTimeField()
+    type = models.CharField(max_length=16, choices=TYPE_CHOICES)
+    event = models.TextField()
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='events', blank=True, null=True)
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='events', blank=True, null=True)
+
+    @staticmethod
+    def log(team_id, payload, **kwargs):
+        return Event.objects.create(
+            team_id=team_id, date=payload['date'], type=payload['type'], event=payload['event'], **kwargs
+        )
+
+    def as_message(self):
+        return {'id': self.id, 'date': self.date.isoformat(), 'type': self.type, 'event': self.event}
+
+
+class QueuedEmailManager(models.Manager):
+    def enqueue(self, recipient, subject, body, from_email=None):
+        """
+        Stores an email to be sent by the email worker. Queued within a transaction, the email is sent only
+        if the transaction is committed.
+        """
+        return self.create(
+            recipient=recipient, subject=subject, body=body, from_email=from_email or '', next_attempt=timezone.now()
+        )
+
+    def claim(self, size, lease, now=None):
+        """
+        Claims pending emails due to be sent, skipping emails locked by other workers. The next attempt of claimed
+        emails is postponed by `lease` seconds in the same short transaction, so that other workers leave them alone
+        while they are being sent, and they are sent again if the worker stops before storing the results.
+        :return: A list of at most `size` emails, the oldest first
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            due = self.select_for_update(skip_locked=True).filter(status=QueuedEmail.PENDING, next_attempt__lte=now)
+            emails = list(due.order_by('next_attempt', 'pk')[:size])
+            self.filter(pk__in=[email.pk for email in emails]).update(next_attempt=now + timedelta(seconds=lease))
+        return emails
+
+
+class QueuedEmail(models.Model):
+    """
+    Outgoing email waiting for delivery by the email worker, see the send_queued_emails command.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (PENDING, 'pending'),
+        (SENT, 'sent'),
+        (FAILED, 'failed'),
+    )
+    objects = QueuedEmailManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt'], name='queuedemail_status_next_idx'),
+        ]
+
+    recipient = models.EmailField()
+    from_email = models.CharField(max_length=254, blank=True, default='')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField()
+    last_error = models.TextField(blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(blank=True, null=True)
+
 
 class WhatsNew(models.Model):
     content = models.TextField(max_length=1536)
@@ -38,3 +38,21 @@ EMAIL_HOST_USER = os.environ['SENDGRID_USERNAME']
 EMAIL_HOST_PASSWORD = os.environ['SENDGRID_PASSWORD']
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
+
+# EVENTS BROKER
+# ------------------------------------------------------------------------------
+EVENTS_BROKER = {
+    'BACKEND': 'tfoosball.broker.RedisBroker',
+    'OPTIONS': {
+        'url': os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+    },
+}
+
+# THROTTLING
+# ------------------------------------------------------------------------------
+THROTTLE_STORE = {
+    'BACKEND': 'api.throttling.RedisThrottleStore',
+    'OPTIONS': {
+        'url': os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+    },
+}
@@ -0,0 +1,236 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+INITIAL_EXP = 1000
+
+
+def expected_score(rating_diff):
+    """
+    Elo expectation of the red team winning the match.
+    :param rating_diff: Difference between red and blue team ratings, a scalar or an array
+    :return: Probability (scalar or array) of the red team winning
+    """
+    return 1 / (np.power(10.0, -np.asarray(rating_diff, dtype=float) / 400) + 1)
+
+
+def match_outcome(red_score, blue_score):
+    """
+    :return: Outcome of the match(es) for the red team mapped as in Match.WINNER_CHOICES
+    """
+    return np.sign(np.asarray(red_score) - np.asarray(blue_score)) / 2 + 0.5
+
+
+def points_factor(status, red_score, blue_score):
+    """
+    :return: Elo K factor multiplied by the goal difference factor G, as used by Match.calculate_points
+    """
+    goal_factor = (11 + np.abs(np.asarray(red_score) - np.asarray(blue_score))) / 8
+    return np.asarray(status, dtype=float) * goal_factor
+
+
+def preview_points(red_exp, blue_exp, status, max_score=10):
+    """
+    Predicts matches between teams of the given total ratings, as Match.calculate_points would score them.
+    :param red_exp: Sum of exp of red team players, a scalar or an array
+    :param blue_exp: Sum of exp of blue team players, a scalar or an array
+    :param status: Match status used as the K factor
+    :return: Probability of the red team winning, points gained by red for a clean win and points gained by blue
+    for a clean win
+    """
+    expected = expected_score(np.asarray(red_exp) - np.asarray(blue_exp))
+    factor = points_factor(status, max_score, 0)
+    red = np.trunc(factor * (1 - expected)).astype(np.int64)
+    blue = np.trunc(factor * expected).astype(np.int64)
+    return expected, red, blue
+
+
+ELO = 'elo'
+GLICKO2 = 'glicko2'
+DEFAULT_STATUS = 20
+INITIAL_DEVIATION = 350.0
+INITIAL_VOLATILITY = 0.06
+GLICKO_SCALE = 400 / math.log(10)
+VOLATILITY_CHANGE = 0.5
+CONVERGENCE = 1e-6
+SIGNS = (1, 1, -1, -1)
+
+Ratings = namedtuple('Ratings', ('points', 'deviation', 'volatility', 'expected'))
+
+
+class EloEngine:
+    """
+    Elo rating of teams, with the sum of players' exp as the team rating, the match status as the K factor
+    and a goal difference factor. Players' deviation and volatility are not used.
+    """
+    name = ELO
+
+    def rate(self, exp, deviation, volatility, status, red_score, blue_score, points=None):
+        """
+        Rates a single match.
+        :param exp: Exp of the players ordered as Match.SLOTS, as are `deviation` and `volatility`
+        :param points: Points to apply instead of the computed ones, e.g. stored with the match
+        :return: Points gained by the red team, new deviations and volatilities of the players and the probability
+        of the red team winning
+        """
+        K = int(status)
+        G = (11 + abs(red_score - blue_score)) / 8
+        dr = (exp[0] + exp[1]) - (exp[2] + exp[3])
+        We = 1 / ((10 ** -(dr / 400)) + 1)
+        W = 0.5 if red_score == blue_score else (1 if red_score > blue_score else 0)
+        return int(K * G * (W - We)) if points is None else points, tuple(deviation), tuple(volatility), We
+
+    def replay(self, history, initial_exp=INITIAL_EXP, keep=None):
+        """
+        Rates all matches of a history in order. Each match depends on ratings produced by the previous ones,
+        so only the K and G factors and the outcomes are computed up front; the loop itself works on plain floats.
+        :param keep: Optional boolean mask of matches whose stored points are kept instead of being recomputed
+        :return: Ratings with arrays of points and expectations per match, deviations and volatilities per member
+        """
+        factors = points_factor(history.status, history.red_score, history.blue_score).tolist()
+        outcomes = match_outcome(history.red_score, history.blue_score).tolist()
+        stored = history.points.tolist()
+        keep = [False] * len(stored) if keep is None else np.asarray(keep, dtype=bool).tolist()
+        exp = [initial_exp] * len(history.member_ids)
+        points = []
+        expected = []
+        for factor, outcome, kept, value, (ra, rd, ba, bd) in zip(
+            factors, outcomes, keep, stored, history.slots.tolist()
+        ):
+            diff = (exp[ra] + exp[rd]) - (exp[ba] + exp[bd])
+            chance = 1 / ((10 ** -(diff / 400)) + 1)
+            if not kept:
+                value = int(factor * (outcome - chance))
+            exp[ra] += value
+            exp[rd] += value
+            exp[ba] -= value
+            exp[bd] -= value
+            points.append(value)
+            expected.append(chance)
+        size = len(history.member_ids)
+        return Ratings(
+            np.array(points, dtype=np.int64), np.full(size, INITIAL_DEVIATION), np.full(size, INITIAL_VOLATILITY),
+            np.array(expected)
+        )
+
+
+class Glicko2Engine:
+    """
+    Glicko-2 rating of teams, with every match being a rating period. A team is rated as a single player with
+    the mean rating of its players and their pooled deviation. Players gain or lose the same points, so that
+    matches stay zero-sum, but the less certain the ratings of the match are, the more points are exchanged.
+    Deviation and volatility of every player are updated by the Glicko-2 formulas, the outcome ignores the score,
+    and the match status scales points relative to the default one.
+    """
+    name = GLICKO2
+
+    def __init__(self, volatility_change=VOLATILITY_CHANGE):
+        """
+        :param volatility_change: The Glicko-2 tau constant, constraining changes of volatility over time
+        """
+        self.tau = volatility_change
+
+    def new_volatility(self, phi, sigma, v, delta):
+        """
+        Solves the Glicko-2 volatility equation with the Illinois algorithm.
+        """
+        a = math.log(sigma ** 2)
+        tau = self.tau
+
+        def f(x):
+            ex = math.exp(x)
+            return ex * (delta ** 2 - phi ** 2 - v - ex) / (2 * (phi ** 2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+        A = a
+        if delta ** 2 > phi ** 2 + v:
+            B = math.log(delta ** 2 - phi ** 2 - v)
+        else:
+            k = 1
+            while f(a - k * tau) < 0:
+                k += 1
+            B = a - k * tau
+        fA, fB = f(A), f(B)
+        while abs(B - A) > CONVERGENCE:
+            C = A + (A - B) * fA / (fB - fA)
+            fC = f(C)
+            if fC * fB <= 0:
+                A, fA = B, fB
+            else:
+                fA /= 2
+            B, fB = C, fC
+        return math.exp(A / 2)
+
+    def rate(self, exp, deviation, volatility, status, red_score, blue_score, points=None):
+        """
+        Rates a single match.
+        :param exp: Exp of the players ordered as Match.SLOTS, as are `deviation` and `volatility`
+        :param points: Points to apply instead of the computed ones, e.g. stored with the match
+        :return: Points gained by the red team, new deviations and volatilities of the players and the probability
+        of the red team winning
+        """
+        mu = [(value - INITIAL_EXP) / GLICKO_SCALE for value in exp]
+        phi = [value / GLICKO_SCALE for value in deviation]
+        outcome = 0.5 if red_score == blue_score else (1 if red_score > blue_score else 0)
+        teams = ((0, 1, 2, 3, outcome), (2, 3, 0, 1, 1 - outcome))
+        team_mu = [(mu[first] + mu[second]) / 2 for first, second, *_ in teams]
+        team_phi = [math.sqrt((phi[first] ** 2 + phi[second] ** 2) / 2) for first, second, *_ in teams]
+
+        deviations, volatilities, gains = [0.0] * 4, [0.0] * 4, []
+        for team, (first, second, _, _, score) in enumerate(teams):
+            g = 1 / math.sqrt(1 + 3 * team_phi[1 - team] ** 2 / math.pi ** 2)
+            E = 1 / (1 + math.exp(-g * (team_mu[team] - team_mu[1 - team])))
+            v = 1 / (g ** 2 * E * (1 - E))
+            delta = v * g * (score - E)
+            pooled = 0
+            for player in (first, second):
+                volatilities[player] = self.new_volatility(phi[player], volatility[player], v, delta)
+                phi_star = math.sqrt(phi[player] ** 2 + volatilities[player] ** 2)
+                pooled += phi_star ** 2 / 2
+                deviations[player] = min(GLICKO_SCALE / math.sqrt(1 / phi_star ** 2 + 1 / v), INITIAL_DEVIATION)
+            gains.append(g * (score - E) / (1 / pooled + 1 / v))
+            if team == 0:
+                expected = E
+        if points is None:
+            points = int(status / DEFAULT_STATUS * GLICKO_SCALE * (gains[0] - gains[1]) / 2)
+        return points, tuple(deviations), tuple(volatilities), expected
+
+    def replay(self, history, initial_exp=INITIAL_EXP, keep=None):
+        """
+        Rates all matches of a history in order, see EloEngine.replay.
+        """
+        keep = [False] * len(history.points) if keep is None else np.asarray(keep, dtype=bool).tolist()
+        size = len(history.member_ids)
+        exp = [initial_exp] * size
+        deviation = [INITIAL_DEVIATION] * size
+        volatility = [INITIAL_VOLATILITY] * size
+        points = []
+        expected = []
+        for slots, status, red_score, blue_score, kept, stored in zip(
+            history.slots.tolist(), history.status.tolist(), history.red_score.tolist(),
+            history.blue_score.tolist(), keep, history.points.tolist()
+        ):
+            value, deviations, volatilities, chance = self.rate(
+                [exp[index] for index in slots], [deviation[index] for index in slots],
+                [volatility[index] for index in slots], status, red_score, blue_score, stored if kept else None
+            )
+            for index, sign, new_deviation, new_volatility in zip(slots, SIGNS, deviations, volatilities):
+                exp[index] += sign * value
+                deviation[index] = new_deviation
+                volatility[index] = new_volatility
+            points.append(value)
+            expected.append(chance)
+        return Ratings(np.array(points, dtype=np.int64), np.array(deviation), np.array(volatility), np.array(expected))
+
+
+ENGINES = {
+    ELO: EloEngine(),
+    GLICKO2: Glicko2Engine(),
+}
+
+
+def get_engine(name):
+    """
+    :raises KeyError: There is no engine of the given name
+    """
+    return ENGINES[name]
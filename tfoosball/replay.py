@@ -0,0 +1,286 @@
+from collections import OrderedDict
+
+import numpy as np
+from django.db import transaction
+
+from .db import bulk_create, bulk_update
+from .models import ExpHistory, LeaderboardEntry, Match, MatchParticipant, Member, PairStats, Team
+from .rating import ELO, INITIAL_EXP, get_engine, match_outcome
+
+STAT_FIELDS = Member.STAT_FIELDS
+RATING_FIELDS = Member.RATING_FIELDS
+SLOTS = Match.SLOTS
+SLOT_SIGN = np.array([1, 1, -1, -1])
+SLOT_OFFENCE = np.array([True, False, True, False])
+LOAD_CHUNK_SIZE = 10000
+HISTORY_CHUNK_SIZE = 2000
+
+
+class MatchHistory:
+    """
+    Compact, chronologically ordered representation of the matches played within a team.
+    Players are stored as indices into `member_ids`, one column per slot (see SLOTS).
+    """
+
+    def __init__(self, member_ids, match_ids, slots, red_score, blue_score, status, points):
+        self.member_ids = np.asarray(member_ids, dtype=np.int64)
+        self.match_ids = np.asarray(match_ids, dtype=np.int64)
+        self.slots = np.asarray(slots, dtype=np.int64).reshape(-1, len(SLOTS))
+        self.red_score = np.asarray(red_score, dtype=np.int64)
+        self.blue_score = np.asarray(blue_score, dtype=np.int64)
+        self.status = np.asarray(status, dtype=np.int64)
+        self.points = np.asarray(points, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    @classmethod
+    def load(cls, team_id):
+        """
+        Loads all matches of the team with one query, streaming rows in chunks to keep memory bounded.
+        """
+        member_ids = np.array(sorted(Member.objects.filter(team_id=team_id).values_list('id', flat=True)))
+        fields = ('id',) + tuple(f'{slot}_id' for slot in SLOTS) + ('red_score', 'blue_score', 'status', 'points')
+        rows = Match.objects.by_team(team_id).order_by('date', 'id').values_list(*fields).iterator()
+        chunks = []
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == LOAD_CHUNK_SIZE:
+                chunks.append(np.array(chunk, dtype=np.int64))
+                chunk = []
+        if chunk:
+            chunks.append(np.array(chunk, dtype=np.int64))
+        data = np.concatenate(chunks) if chunks else np.empty((0, len(fields)), dtype=np.int64)
+        slots = np.searchsorted(member_ids, data[:, 1:5]) if len(member_ids) else data[:, 1:5]
+        return cls(member_ids, data[:, 0], slots, data[:, 5], data[:, 6], data[:, 7], data[:, 8])
+
+    @property
+    def outcome(self):
+        return match_outcome(self.red_score, self.blue_score)
+
+    def rerate(self, initial_exp=INITIAL_EXP, keep=None, engine=ELO):
+        """
+        Recomputes points of every match as Match.calculate_points would with the given rating engine.
+        :param keep: Optional boolean mask of matches whose stored points are kept instead of being recomputed
+        :return: Array of points gained by the red team in each match
+        """
+        return get_engine(engine).replay(self, initial_exp, keep).points
+
+    def member_stats(self, points=None, initial_exp=INITIAL_EXP):
+        """
+        Computes Member statistics as if every match was applied by Member.after_match_update in order.
+        :param points: Optional points of each match, stored points are used by default
+        :return: A dict mapping every field in STAT_FIELDS to an array indexed like `member_ids`
+        """
+        size = len(self.member_ids)
+        points = self.points if points is None else points
+        outcome = self.outcome
+        members = self.slots.ravel()
+        deltas = (points[:, None] * SLOT_SIGN).ravel()
+        results = np.stack([outcome, outcome, 1 - outcome, 1 - outcome], axis=1).ravel()
+        offence = np.tile(SLOT_OFFENCE, len(self))
+        won = results == Member.WINNER
+
+        stats = {
+            'offence_played': np.bincount(members[offence], minlength=size),
+            'defence_played': np.bincount(members[~offence], minlength=size),
+            'offence_won': np.bincount(members[offence & won], minlength=size),
+            'defence_won': np.bincount(members[~offence & won], minlength=size),
+            'exp': np.full(size, initial_exp, dtype=np.int64),
+            'lowest_exp': np.full(size, initial_exp, dtype=np.int64),
+            'highest_exp': np.full(size, initial_exp, dtype=np.int64),
+        }
+        if not len(members):
+            for field in ('win_streak', 'curr_win_streak', 'lose_streak', 'curr_lose_streak'):
+                stats[field] = np.zeros(size, dtype=np.int64)
+            return stats
+
+        # Stable sort keeps chronological order of matches within each member's group
+        order = np.argsort(members, kind='stable')
+        grouped = members[order]
+        starts = _group_starts(grouped)
+        owners = grouped[starts]
+
+        sorted_deltas = deltas[order]
+        trajectory = np.cumsum(sorted_deltas)
+        offsets = trajectory[starts] - sorted_deltas[starts]
+        trajectory = trajectory - np.repeat(offsets, np.diff(np.r_[starts, len(grouped)])) + initial_exp
+        stats['exp'][owners] = trajectory[np.r_[starts[1:], len(grouped)] - 1]
+        stats['lowest_exp'][owners] = np.minimum(np.minimum.reduceat(trajectory, starts), initial_exp)
+        stats['highest_exp'][owners] = np.maximum(np.maximum.reduceat(trajectory, starts), initial_exp)
+
+        # Ties update neither of the streaks, so they are skipped entirely
+        decisive = results[order] != Match.TIE
+        stats['win_streak'], stats['curr_win_streak'] = _runs(won[order][decisive], grouped[decisive], size)
+        stats['lose_streak'], stats['curr_lose_streak'] = _runs(~won[order][decisive], grouped[decisive], size)
+        return stats
+
+
+def _group_starts(groups):
+    return np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+
+
+def _runs(flags, groups, size):
+    """
+    :param flags: Boolean array, grouped by `groups`
+    :param groups: Sorted array of group indices
+    :return: Arrays with the longest and the trailing run of True values within every group
+    """
+    longest = np.zeros(size, dtype=np.int64)
+    current = np.zeros(size, dtype=np.int64)
+    if not len(flags):
+        return longest, current
+    starts = _group_starts(groups)
+    ends = np.r_[starts[1:], len(groups)] - 1
+    values = flags.astype(np.int64)
+    counts = np.cumsum(values)
+    resets = np.where(flags, 0, counts)
+    resets[starts] = counts[starts] - values[starts]
+    runs = counts - np.maximum.accumulate(resets)
+    longest[groups[starts]] = np.maximum.reduceat(runs, starts)
+    current[groups[starts]] = runs[ends]
+    return longest, current
+
+
+def update_match_points(match_ids, points):
+    """
+    Stores recomputed points of matches and their participants, issuing a few UPDATEs per distinct value
+    instead of one per match.
+    """
+    for value in np.unique(points).tolist():
+        ids = match_ids[points == value].tolist()
+        for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+            chunk = ids[start:start + LOAD_CHUNK_SIZE]
+            Match.objects.filter(pk__in=chunk).update(points=value)
+            participants = MatchParticipant.objects.filter(match_id__in=chunk)
+            participants.filter(side=Match.RED).update(exp_delta=value)
+            participants.filter(side=Match.BLUE).update(exp_delta=-value)
+
+
+def replay_team(team_id, rerate=False):
+    """
+    Recalculates statistics and ratings of all members of the team from its whole match history.
+    :param team_id: Team to be recalculated
+    :param rerate: Recompute points of every match with the rating engine of the team instead of using
+    the stored ones. ExpHistory of the team is rebuilt when points change
+    :return: Number of replayed matches
+    """
+    with transaction.atomic():
+        engine = get_engine(Team.objects.values_list('rating_engine', flat=True).get(pk=team_id))
+        history = MatchHistory.load(team_id)
+        # Deviations and volatilities are not stored per match, so they are replayed even when points are kept
+        ratings = engine.replay(history, keep=None if rerate else np.ones(len(history), dtype=bool))
+        points = None
+        if rerate:
+            points = ratings.points
+            changed = points != history.points
+            if changed.any():
+                update_match_points(history.match_ids[changed], points[changed])
+                PairStats.objects.rebuild(team_id)
+                # Exp of members is stored below, the history is rebuilt to match it and cached leaderboards are
+                # invalidated
+                rebuild_exp_history(team_id=team_id, update_members=False)
+        stats = history.member_stats(points)
+        stats.update(rating_deviation=ratings.deviation, volatility=ratings.volatility)
+        rows = {
+            member_id: {
+                **{field: int(stats[field][index]) for field in STAT_FIELDS},
+                **{field: float(stats[field][index]) for field in RATING_FIELDS},
+            }
+            for index, member_id in enumerate(history.member_ids.tolist())
+        }
+        bulk_update(Member, rows, STAT_FIELDS + RATING_FIELDS)
+        LeaderboardEntry.objects.rebuild(team_id)
+    return len(history)
+
+
+class ExpHistoryBuilder:
+    """
+    Collects ExpHistory rows of a chronological stream of matches, one bucket per (player, date).
+    Buckets of a day are complete as soon as the stream moves past it, so only the current day is kept
+    in memory and completed rows are written with chunked bulk_create.
+    """
+
+    def __init__(self, chunk_size=HISTORY_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.day = None
+        self.buckets = OrderedDict()
+        self.pending = []
+        self.created = 0
+
+    def move_to(self, day):
+        if day == self.day:
+            return
+        self.pending.extend(self.buckets.values())
+        self.buckets.clear()
+        self.day = day
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def open(self, player_id, day, exp):
+        """
+        Creates an empty bucket, unless the player already has one for that day.
+        """
+        self.move_to(day)
+        if player_id not in self.buckets:
+            self.buckets[player_id] = ExpHistory(player_id=player_id, date=day, exp=exp, matches_played=0)
+
+    def add(self, player_id, day, exp, match_id):
+        self.open(player_id, day, exp)
+        bucket = self.buckets[player_id]
+        bucket.exp = exp
+        bucket.match_id = match_id
+        bucket.matches_played += 1
+
+    def flush(self):
+        bulk_create(ExpHistory, self.pending, batch_size=self.chunk_size)
+        self.created += len(self.pending)
+        self.pending = []
+
+    def finish(self):
+        self.move_to(None)
+        self.flush()
+        return self.created
+
+
+def rebuild_exp_history(chunk_size=HISTORY_CHUNK_SIZE, team_id=None, update_members=True):
+    """
+    Deletes ExpHistory and creates it from scratch by streaming all matches in date order.
+    Every member starts with INITIAL_EXP; members with a player get an initial bucket on the day the player joined.
+    :param team_id: Optional team whose history is rebuilt, all teams are rebuilt by default
+    :param update_members: Store the final exp of members and rebuild leaderboards, which is not needed when
+    the team has just been replayed by replay_team
+    :return: Number of created ExpHistory rows
+    """
+    members = Member.objects.all()
+    matches = Match.objects.all()
+    team_ids = Team.objects.values_list('id', flat=True)
+    if team_id is not None:
+        members = members.filter(team_id=team_id)
+        matches = matches.filter(team_id=team_id)
+        team_ids = [team_id]
+    with transaction.atomic():
+        ExpHistory.objects.filter(player__in=members).delete()
+        exp = dict.fromkeys(members.values_list('id', flat=True), INITIAL_EXP)
+        players = members.filter(player__isnull=False).values_list('id', 'player__date_joined')
+        joined = sorted(((ExpHistory.day(date_joined), member_id) for member_id, date_joined in players), reverse=True)
+        builder = ExpHistoryBuilder(chunk_size)
+        fields = ('id', 'date', 'points') + tuple(f'{slot}_id' for slot in SLOTS)
+        for match_id, date, points, *players in matches.order_by('date', 'id').values_list(*fields).iterator():
+            day = ExpHistory.day(date)
+            while joined and joined[-1][0] <= day:
+                builder.open(joined[-1][1], joined[-1][0], INITIAL_EXP)
+                joined.pop()
+            for player_id, sign in zip(players, SLOT_SIGN.tolist()):
+                exp[player_id] += sign * points
+                builder.add(player_id, day, exp[player_id], match_id)
+        for day, member_id in reversed(joined):
+            builder.open(member_id, day, INITIAL_EXP)
+        created = builder.finish()
+        if update_members:
+            bulk_update(Member, {pk: {'exp': value} for pk, value in exp.items()}, ['exp'])
+            for team in team_ids:
+                LeaderboardEntry.objects.rebuild(team)
+        LeaderboardEntry.objects.invalidate_history(team_id)
+    return created
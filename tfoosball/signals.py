@@ -1,36 +1,121 @@
-from django.db.models.signals import post_save, post_delete, pre_save
-from django.dispatch import receiver
-from .models import Match, Player, PlayerPlaceholder, Member
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver, Signal
+from .broker import get_broker, team_channel
+from .models import Match, Player, PlayerPlaceholder, Member, LeaderboardEntry, Event, PairStats, ExpHistory
 from allauth.account.signals import user_signed_up
 from django.utils import timezone
 
+member_invited = Signal(providing_args=['member', 'email'])
+
 
 @receiver(post_save, sender=Match)
 def store_exp_history(sender, instance, *args, **kwargs):
     Match.create_exp_history(instance)
 
 
+@receiver(post_save, sender=Match)
+def store_participants(sender, instance, created, *args, **kwargs):
+    instance.update_participants(created)
+
+
+@receiver(post_save, sender=Match)
+def log_match_event(sender, instance, created, *args, **kwargs):
+    event = instance.get_event()
+    if created:
+        Event.log(instance.team_id, event, match=instance)
+    else:
+        for stored in Event.objects.filter(match=instance):
+            stored.date, stored.event = event['date'], event['event']
+            stored.save(update_fields=['date', 'event'])
+
+
+@receiver(pre_save, sender=Match)
+def remember_pair_stats(sender, instance, *args, **kwargs):
+    # Statistics of the stored version of an updated match are replaced by the new ones
+    instance._previous_pairs = list(
+        Match.objects.filter(pk=instance.pk).values_list('team_id', *PairStats.objects.FIELDS)
+    ) if instance.pk else []
+
+
+@receiver(post_save, sender=Match)
+def update_pair_stats(sender, instance, *args, **kwargs):
+    totals = PairStats.objects.deltas(getattr(instance, '_previous_pairs', []), sign=-1)
+    PairStats.objects.apply(PairStats.objects.deltas([PairStats.objects.match_row(instance)], totals=totals))
+
+
+def is_backdated(match):
+    return ExpHistory.day(match.date) < ExpHistory.day(timezone.now())
+
+
+@receiver(post_save, sender=Match)
+def invalidate_leaderboard_history(sender, instance, created, *args, **kwargs):
+    # Past rankings change when a match is backdated or a stored match is updated
+    if not created or is_backdated(instance):
+        LeaderboardEntry.objects.invalidate_history(instance.team_id)
+
+
+@receiver(post_save, sender=Event)
+def publish_event(sender, instance, *args, **kwargs):
+    # Subscribers must not be notified about events that may still be rolled back
+    message = instance.as_message()
+    transaction.on_commit(lambda: get_broker().publish(team_channel(instance.team_id), message))
+
+
 @receiver(pre_save, sender=Member)
 def set_date_joined(sender, instance, *args, **kwargs):
     try:
         obj = sender.objects.get(pk=instance.pk)
     except sender.DoesNotExist:
-        pass
+        instance._has_joined = instance.joined_date is not None
     else:
         if not obj.is_accepted == instance.is_accepted and instance.is_accepted:
             instance.joined_date = timezone.now()
+        instance._has_joined = instance.joined_date is not None and obj.joined_date != instance.joined_date
+
+
+@receiver(post_save, sender=Member)
+def log_joined_event(sender, instance, *args, **kwargs):
+    if getattr(instance, '_has_joined', False):
+        instance._has_joined = False
+        Event.log(instance.team_id, instance.get_joined_event(), member=instance)
+
+
+@receiver(member_invited, sender=Member)
+def log_invitation_event(sender, member, email, *args, **kwargs):
+    Event.log(member.team_id, member.get_invitation_event(email), member=member)
+
+
+@receiver(pre_delete, sender=Match)
+def lock_deleted_match_players(sender, instance, *args, **kwargs):
+    # Locked in the order used by Match.save before any row of the match is deleted, so that deleting a match
+    # cannot deadlock with matches of the same players being saved or deleted concurrently
+    instance.lock_players()
 
 
 @receiver(post_delete, sender=Match)
 def clean_match(sender, instance, *args, **kwargs):
-    instance.red_att.exp -= instance.points
-    instance.red_def.exp -= instance.points
-    instance.blue_att.exp += instance.points
-    instance.blue_def.exp += instance.points
-    instance.red_att.save()
-    instance.red_def.save()
-    instance.blue_att.save()
-    instance.blue_def.save()
+    # Computed by the database, so that concurrent updates of the same members are not lost
+    Member.objects.filter(pk__in=[instance.red_att_id, instance.red_def_id]).update(exp=F('exp') - instance.points)
+    Member.objects.filter(pk__in=[instance.blue_att_id, instance.blue_def_id]).update(exp=F('exp') + instance.points)
+    players = [instance.red_att_id, instance.red_def_id, instance.blue_att_id, instance.blue_def_id]
+    LeaderboardEntry.objects.move(Member.objects.filter(pk__in=players))
+    PairStats.objects.apply(PairStats.objects.deltas([PairStats.objects.match_row(instance)], sign=-1))
+    if is_backdated(instance):
+        LeaderboardEntry.objects.invalidate_history(instance.team_id)
+
+
+@receiver(post_save, sender=Member)
+def update_leaderboard(sender, instance, update_fields=None, *args, **kwargs):
+    if update_fields and not {'exp', 'is_accepted'} & set(update_fields):
+        return
+    LeaderboardEntry.objects.sync(instance)
+
+
+@receiver(pre_delete, sender=Member)
+def remove_from_leaderboard(sender, instance, *args, **kwargs):
+    LeaderboardEntry.objects.remove(instance)
 
 
 @receiver(user_signed_up, sender=Player)
@@ -38,5 +123,5 @@ def user_created(request, user, *args, **kwargs):
     placeholders = PlayerPlaceholder.objects.filter(email=user.email)
     for placeholder in placeholders:
         placeholder.member.player = user
-        placeholder.member.save()
+        placeholder.member.save(update_fields=['player'])
         placeholder.delete()
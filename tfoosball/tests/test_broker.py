@@ -0,0 +1,74 @@
+import os
+import unittest
+import redis
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+from tfoosball.broker import LocalBroker, RedisBroker, get_broker, team_channel
+from tfoosball.models import Event, Match, Member, Team
+
+REDIS_URL = os.environ.get('TEST_REDIS_URL', 'redis://localhost:6379/15')
+
+
+def redis_available():
+    try:
+        return redis.StrictRedis.from_url(REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+class BrokerTestMixin:
+    def test_publish_and_subscribe(self):
+        subscription = self.broker.subscribe(team_channel(1))
+        other = self.broker.subscribe(team_channel(2))
+        try:
+            self.broker.publish(team_channel(1), {'id': 1, 'type': 'match'})
+            self.assertEqual(subscription.get(timeout=1), {'id': 1, 'type': 'match'})
+            self.assertIsNone(subscription.get(timeout=0.01))
+            self.assertIsNone(other.get(timeout=0.01))
+        finally:
+            subscription.close()
+            other.close()
+
+
+class LocalBrokerTest(BrokerTestMixin, unittest.TestCase):
+    def setUp(self):
+        self.broker = LocalBroker()
+
+    def test_closed_subscription(self):
+        self.broker.subscribe(team_channel(1)).close()
+        self.assertEqual(self.broker.publish(team_channel(1), {}), 0)
+
+
+@unittest.skipUnless(redis_available(), 'Redis server is not available')
+class RedisBrokerTest(BrokerTestMixin, unittest.TestCase):
+    def setUp(self):
+        self.broker = RedisBroker(REDIS_URL)
+
+
+class EventPublishingTest(TransactionTestCase):
+    def setUp(self):
+        self.team = Team.objects.create(domain='live', name='Live Team')
+        self.members = [Member.objects.create(team=self.team, username=f'l{i}') for i in range(4)]
+        self.subscription = get_broker().subscribe(team_channel(self.team.id))
+
+    def tearDown(self):
+        self.subscription.close()
+
+    def test_match_events_published(self):
+        match = Match.objects.create(
+            red_att=self.members[0], red_def=self.members[1], blue_att=self.members[2], blue_def=self.members[3],
+            red_score=10, blue_score=5
+        )
+        event = Event.objects.get(match=match)
+        self.assertEqual(self.subscription.get(timeout=1), event.as_message())
+        match.blue_score = 7
+        match.save()
+        event.refresh_from_db()
+        self.assertEqual(self.subscription.get(timeout=1), event.as_message())
+
+    def test_rolled_back_event_not_published(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Event.objects.create(team=self.team, date=timezone.now(), type=Event.JOINED, event='')
+            raise RuntimeError
+        self.assertIsNone(self.subscription.get(timeout=0.05))
@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from random import Random
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from tfoosball.importing import CSV, JSONL, MatchImportError, import_matches, read_rows
+from tfoosball.models import Event, ExpHistory, LeaderboardEntry, Match, MatchParticipant, Member, Team
+from tfoosball.replay import STAT_FIELDS
+
+USERNAMES = [f'u{i}' for i in range(6)]
+
+
+class ImportMatchesTest(TestCase):
+    def setUp(self):
+        self.start = timezone.now().replace(microsecond=0) - timedelta(days=20)
+        self.team = Team.objects.create(domain='imported', name='Imported')
+        self.reference = Team.objects.create(domain='reference', name='Reference')
+        for team in (self.team, self.reference):
+            for username in USERNAMES:
+                Member.objects.create(team=team, username=username)
+        rng = Random(3)
+        self.rows = []
+        for i in range(40):
+            players = rng.sample(USERNAMES, 4)
+            red_score = rng.randint(0, 9)
+            self.rows.append(dict(
+                zip(Match.SLOTS, players), red_score=red_score, blue_score=10,
+                date=(self.start + timedelta(hours=11 * i)).isoformat()
+            ))
+        rng.shuffle(self.rows)
+
+    def create_reference(self, rows):
+        members = {member.username: member for member in Member.objects.filter(team=self.reference)}
+        for row in sorted(rows, key=lambda row: row['date']):
+            Match.objects.create(
+                date=parse_datetime(row['date']), red_score=row['red_score'], blue_score=row['blue_score'],
+                **{slot: members[row[slot]] for slot in Match.SLOTS}
+            )
+
+    def summary(self, team):
+        stats = sorted(Member.objects.filter(team=team).values_list('username', *STAT_FIELDS))
+        points = list(Match.objects.filter(team=team).order_by('date').values_list('points', flat=True))
+        history = ExpHistory.objects.filter(player__team=team)
+        history = sorted(history.values_list('player__username', 'date', 'exp', 'matches_played'))
+        ranking = list(LeaderboardEntry.objects.filter(team=team).order_by('rank').values_list('member__username'))
+        participants = MatchParticipant.objects.filter(match__team=team).count()
+        events = Event.objects.filter(team=team, type=Event.MATCH).count()
+        return stats, points, history, ranking, participants, events
+
+    def rows_as(self, data_format, rows):
+        if data_format == JSONL:
+            return StringIO('\n'.join(json.dumps(row) for row in rows) + '\n')
+        lines = ['date,red_att,red_def,blue_att,blue_def,red_score,blue_score']
+        lines += [','.join(str(row[field]) for field in lines[0].split(',')) for row in rows]
+        return StringIO('\n'.join(lines))
+
+    def test_import_matches_sequential_saves(self):
+        self.create_reference(self.rows)
+        imported = import_matches(self.team.id, read_rows(self.rows_as(JSONL, self.rows), JSONL), chunk_size=7)
+        self.assertEqual(imported, 40)
+        self.assertEqual(self.summary(self.team), self.summary(self.reference))
+
+    def test_import_without_returning_keys(self):
+        # Backends that cannot return keys of a multi-row insert get keys of rows inserted one by one
+        self.create_reference(self.rows)
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            import_matches(self.team.id, read_rows(self.rows_as(JSONL, self.rows), JSONL))
+        self.assertEqual(self.summary(self.team), self.summary(self.reference))
+
+    def test_import_between_existing_matches(self):
+        existing, new = self.rows[::2], self.rows[1::2]
+        self.create_reference(self.rows)
+        members = {member.username: member for member in Member.objects.filter(team=self.team)}
+        for row in sorted(existing, key=lambda row: row['date']):
+            Match.objects.create(
+                date=parse_datetime(row['date']), red_score=row['red_score'], blue_score=row['blue_score'],
+                **{slot: members[row[slot]] for slot in Match.SLOTS}
+            )
+        stored = list(Match.objects.filter(team=self.team).order_by('date').values_list('id', 'points'))
+        import_matches(self.team.id, read_rows(self.rows_as(CSV, new), CSV))
+        kept = dict(Match.objects.filter(pk__in=[pk for pk, _ in stored]).values_list('id', 'points'))
+        self.assertEqual(kept, dict(stored))
+        self.assertEqual(Match.objects.filter(team=self.team).count(), 40)
+        self.assertEqual(self.summary(self.team)[4:], self.summary(self.reference)[4:])
+
+    def test_invalid_rows(self):
+        rows = self.rows[:3] + [
+            dict(self.rows[0], red_att='nobody'),
+            dict(self.rows[0], red_score=0, blue_score=0),
+            dict(self.rows[0], date='yesterday'),
+            dict(self.rows[0], blue_def=self.rows[0]['red_att']),
+        ]
+        with self.assertRaises(MatchImportError) as context:
+            import_matches(self.team.id, read_rows(self.rows_as(CSV, rows), CSV))
+        self.assertEqual([line for line, _ in context.exception.errors], [5, 6, 7, 8])
+        self.assertFalse(Match.objects.filter(team=self.team).exists())
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as upload:
+            upload.write(self.rows_as(CSV, self.rows).getvalue())
+        try:
+            out = StringIO()
+            call_command('import_matches', upload.name, team=self.team.id, stdout=out)
+        finally:
+            os.unlink(upload.name)
+        self.assertIn('Imported 40 matches', out.getvalue())
+        self.assertEqual(Match.objects.filter(team=self.team).count(), 40)
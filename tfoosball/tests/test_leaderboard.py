@@ -0,0 +1,65 @@
+from random import Random
+from django.test import TestCase
+from tfoosball.models import LeaderboardEntry, Match, Member, Team
+from tfoosball.replay import replay_team
+
+
+class LeaderboardTest(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json', 'matches.json']
+
+    def setUp(self):
+        self.team = Team.objects.get(domain='dev')
+
+    def assert_consistent(self):
+        members = Member.objects.filter(team=self.team, is_accepted=True).order_by('-exp', 'pk')
+        expected = [(rank, pk, exp) for rank, (pk, exp) in enumerate(members.values_list('pk', 'exp'), start=1)]
+        entries = LeaderboardEntry.objects.by_team(self.team.id).ranked()
+        self.assertEqual(list(entries.values_list('rank', 'member_id', 'exp')), expected)
+
+    def test_fixtures_ranked(self):
+        self.assert_consistent()
+
+    def test_matches(self):
+        rng = Random(7)
+        members = list(Member.objects.filter(team=self.team))
+        matches = []
+        for i in range(40):
+            players = rng.sample(members, 4)
+            matches.append(Match.objects.create(
+                red_att=players[0], red_def=players[1], blue_att=players[2], blue_def=players[3],
+                red_score=rng.randint(0, 10), blue_score=10
+            ))
+            self.assert_consistent()
+        for match in matches[::3]:
+            match.delete()
+            self.assert_consistent()
+
+    def test_membership_changes(self):
+        member = Member.objects.filter(team=self.team, is_accepted=True).order_by('-exp')[2]
+        member.is_accepted = False
+        member.save()
+        self.assert_consistent()
+        member.is_accepted = True
+        member.save()
+        self.assert_consistent()
+        Member.objects.create(team=self.team, username='newcomer', is_accepted=True)
+        self.assert_consistent()
+        member.delete()
+        self.assert_consistent()
+        member = Member.objects.filter(team=self.team, is_accepted=True).last()
+        member.exp = 2000
+        member.save()
+        self.assert_consistent()
+
+    def test_replay(self):
+        Member.objects.filter(team=self.team).update(exp=1500)
+        replay_team(self.team.id)
+        self.assert_consistent()
+
+    def test_queries(self):
+        top = list(LeaderboardEntry.objects.top(self.team.id, 3))
+        self.assertEqual([entry.rank for entry in top], [1, 2, 3])
+        around = list(LeaderboardEntry.objects.around(self.team.id, top[0].member_id, 2))
+        self.assertEqual([entry.rank for entry in around], [1, 2, 3])
+        with self.assertRaises(LeaderboardEntry.DoesNotExist):
+            LeaderboardEntry.objects.around(self.team.id + 1, top[0].member_id, 2)
@@ -1,5 +1,6 @@
+from unittest import mock
 from django.test import TestCase
-from tfoosball.models import Match, Member
+from tfoosball.models import ExpHistory, Match, Member
 
 
 class MatchModelTest(TestCase):
@@ -91,3 +92,32 @@ class MatchModelTest(TestCase):
         self.assertEqual(exp_0[1] + points, exp_1[1])
         self.assertEqual(exp_0[2] - points, exp_1[2])
         self.assertEqual(exp_0[3] - points, exp_1[3])
+
+    def test_save_queries(self):
+        match = Match(red_score=10, blue_score=3, **{k + '_id': v.pk for k, v in self.members_0.items()})
+        # savepoint, players, rating engine, members update, match insert, exp history upsert, participants, event,
+        # pair stats, team lock, leaderboard entries and range, leaderboard update, release savepoint
+        with self.assertNumQueries(14):
+            match.save()
+        history = ExpHistory.objects.filter(match=match)
+        self.assertEqual(history.count(), 4)
+        self.assertEqual(set(history.values_list('matches_played', flat=True)), {1})
+        self.assertEqual(Member.objects.get(pk=self.members_0['blue_def'].pk).exp, match.blue_def.exp)
+
+    def test_exp_history_same_day(self):
+        first = Match.objects.create(red_score=10, blue_score=3, **self.members_0)
+        second = Match.objects.create(red_score=4, blue_score=10, **self.members_0)
+        history = ExpHistory.objects.get(player=self.members_0['red_att'], date=first.date)
+        self.assertEqual(history.matches_played, 2)
+        self.assertEqual(history.match, second)
+        self.assertEqual(history.exp, self.members_0['red_att'].exp)
+
+    @mock.patch('tfoosball.db.supports_upsert', return_value=False)
+    def test_exp_history_same_day_without_upsert(self, supports_upsert):
+        self.test_exp_history_same_day()
+        self.assertTrue(supports_upsert.called)
+
+    def test_team_assigned(self):
+        match = Match.objects.create(red_score=10, blue_score=3, **self.members_0)
+        self.assertEqual(match.team_id, self.members_0['red_att'].team_id)
+        self.assertIn(match, Match.objects.by_team(self.members_0['red_att'].team_id))
@@ -0,0 +1,159 @@
+from random import Random
+from threading import Thread
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from tfoosball.models import Match, Member, Team
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentMatchesTest(TransactionTestCase):
+    threads = 8
+    matches_per_thread = 30
+
+    def setUp(self):
+        self.team = Team.objects.create(domain='stress', name='Stress Team')
+        self.member_ids = [Member.objects.create(team=self.team, username=f's{i}').pk for i in range(6)]
+        self.errors = []
+
+    def submit_matches(self, seed):
+        rng = Random(seed)
+        try:
+            # Instances are loaded once and reused, so they become stale as other threads submit matches
+            members = list(Member.objects.filter(pk__in=self.member_ids))
+            for _ in range(self.matches_per_thread):
+                players = rng.sample(members, 4)
+                Match.objects.create(
+                    red_att=players[0], red_def=players[1], blue_att=players[2], blue_def=players[3],
+                    red_score=rng.randint(0, 9), blue_score=10
+                )
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            connection.close()
+
+    def test_no_lost_updates(self):
+        workers = [Thread(target=self.submit_matches, args=(seed,)) for seed in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.errors, [])
+        self.assertEqual(Match.objects.count(), self.threads * self.matches_per_thread)
+        self.assertEqual(Member.objects.aggregate(total=Sum('exp'))['total'], 1000 * len(self.member_ids))
+        for member in Member.objects.filter(pk__in=self.member_ids):
+            red = Match.objects.filter(red_att=member).count() + Match.objects.filter(red_def=member).count()
+            blue = Match.objects.filter(blue_att=member).count() + Match.objects.filter(blue_def=member).count()
+            gained = Match.objects.filter(red_att=member).aggregate(p=Sum('points'))['p'] or 0
+            gained += Match.objects.filter(red_def=member).aggregate(p=Sum('points'))['p'] or 0
+            gained -= Match.objects.filter(blue_att=member).aggregate(p=Sum('points'))['p'] or 0
+            gained -= Match.objects.filter(blue_def=member).aggregate(p=Sum('points'))['p'] or 0
+            self.assertEqual(member.played, red + blue)
+            self.assertEqual(member.exp, 1000 + gained)
+            self.assertEqual(member.won, blue)
+
+    def test_concurrent_delete(self):
+        members = list(Member.objects.filter(pk__in=self.member_ids))
+        matches = [
+            Match.objects.create(
+                red_att=members[i % 2], red_def=members[2], blue_att=members[3], blue_def=members[4 + i % 2],
+                red_score=10, blue_score=i % 10
+            )
+            for i in range(40)
+        ]
+
+        def delete(chunk):
+            try:
+                for match in chunk:
+                    match.delete()
+            finally:
+                connection.close()
+
+        workers = [Thread(target=delete, args=(matches[i::4],)) for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for member in Member.objects.filter(pk__in=self.member_ids):
+            self.assertEqual(member.exp, 1000)
+
+    def test_concurrent_delete_and_save(self):
+        members = list(Member.objects.filter(pk__in=self.member_ids).order_by('pk'))
+        # Players with lower keys are on the blue side, so the red pair is not the first one locked
+        lineup = dict(red_att=members[5], red_def=members[3], blue_att=members[2], blue_def=members[0])
+        matches = [Match.objects.create(red_score=10, blue_score=i % 10, **lineup) for i in range(20)]
+
+        def delete(chunk):
+            try:
+                for match in chunk:
+                    match.delete()
+            except Exception as e:
+                self.errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [Thread(target=delete, args=(matches[i::2],)) for i in range(2)]
+        workers += [Thread(target=self.submit_matches, args=(seed,)) for seed in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.errors, [])
+        self.assertEqual(Match.objects.count(), 2 * self.matches_per_thread)
+        for member in Member.objects.filter(pk__in=self.member_ids):
+            gained = sum(
+                sign * (Match.objects.filter(**{slot: member}).aggregate(p=Sum('points'))['p'] or 0)
+                for slot, sign in zip(Match.SLOTS, (1, 1, -1, -1))
+            )
+            self.assertEqual(member.exp, 1000 + gained)
+
+
+class MatchLockingQueriesTest(TestCase):
+    """
+    Checks the queries that keep concurrent matches consistent, on backends where they cannot run concurrently.
+    """
+
+    def setUp(self):
+        self.team = Team.objects.create(domain='locking', name='Locking Team')
+        self.members = [Member.objects.create(team=self.team, username=f'l{i}') for i in range(4)]
+
+    def new_match(self, members):
+        return Match(
+            red_att=members[3], red_def=members[1], blue_att=members[2], blue_def=members[0],
+            red_score=10, blue_score=5
+        )
+
+    def test_lock_players(self):
+        match = self.new_match(self.members)
+        # Another match has changed the players since they were loaded
+        Member.objects.filter(pk=self.members[1].pk).update(exp=1100)
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            match.lock_players()
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertTrue(sql.startswith('SELECT'))
+        self.assertNotIn('JOIN', sql)
+        self.assertTrue(sql.endswith('ORDER BY "tfoosball_member"."id" ASC' + (
+            ' FOR UPDATE' if connection.features.has_select_for_update else ''
+        )))
+        self.assertEqual(match.red_def.exp, 1100)
+
+    def test_clean_match(self):
+        match = self.new_match(self.members)
+        match.save()
+        Member.objects.filter(pk__in=[member.pk for member in self.members]).update(exp=F('exp') + 100)
+        with CaptureQueriesContext(connection) as queries:
+            match.delete()
+        statements = [query['sql'] for query in queries]
+        # Players are locked as by lock_players, before any row of the match is deleted
+        locking = [i for i, sql in enumerate(statements) if sql.startswith('SELECT "tfoosball_member"."id"')]
+        deleting = [i for i, sql in enumerate(statements) if sql.startswith('DELETE')]
+        self.assertIn('ORDER BY "tfoosball_member"."id" ASC', statements[locking[0]])
+        self.assertLess(locking[0], deleting[0])
+        updates = [sql for sql in statements if sql.startswith('UPDATE "tfoosball_member"')]
+        self.assertEqual(len(updates), 2)
+        self.assertIn(f'"exp" = ("tfoosball_member"."exp" - {match.points})', updates[0])
+        self.assertIn(f'"exp" = ("tfoosball_member"."exp" + {match.points})', updates[1])
+        # Changes made since the match was loaded are kept
+        self.assertEqual(set(Member.objects.filter(team=self.team).values_list('exp', flat=True)), {1100})
@@ -0,0 +1,46 @@
+from django.db.models import Q
+from django.test import TestCase
+from tfoosball.models import Match, MatchParticipant, Member
+
+
+class MatchParticipantTest(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json', 'matches.json']
+
+    def setUp(self):
+        members = Member.objects.filter(team=4).order_by('pk')[:4]
+        self.members = {'red_att': members[0], 'red_def': members[1], 'blue_att': members[2], 'blue_def': members[3]}
+
+    def test_create_match(self):
+        match = Match.objects.create(red_score=10, blue_score=2, **self.members)
+        participants = {(p.side, p.position): p for p in match.participants.all()}
+        self.assertEqual(len(participants), 4)
+        self.assertEqual(participants[(Match.RED, MatchParticipant.ATTACK)].member, self.members['red_att'])
+        self.assertEqual(participants[(Match.BLUE, MatchParticipant.DEFENCE)].member, self.members['blue_def'])
+        self.assertEqual(participants[(Match.RED, MatchParticipant.DEFENCE)].exp_delta, match.points)
+        self.assertEqual(participants[(Match.BLUE, MatchParticipant.ATTACK)].exp_delta, -match.points)
+        self.assertEqual(participants[(Match.RED, MatchParticipant.ATTACK)].date, match.date)
+
+    def test_update_match(self):
+        match = Match.objects.create(red_score=10, blue_score=2, **self.members)
+        match.red_score = 3
+        match.blue_score = 10
+        match.save()
+        self.assertEqual(match.participants.count(), 4)
+        self.assertEqual(match.participants.get(member=self.members['red_att']).exp_delta, match.points)
+
+    def test_delete_match(self):
+        match = Match.objects.create(red_score=10, blue_score=2, **self.members)
+        match.delete()
+        self.assertFalse(MatchParticipant.objects.filter(match_id=match.pk).exists())
+
+    def test_get_matches(self):
+        Match.objects.create(red_score=10, blue_score=2, **self.members)
+        for member in Member.objects.filter(team=4):
+            legacy = Match.objects.filter(
+                Q(red_att=member) | Q(red_def=member) | Q(blue_att=member) | Q(blue_def=member)
+            )
+            self.assertEqual(set(member.get_matches()), set(legacy))
+
+    def test_by_username(self):
+        member = self.members['blue_att']
+        self.assertEqual(set(Match.objects.by_username(member.username)), set(member.get_matches()))
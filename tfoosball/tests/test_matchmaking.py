@@ -0,0 +1,67 @@
+from itertools import combinations
+from random import Random
+from django.test import TestCase
+from tfoosball.matchmaking import Matchmaker, lineups
+from tfoosball.models import Match, Member, Team
+
+
+class MatchmakingTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(domain='pool', name='Pool Team')
+        rng = Random(7)
+        self.members = [
+            Member.objects.create(
+                team=self.team, username=f'p{i}', exp=rng.randint(800, 1300),
+                offence_played=10, offence_won=rng.randint(0, 10), defence_played=10, defence_won=rng.randint(0, 10)
+            )
+            for i in range(8)
+        ]
+        self.ids = [member.pk for member in self.members]
+
+    def test_lineups(self):
+        candidates = lineups(6)
+        self.assertEqual(len(candidates), 15 * 3)
+        teams = {(frozenset(row[:2]), frozenset(row[2:])) for row in candidates.tolist()}
+        expected = set()
+        for quad in combinations(range(6), 4):
+            for mate in quad[1:]:
+                red = frozenset((quad[0], mate))
+                expected.add((red, frozenset(quad) - red))
+        self.assertEqual(teams, expected)
+
+    def test_most_balanced_first(self):
+        proposals = Matchmaker.load(self.team.id, self.ids).propose(limit=10)
+        exp = {member.pk: member.exp for member in self.members}
+        imbalance = [
+            abs((exp[ra] + exp[rd]) - (exp[ba] + exp[bd])) for ra, rd, ba, bd in proposals['slots'].tolist()
+        ]
+        best = min(
+            abs(sum(exp[pk] for pk in red) - sum(exp[pk] for pk in quad if pk not in red))
+            for quad in combinations(self.ids, 4) for red in combinations(quad, 2)
+        )
+        self.assertEqual(imbalance[0], best)
+        self.assertEqual(imbalance, sorted(imbalance))
+
+    def test_positions_by_preference(self):
+        members = {member.pk: member for member in self.members}
+        for ra, rd, ba, bd in Matchmaker.load(self.team.id, self.ids).propose(limit=10)['slots'].tolist():
+            for att, defence in ((members[ra], members[rd]), (members[ba], members[bd])):
+                self.assertGreaterEqual(att.att_ratio - att.def_ratio, defence.att_ratio - defence.def_ratio)
+
+    def test_repeated_pairing_penalized(self):
+        pool = self.ids[:4]
+        best = Matchmaker.load(self.team.id, pool).propose(limit=1)['slots'][0].tolist()
+        red = [m for m in self.members if m.pk in best[:2]]
+        blue = [m for m in self.members if m.pk in best[2:]]
+        for _ in range(3):
+            Match.objects.create(
+                red_att=red[0], red_def=red[1], blue_att=blue[0], blue_def=blue[1], red_score=10, blue_score=9
+            )
+        proposals = Matchmaker.load(self.team.id, pool, repeat_penalty=1).propose(limit=3)
+        self.assertEqual(proposals['repeats'].tolist(), [0, 0, 6])
+        self.assertNotEqual(set(proposals['slots'][0].tolist()[:2]), set(best[:2]))
+
+    def test_member_of_other_team(self):
+        other = Member.objects.create(team=Team.objects.create(domain='other', name='Other'), username='x')
+        with self.assertRaises(Member.DoesNotExist):
+            Matchmaker.load(self.team.id, self.ids[:3] + [other.pk])
@@ -0,0 +1,50 @@
+from django.test import TestCase
+from tfoosball.models import Match, Member, PairStats
+
+
+class PairStatsTest(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json']
+
+    def setUp(self):
+        self.members = list(Member.objects.filter(team=4).order_by('pk')[:4])
+
+    def create_match(self, lineup, red_score, blue_score):
+        return Match.objects.create(
+            red_score=red_score, blue_score=blue_score,
+            **{slot: self.members[index] for slot, index in zip(Match.SLOTS, lineup)}
+        )
+
+    def stats(self):
+        return {
+            (pair.member_id, pair.relation, pair.other_id): (pair.games, pair.wins, pair.exp)
+            for pair in PairStats.objects.filter(games__gt=0)
+        }
+
+    def test_match(self):
+        match = self.create_match((0, 1, 2, 3), 10, 4)
+        a, b, c, d = (member.pk for member in self.members)
+        stats = self.stats()
+        self.assertEqual(len(stats), 12)
+        self.assertEqual(stats[(a, PairStats.PARTNER, b)], (1, 1, match.points))
+        self.assertEqual(stats[(c, PairStats.PARTNER, d)], (1, 0, -match.points))
+        self.assertEqual(stats[(d, PairStats.OPPONENT, a)], (1, 0, -match.points))
+
+    def test_incremental_equals_rebuild(self):
+        self.create_match((0, 1, 2, 3), 10, 4)
+        updated = self.create_match((2, 0, 1, 3), 3, 10)
+        deleted = self.create_match((3, 2, 1, 0), 10, 8)
+        self.create_match((1, 3, 0, 2), 10, 10)
+        updated.red_score = 10
+        updated.save()
+        deleted.delete()
+        incremental = self.stats()
+        self.assertEqual(PairStats.objects.rebuild(), len(incremental))
+        self.assertEqual(self.stats(), incremental)
+
+    def test_rebuild_team(self):
+        self.create_match((0, 1, 2, 3), 10, 4)
+        PairStats.objects.all().delete()
+        PairStats.objects.rebuild(team_id=5)
+        self.assertFalse(PairStats.objects.exists())
+        PairStats.objects.rebuild(team_id=4)
+        self.assertEqual(PairStats.objects.filter(team_id=4).count(), 12)
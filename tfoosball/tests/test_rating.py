@@ -0,0 +1,91 @@
+from datetime import timedelta
+from io import StringIO
+from random import Random
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from tfoosball.models import ExpHistory, Match, Member, Team
+from tfoosball.rating import ELO, GLICKO2, INITIAL_DEVIATION, INITIAL_EXP, INITIAL_VOLATILITY, get_engine
+from tfoosball.replay import MatchHistory, RATING_FIELDS, STAT_FIELDS, replay_team
+
+NEW_PLAYERS = ([INITIAL_EXP] * 4, [INITIAL_DEVIATION] * 4, [INITIAL_VOLATILITY] * 4)
+
+
+class Glicko2EngineTest(SimpleTestCase):
+    def setUp(self):
+        self.engine = get_engine(GLICKO2)
+
+    def test_new_players(self):
+        points, deviations, volatilities, expected = self.engine.rate(*NEW_PLAYERS, 20, 10, 5)
+        self.assertGreater(points, 0)
+        self.assertEqual(expected, 0.5)
+        self.assertTrue(all(deviation < INITIAL_DEVIATION for deviation in deviations))
+        self.assertEqual(self.engine.rate(*NEW_PLAYERS, 20, 5, 10)[0], -points)
+        self.assertEqual(self.engine.rate(*NEW_PLAYERS, 20, 10, 10)[0], 0)
+
+    def test_certain_ratings_exchange_fewer_points(self):
+        exp, _, volatility = NEW_PLAYERS
+        uncertain = self.engine.rate(exp, [INITIAL_DEVIATION] * 4, volatility, 20, 10, 5)[0]
+        certain = self.engine.rate(exp, [50.0] * 4, volatility, 20, 10, 5)[0]
+        self.assertLess(certain, uncertain)
+
+    def test_status_scales_points(self):
+        self.assertAlmostEqual(
+            self.engine.rate(*NEW_PLAYERS, 40, 10, 5)[0], 2 * self.engine.rate(*NEW_PLAYERS, 20, 10, 5)[0], delta=1
+        )
+
+    def test_elo_keeps_deviations(self):
+        _, deviations, volatilities, _ = get_engine(ELO).rate(*NEW_PLAYERS, 20, 10, 5)
+        self.assertEqual(deviations, (INITIAL_DEVIATION,) * 4)
+        self.assertEqual(volatilities, (INITIAL_VOLATILITY,) * 4)
+
+
+class RatingEngineTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(domain='glicko', name='Glicko Team', rating_engine=GLICKO2)
+        self.members = [Member.objects.create(team=self.team, username=f'm{i}') for i in range(6)]
+        rng = Random(7)
+        start = timezone.now() - timedelta(days=10)
+        for i in range(40):
+            players = rng.sample(self.members, 4)
+            red_score = rng.randint(0, 10)
+            Match.objects.create(
+                red_att=players[0], red_def=players[1], blue_att=players[2], blue_def=players[3],
+                red_score=red_score, blue_score=10 if red_score != 10 else 4, date=start + timedelta(hours=i)
+            )
+
+    def get_stats(self):
+        members = Member.objects.filter(team=self.team).order_by('id')
+        return list(members.values_list(*STAT_FIELDS)), list(members.values_list(*RATING_FIELDS))
+
+    def assertRatingsEqual(self, first, second):
+        for (deviation, volatility), (other_deviation, other_volatility) in zip(first, second):
+            self.assertAlmostEqual(deviation, other_deviation)
+            self.assertAlmostEqual(volatility, other_volatility)
+
+    def test_replay_matches_incremental_updates(self):
+        stats, ratings = self.get_stats()
+        history = MatchHistory.load(self.team.id)
+        self.assertEqual(history.rerate(engine=GLICKO2).tolist(), history.points.tolist())
+        Member.objects.filter(team=self.team).update(exp=7, rating_deviation=7, volatility=7)
+        replay_team(self.team.id)
+        replayed_stats, replayed_ratings = self.get_stats()
+        self.assertEqual(replayed_stats, stats)
+        self.assertRatingsEqual(replayed_ratings, ratings)
+        self.assertTrue(all(deviation < INITIAL_DEVIATION for deviation, _ in ratings))
+
+    def test_switch_engine(self):
+        glicko_points = list(Match.objects.by_team(self.team.id).order_by('date').values_list('points', flat=True))
+        version = Team.objects.get(pk=self.team.id).history_version
+        call_command('recalc_member_stats', team=str(self.team.id), engine=ELO, stdout=StringIO())
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.rating_engine, ELO)
+        history = MatchHistory.load(self.team.id)
+        self.assertNotEqual(history.points.tolist(), glicko_points)
+        self.assertEqual(history.rerate().tolist(), history.points.tolist())
+        _, ratings = self.get_stats()
+        self.assertEqual(ratings, [(INITIAL_DEVIATION, INITIAL_VOLATILITY)] * len(self.members))
+        # History of exp follows the new points, cached historical leaderboards are invalidated
+        for member in Member.objects.filter(team=self.team):
+            self.assertEqual(ExpHistory.objects.filter(player=member).latest('date').exp, member.exp)
+        self.assertGreater(self.team.history_version, version)
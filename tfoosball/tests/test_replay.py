@@ -0,0 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+from random import Random
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from tfoosball.models import ExpHistory, Match, Member, Team
+from tfoosball.replay import MatchHistory, STAT_FIELDS, replay_team
+
+
+class ReplayTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(domain='replay', name='Replay Team')
+        self.members = [Member.objects.create(team=self.team, username=f'm{i}') for i in range(6)]
+        rng = Random(42)
+        start = timezone.now() - timedelta(days=30)
+        for i in range(60):
+            players = rng.sample(self.members, 4)
+            red_score = rng.randint(0, 10)
+            blue_score = 10 if red_score != 10 else rng.randint(0, 10)
+            if i % 7 == 0:
+                blue_score = red_score = 5
+            Match.objects.create(
+                red_att=players[0], red_def=players[1], blue_att=players[2], blue_def=players[3],
+                red_score=red_score, blue_score=blue_score, date=start + timedelta(hours=i)
+            )
+        self.expected = self.get_stats()
+
+    def get_stats(self):
+        return {m['id']: m for m in Member.objects.filter(team=self.team).values('id', *STAT_FIELDS)}
+
+    def corrupt_stats(self):
+        Member.objects.filter(team=self.team).update(**{field: 7 for field in STAT_FIELDS})
+
+    def test_replay_matches_incremental_updates(self):
+        self.corrupt_stats()
+        replayed = replay_team(self.team.id)
+        self.assertEqual(replayed, 60)
+        self.assertEqual(self.get_stats(), self.expected)
+
+    def test_rerate_reproduces_points(self):
+        history = MatchHistory.load(self.team.id)
+        self.assertEqual(history.rerate().tolist(), history.points.tolist())
+
+    def test_rerate_stores_points(self):
+        Match.objects.filter(red_att__team=self.team).update(points=0)
+        self.corrupt_stats()
+        replay_team(self.team.id, rerate=True)
+        self.assertEqual(self.get_stats(), self.expected)
+
+    def test_member_without_matches(self):
+        idle = Member.objects.create(team=self.team, username='idle', exp=1234, win_streak=3)
+        replay_team(self.team.id)
+        idle.refresh_from_db()
+        self.assertEqual(idle.exp, 1000)
+        self.assertEqual(idle.win_streak, 0)
+
+
+class RebuildExpHistoryTest(TestCase):
+    fixtures = ['teams.json', 'players.json', 'members.json', 'matches.json']
+
+    def setUp(self):
+        member = Member.objects.get(pk=8)
+        Match.objects.create(
+            red_att=member, red_def=Member.objects.get(pk=9), blue_att=Member.objects.get(pk=10),
+            blue_def=Member.objects.get(pk=12), red_score=10, blue_score=4, date=timezone.now()
+        )
+
+    def get_history(self):
+        history = ExpHistory.objects.values_list('player_id', 'date', 'exp', 'matches_played', 'match_id')
+        return sorted(history), sorted(Member.objects.values_list('id', 'exp'))
+
+    def test_rebuild_matches_legacy_recount(self):
+        call_command('recount_exp_history')
+        expected = self.get_history()
+        self.assertTrue(expected[0])
+        ExpHistory.objects.all().delete()
+        Member.objects.update(exp=1)
+        call_command('recount_exp_history', rebuild=True, chunk_size=2, stdout=StringIO())
+        self.assertEqual(self.get_history(), expected)